@@ -1,22 +1,23 @@
 import sys
 
 from PySide6.QtCore import Qt
+from PySide6.QtGui import QAction, QKeySequence
 from PySide6.QtWidgets import (
-    QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel,
+    QApplication, QMainWindow, QWidget, QVBoxLayout,
     QSplitter, QListWidget, QListWidgetItem, QStackedWidget,
-    QFrame
+    QFrame, QDockWidget
 )
 
-from tool.file_diff import FileCompareWidget
-from tool.format_text import FormatTextWidget
-from tool.unix_timestamp import UnixTimestampWidget
-from tool.uuid_generator import UUIDGeneratorWidget
-
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("DUKIT-Dev Utilities Kit")
+        self.file_compare_widget = None
+        self.uuid_generator_widget = None
+        self.unix_timestamp_widget = None
+        self.format_text_widget = None
+        self.perf_dock = None
 
         splitter = QSplitter(Qt.Orientation.Horizontal)
         self.list_widget = QListWidget()
@@ -35,19 +36,16 @@ class MainWindow(QMainWindow):
         list_layout.addWidget(self.list_widget)
         self.list_widget_frame.setLayout(list_layout)
 
+        # 各工具在第一次被选中时才导入模块并创建，之前用空白页占位
+        self.tool_factories = [
+            self.create_file_compare_widget,
+            self.create_uuid_generator_widget,
+            self.create_unix_timestamp_widget,
+            self.create_format_text_widget,
+        ]
         self.stack = QStackedWidget()
-
-        self.file_compare_widget = FileCompareWidget(main_window=self)
-        self.stack.addWidget(self.file_compare_widget)
-
-        self.uuid_generator_widget = UUIDGeneratorWidget()
-        self.stack.addWidget(self.uuid_generator_widget)
-
-        self.unix_timestamp_widget = UnixTimestampWidget()
-        self.stack.addWidget(self.unix_timestamp_widget)
-
-        self.format_text_widget = FormatTextWidget()
-        self.stack.addWidget(self.format_text_widget)
+        for _ in self.tool_factories:
+            self.stack.addWidget(QWidget())
 
         self.stack.setMinimumWidth(400)  # 确保右侧内容区域有最小宽度
 
@@ -57,11 +55,67 @@ class MainWindow(QMainWindow):
         splitter.setSizes([200, 600])  # 初始分割比例
 
         self.setCentralWidget(splitter)
-        self.list_widget.currentRowChanged.connect(self.stack.setCurrentIndex)
+
+        # 性能面板默认隐藏，第一次打开时才创建
+        self.perf_action = QAction("性能面板", self)
+        self.perf_action.setCheckable(True)
+        self.perf_action.setShortcut(QKeySequence(Qt.Key.Key_F12))
+        self.perf_action.toggled.connect(self.toggle_perf_panel)
+        self.menuBar().addMenu("视图").addAction(self.perf_action)
+
+        self.list_widget.currentRowChanged.connect(self.show_tool)
+        self.list_widget.setCurrentRow(0)
+
+    def create_file_compare_widget(self):
+        from tool.file_diff import FileCompareWidget
+        self.file_compare_widget = FileCompareWidget(main_window=self)
+        return self.file_compare_widget
+
+    def create_uuid_generator_widget(self):
+        from tool.uuid_generator import UUIDGeneratorWidget
+        self.uuid_generator_widget = UUIDGeneratorWidget(main_window=self)
+        return self.uuid_generator_widget
+
+    def create_unix_timestamp_widget(self):
+        from tool.unix_timestamp import UnixTimestampWidget
+        self.unix_timestamp_widget = UnixTimestampWidget(main_window=self)
+        return self.unix_timestamp_widget
+
+    def create_format_text_widget(self):
+        from tool.format_text import FormatTextWidget
+        self.format_text_widget = FormatTextWidget(main_window=self)
+        return self.format_text_widget
+
+    def show_tool(self, row):
+        """切换到第 row 个工具，第一次切换时创建它并替换占位页"""
+        if row < 0:
+            return
+        factory = self.tool_factories[row]
+        if factory is not None:
+            self.tool_factories[row] = None
+            placeholder = self.stack.widget(row)
+            self.stack.insertWidget(row, factory())
+            self.stack.removeWidget(placeholder)
+            placeholder.deleteLater()
+        self.stack.setCurrentIndex(row)
+
+    def toggle_perf_panel(self, visible):
+        if self.perf_dock is None:
+            if not visible:
+                return
+            from tool.perf_panel import PerfPanel
+            self.perf_dock = QDockWidget("性能", self)
+            self.perf_dock.setWidget(PerfPanel(main_window=self))
+            self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.perf_dock)
+            # 用标题栏按钮关闭面板时同步菜单项
+            self.perf_dock.visibilityChanged.connect(
+                lambda shown: self.perf_action.setChecked(not self.perf_dock.isHidden()))
+        self.perf_dock.setVisible(visible)
 
     def update_status(self, message: str) -> None:
         self.statusBar().showMessage(message)
 
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = MainWindow()
@@ -0,0 +1,190 @@
+"""差异算法基准测试（不依赖 Qt）
+
+    python -m bench.diff_bench --output new.json
+    python -m bench.diff_bench --output new.json --baseline old.json --threshold 0.25
+
+指定 --baseline 时，任一项耗时或峰值内存超过基线的 (1 + threshold) 倍即以非零状态退出
+"""
+import argparse
+import gc
+import json
+import platform
+import random
+import string
+import sys
+import time
+import tracemalloc
+
+from tool.diff_engine import DiffBudget, diff_ops, myers_diff_trace, pack_ops, render_ops, unified_diff
+
+# 语料：行数、每行长度、被编辑行的比例、移动的块数和块大小；
+# vocabulary 不为 0 时两侧各自从这么多种行中随机抽取，互不相关但有大量重复行（如粘贴错了文件）
+CORPORA = {
+    "small": dict(lines=2000, line_length=40, edit_density=0.05, moved_blocks=0, block_size=0),
+    "sparse-edits": dict(lines=200000, line_length=60, edit_density=0.001, moved_blocks=0, block_size=0),
+    "dense-edits": dict(lines=20000, line_length=60, edit_density=0.2, moved_blocks=0, block_size=0),
+    "moved-blocks": dict(lines=50000, line_length=60, edit_density=0.001, moved_blocks=100, block_size=40),
+    "long-lines": dict(lines=5000, line_length=4000, edit_density=0.02, moved_blocks=0, block_size=0),
+    "unrelated": dict(lines=20000, line_length=20, edit_density=0, moved_blocks=0, block_size=0, vocabulary=200),
+}
+
+# 精确算法在这些语料上的耗时随行数平方增长，只运行限制开销的算法
+BOUNDED_ONLY_CORPORA = {"unrelated"}
+
+# 参考实现的内存为 O(D²)，只在这么多行以内的语料上运行
+TRACE_MAX_LINES = 20000
+
+# 耗时低于该值（秒）的项目计时噪声太大，不参与退化判断
+MIN_SECONDS = 0.005
+
+
+def make_corpus(lines, line_length, edit_density, moved_blocks, block_size, vocabulary=0, seed=0):
+    """生成一对文本行：b 在 a 的基础上做随机替换/插入/删除，并移动若干块"""
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits + "    "
+
+    def random_line():
+        return "".join(rng.choices(alphabet, k=line_length))
+
+    if vocabulary:
+        words = [random_line() for _ in range(vocabulary)]
+        return rng.choices(words, k=lines), rng.choices(words, k=lines)
+
+    a = [f"{i:08d} {random_line()}" for i in range(lines)]
+    b = list(a)
+    for _ in range(int(lines * edit_density)):
+        i = rng.randrange(len(b))
+        kind = rng.random()
+        if kind < 0.5:
+            b[i] = random_line()
+        elif kind < 0.75:
+            b.insert(i, random_line())
+        elif len(b) > 1:
+            del b[i]
+    for _ in range(moved_blocks):
+        if len(b) <= block_size:
+            break
+        i = rng.randrange(len(b) - block_size)
+        block = b[i:i + block_size]
+        del b[i:i + block_size]
+        j = rng.randrange(len(b) + 1)
+        b[j:j] = block
+    return a, b
+
+
+def run_engine(engine, a, b):
+    """完整走一遍：计算编辑序列并生成输出，返回 (输出结果, 改动行数)"""
+    if engine == "myers-trace":
+        lines = myers_diff_trace(a, b)
+        return lines, sum(1 for line in lines if line[0] != " ")
+    if engine == "myers-bounded":
+        lines = render_ops(a, b, diff_ops(a, b, budget=DiffBudget()))
+        return lines, sum(1 for line in lines if line[0] != " ")
+    if engine.endswith("-unified"):
+        codes, indexes = pack_ops(diff_ops(a, b, algorithm=engine[:-len("-unified")]))
+        hunks = list(unified_diff(a, b, codes, indexes))
+        return hunks, len(codes) - codes.count(" ")
+    lines = render_ops(a, b, diff_ops(a, b, algorithm=engine))
+    return lines, sum(1 for line in lines if line[0] != " ")
+
+
+ENGINES = ["myers", "patience", "histogram", "myers-unified", "myers-trace", "myers-bounded"]
+
+
+def measure(engine, a, b, repeat):
+    """耗时取多次运行的最小值；峰值内存和结果占用的内存块数单独用 tracemalloc 跑一次，避免影响计时"""
+    seconds = float("inf")
+    changes = 0
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        _, changes = run_engine(engine, a, b)
+        seconds = min(seconds, time.perf_counter() - start)
+
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    output, _ = run_engine(engine, a, b)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # 结果仍被引用，此时多出来的内存块即输出结果分配的对象数
+    result_blocks = sys.getallocatedblocks() - blocks_before
+    del output
+    return {
+        "seconds": round(seconds, 6),
+        "peak_kb": peak // 1024,
+        "result_blocks": result_blocks,
+        "changes": changes,
+    }
+
+
+def run(corpora, engines, repeat, scale):
+    results = {}
+    for name in corpora:
+        spec = dict(CORPORA[name])
+        spec["lines"] = max(1, int(spec["lines"] * scale))
+        spec["moved_blocks"] = int(spec["moved_blocks"] * scale)
+        a, b = make_corpus(**spec)
+        for engine in engines:
+            if engine == "myers-trace" and spec["lines"] > TRACE_MAX_LINES:
+                continue
+            if name in BOUNDED_ONLY_CORPORA and engine != "myers-bounded":
+                continue
+            result = measure(engine, a, b, repeat)
+            results[f"{name}/{engine}"] = result
+            print(f"{name:>14} {engine:>16} {result['seconds'] * 1000:10.1f} ms {result['peak_kb']:10d} KB "
+                  f"{result['changes']:8d} changes", flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """返回超出阈值的项目描述列表"""
+    regressions = []
+    for key, old in baseline.items():
+        new = results.get(key)
+        if new is None:
+            continue
+        for metric in ("seconds", "peak_kb"):
+            if metric == "seconds" and new[metric] < MIN_SECONDS:
+                continue
+            if old[metric] and new[metric] > old[metric] * (1 + threshold):
+                regressions.append(f"{key} {metric}: {old[metric]} -> {new[metric]}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.diff_bench", description="差异算法基准测试")
+    parser.add_argument("--corpus", action="append", choices=CORPORA.keys(), help="只运行指定语料，可重复")
+    parser.add_argument("--engine", action="append", choices=ENGINES, help="只运行指定算法，可重复")
+    parser.add_argument("--repeat", type=int, default=3, help="计时重复次数，取最小值")
+    parser.add_argument("--scale", type=float, default=1.0, help="按比例缩放语料行数")
+    parser.add_argument("--output", help="结果写入的 JSON 文件")
+    parser.add_argument("--baseline", help="用于对比的基线 JSON 文件")
+    parser.add_argument("--threshold", type=float, default=0.25, help="允许的相对退化比例")
+    args = parser.parse_args(argv)
+
+    results = run(args.corpus or list(CORPORA), args.engine or ENGINES, args.repeat, args.scale)
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": args.scale,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.threshold)
+        for line in regressions:
+            print(f"退化: {line}")
+        if regressions:
+            return 1
+        print("未发现超过阈值的退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
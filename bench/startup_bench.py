@@ -0,0 +1,152 @@
+"""启动与更新开销基准测试
+
+    python -m bench.startup_bench --output new.json
+    python -m bench.startup_bench --output new.json --baseline old.json --threshold 0.25
+
+启动各项在全新的子进程中测量（冷启动，不受已导入模块影响）：导入 app、创建主窗口、第一次打开文本格式化工具，
+以及命令行各子命令处理一行输入的总耗时（不加载 Qt）；更新开销测量每次格式化时获取词法分析器的耗时。指定 --baseline 时超过阈值即以非零状态退出
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from bench.diff_bench import compare
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 在子进程中运行，最后一行输出各阶段的耗时（秒）和峰值内存（KB）
+CHILD_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+from PySide6.QtWidgets import QApplication
+qt_app = QApplication([])
+window = app.MainWindow()
+constructed = time.perf_counter()
+window.list_widget.setCurrentRow(3)
+format_tool = time.perf_counter()
+try:
+    import resource
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+except ImportError:
+    peak_kb = 0
+print(json.dumps({
+    "import_app": imported - start,
+    "main_window": constructed - imported,
+    "format_tool": format_tool - constructed,
+    "peak_kb": peak_kb,
+}), flush=True)
+"""
+
+STARTUP_STAGES = ["import_app", "main_window", "format_tool"]
+
+# 命令行子命令 -> (参数, 标准输入)
+CLI_COMMANDS = {
+    "uuid": (["uuid", "--count", "1"], b""),
+    "fmt": (["fmt"], b'{"a": 1}'),
+    "ts": (["ts"], b"1700000000\n"),
+}
+
+# 获取词法分析器的重复次数
+LOOKUP_COUNT = 200
+
+
+def run_child():
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    env["PYTHONPATH"] = str(ROOT) + os.pathsep + env.get("PYTHONPATH", "")
+    result = subprocess.run([sys.executable, "-c", CHILD_SCRIPT], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    # 只读取最后一行结果，退出阶段的状态码不影响测量
+    lines = result.stdout.strip().splitlines()
+    if not lines:
+        raise RuntimeError(f"子进程没有输出结果: {result.stderr.strip()}")
+    return json.loads(lines[-1])
+
+
+def measure_startup(repeat):
+    """每个阶段取多次冷启动中的最小值"""
+    best = {stage: float("inf") for stage in STARTUP_STAGES}
+    peak_kb = 0
+    for _ in range(repeat):
+        sample = run_child()
+        for stage in STARTUP_STAGES:
+            best[stage] = min(best[stage], sample[stage])
+        peak_kb = max(peak_kb, sample["peak_kb"])
+    return {f"startup/{stage}": {"seconds": round(best[stage], 6), "peak_kb": peak_kb} for stage in STARTUP_STAGES}
+
+
+def measure_cli(repeat):
+    """命令行每个子命令从启动到退出的总耗时，取多次运行的最小值"""
+    results = {}
+    for name, (arguments, stdin) in CLI_COMMANDS.items():
+        seconds = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, str(ROOT / "cli.py"), *arguments], cwd=ROOT, input=stdin,
+                           capture_output=True, check=True)
+            seconds = min(seconds, time.perf_counter() - start)
+        results[f"cli/{name}"] = {"seconds": round(seconds, 6), "peak_kb": 0}
+    return results
+
+
+def measure_lookup(repeat):
+    """每次更新获取词法分析器的耗时：每次新建（原来的做法）与按语言缓存"""
+    from pygments import lexers
+    from tool.format_text import get_lexer
+
+    results = {}
+    for name, lookup in (("get_lexer_by_name", lexers.get_lexer_by_name), ("get_lexer_cached", get_lexer)):
+        seconds = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(LOOKUP_COUNT):
+                lookup("python")
+            seconds = min(seconds, (time.perf_counter() - start) / LOOKUP_COUNT)
+        results[f"update/{name}"] = {"seconds": round(seconds, 9), "peak_kb": 0}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.startup_bench", description="启动与更新开销基准测试")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数，取最小值")
+    parser.add_argument("--output", help="结果写入的 JSON 文件")
+    parser.add_argument("--baseline", help="用于对比的基线 JSON 文件")
+    parser.add_argument("--threshold", type=float, default=0.25, help="允许的相对退化比例")
+    args = parser.parse_args(argv)
+
+    results = measure_startup(args.repeat)
+    results.update(measure_cli(args.repeat))
+    results.update(measure_lookup(args.repeat))
+    for key, result in results.items():
+        print(f"{key:>28} {result['seconds'] * 1000:10.3f} ms {result['peak_kb']:10d} KB", flush=True)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.threshold)
+        for line in regressions:
+            print(f"退化: {line}")
+        if regressions:
+            return 1
+        print("未发现超过阈值的退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""批量生成 UUID 等 ID 的基准测试（不依赖 Qt）
+
+    python -m bench.uuid_bench --output new.json
+    python -m bench.uuid_bench --count 1000000 --output new.json --baseline old.json --threshold 0.25
+
+与逐个调用 uuid 模块再拼接文本的做法对比，并测量 v7、ULID、Snowflake 的批量生成；未安装 NumPy 时跳过 NumPy 一项。
+指定 --baseline 时超过阈值即以非零状态退出
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import uuid
+
+from bench.diff_bench import compare
+from tool.uuid_batch import iter_uuid_batches, load_numpy
+
+
+class NullSink:
+    """只统计写入字节数的输出"""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+
+
+def per_call(kind, count):
+    """原来的做法：逐个调用 uuid 模块，拼成整段文本"""
+    make = uuid.uuid1 if kind == "uuid1" else uuid.uuid4
+    sink = NullSink()
+    sink.write("\n".join(str(make()) for _ in range(count)).encode("ascii"))
+    return sink.size
+
+
+def batch(kind, count, use_numpy):
+    sink = NullSink()
+    for chunk in iter_uuid_batches(kind, count, use_numpy=use_numpy):
+        sink.write(chunk)
+    return sink.size
+
+
+ENGINES = {
+    "per-call": per_call,
+    "batch": lambda kind, count: batch(kind, count, False),
+    "batch-numpy": lambda kind, count: batch(kind, count, True),
+}
+
+# uuid 模块只有 v1 和 v4 可以逐个调用对比；ULID、Snowflake 不经过十六进制格式化，不区分 NumPy
+KIND_ENGINES = {
+    "uuid1": ["per-call", "batch", "batch-numpy"],
+    "uuid4": ["per-call", "batch", "batch-numpy"],
+    "uuid7": ["batch", "batch-numpy"],
+    "ulid": ["batch"],
+    "snowflake": ["batch"],
+}
+
+
+def measure(engine, kind, count, repeat):
+    """耗时取多次运行的最小值，峰值内存单独用 tracemalloc 跑一次"""
+    run = ENGINES[engine]
+    seconds = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run(kind, count)
+        seconds = min(seconds, time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    run(kind, count)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "seconds": round(seconds, 6),
+        "peak_kb": peak // 1024,
+        "per_second": int(count / seconds),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.uuid_bench", description="批量生成 UUID 的基准测试")
+    parser.add_argument("--count", type=int, default=1_000_000, help="每项生成的 UUID 个数")
+    parser.add_argument("--repeat", type=int, default=3, help="计时重复次数，取最小值")
+    parser.add_argument("--output", help="结果写入的 JSON 文件")
+    parser.add_argument("--baseline", help="用于对比的基线 JSON 文件")
+    parser.add_argument("--threshold", type=float, default=0.25, help="允许的相对退化比例")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for kind, engines in KIND_ENGINES.items():
+        for engine in engines:
+            if engine == "batch-numpy" and load_numpy() is None:
+                continue
+            result = measure(engine, kind, args.count, args.repeat)
+            results[f"{kind}/{engine}"] = result
+            print(f"{kind:>10} {engine:>12} {result['seconds'] * 1000:10.1f} ms {result['peak_kb']:10d} KB "
+                  f"{result['per_second']:12,d} /s", flush=True)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "count": args.count,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline["results"], args.threshold)
+        for line in regressions:
+            print(f"退化: {line}")
+        if regressions:
+            return 1
+        print("未发现超过阈值的退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,377 @@
+"""DUKIT 命令行：不加载 Qt，直接调用 tool/ 中的引擎，适合在 CI 中使用
+
+    python cli.py diff OLD NEW [OLD NEW ...] [--algorithm patience] [-U 3]
+    python cli.py diff OLD_DIR NEW_DIR [--hash-cache hashes.json]
+    python cli.py merge BASE OURS THEIRS [-o merged.txt]
+    python cli.py fmt [FILE ...] [--language JSON] [--in-place]
+    python cli.py uuid [--kind uuid7] [--count 1000]
+    python cli.py ts [FILE ...] [--local] [--unit ms]
+    python cli.py --trace trace.json --profile run.prof diff OLD NEW -j 1
+
+没有给出文件（或文件为 -）时从标准输入流式读取，结果写到标准输出；多个文件用进程池并行处理，结果按参数顺序输出。
+各子命令只在运行时导入自己用到的引擎，启动不需要 Qt。
+--trace 把各阶段的耗时写成 Chrome 追踪格式的 JSON，--profile 用 cProfile 分析整条命令；
+进程池中的子进程不会上报，需要完整记录时加 -j 1。
+退出状态：0 成功；1 有差异、合并冲突、格式错误或无法识别的行；2 参数或读写错误
+"""
+import argparse
+import io
+import os
+import sys
+
+# 从标准输入转换时间戳时每次读取的字符数（之后补齐到行尾）
+TS_BLOCK_SIZE = 8 * 1024 * 1024
+
+
+def run_jobs(function, items, jobs):
+    """按 items 的顺序逐个产出 function(item)；多于一项且 jobs 不为 1 时在进程池中并行计算"""
+    if jobs == 1 or len(items) < 2:
+        yield from map(function, items)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=min(jobs or os.cpu_count() or 1, len(items))) as executor:
+        yield from executor.map(function, items)
+
+
+def report(command, name, message):
+    print(f"dukit {command}: {name}: {message}", file=sys.stderr)
+
+
+def diff_budget(max_cost):
+    """--max-cost 对应的开销限制：None 使用默认上限，0 不限制"""
+    from tool.diff_engine import DiffBudget
+    if max_cost == 0:
+        return None
+    # 明确给出的上限按原值使用，不随输入大小放宽
+    return DiffBudget() if max_cost is None else DiffBudget(max_cost, scale=False)
+
+
+def diff_pair(job):
+    """比较一对文件，返回 (unified diff 文本, 错误信息, 近似结果的说明)"""
+    a_path, b_path, algorithm, context, max_cost = job
+    from tool.diff_engine import diff_files, unified_diff
+    budget = diff_budget(max_cost)
+    try:
+        diff = diff_files(a_path, b_path, algorithm=algorithm, budget=budget)
+        if diff is None:
+            return "", None, None
+        a_lines, b_lines, codes, indexes = diff
+        try:
+            text = "".join(unified_diff(a_lines, b_lines, codes, indexes, context, a_path, b_path))
+            return text, None, budget.note() if budget is not None else None
+        finally:
+            a_lines.close()
+            b_lines.close()
+    except (OSError, ValueError) as e:
+        return "", str(e), None
+
+
+def write_diffs(pairs, jobs):
+    """按顺序输出每对文件的 unified diff，返回退出状态"""
+    status = 0
+    for (a_path, b_path, *_), (output, error, note) in zip(pairs, run_jobs(diff_pair, pairs, jobs)):
+        if error:
+            report("diff", f"{a_path} {b_path}", error)
+            status = 2
+        elif output:
+            if note:
+                report("diff", f"{a_path} {b_path}", note)
+            sys.stdout.write(output)
+            status = max(status, 1)
+    return status
+
+
+def diff_stdin(a_path, b_path, algorithm, context, max_cost):
+    """一侧为标准输入时整体读入文本后比较"""
+    from tool.diff_engine import diff_ops, pack_ops, unified_diff
+
+    def read(path):
+        if path == "-":
+            # 与读取文件时相同，按 UTF-8 解码，无效字节替换而不是中断比较
+            return io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", errors="replace").read()
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return f.read()
+
+    a_lines = read(a_path).splitlines()
+    b_lines = read(b_path).splitlines()
+    budget = diff_budget(max_cost)
+    codes, indexes = pack_ops(diff_ops(a_lines, b_lines, algorithm=algorithm, budget=budget))
+    note = budget.note() if budget is not None else None
+    if note:
+        report("diff", f"{a_path} {b_path}", note)
+    return "".join(unified_diff(a_lines, b_lines, codes, indexes, context, a_path, b_path))
+
+
+def diff_directories(args):
+    """比较两个目录：只在一侧存在的文件列出路径，有变化的文件在进程池中比较后输出 unified diff"""
+    from tool.tree_diff import HashCache, compare_trees, STATUS_ADDED, STATUS_REMOVED, STATUS_MODIFIED
+    left_root, right_root = args.paths
+    cache = HashCache(args.hash_cache)
+    statuses = compare_trees(left_root, right_root, cache, quick=not args.checksum)
+    try:
+        cache.save()
+    except OSError as e:
+        report("diff", args.hash_cache, e)
+    status = 0
+    pairs = []
+    for rel in sorted(statuses):
+        if statuses[rel] == STATUS_MODIFIED:
+            pairs.append((os.path.join(left_root, rel), os.path.join(right_root, rel), args.algorithm, args.unified,
+                          args.max_cost))
+        elif statuses[rel] in (STATUS_ADDED, STATUS_REMOVED):
+            root = right_root if statuses[rel] == STATUS_ADDED else left_root
+            sys.stdout.write(f"仅在 {root} 中: {rel}\n")
+            status = 1
+    return max(status, write_diffs(pairs, args.jobs))
+
+
+def command_diff(args):
+    if args.max_cost is not None and args.max_cost < 0:
+        args.parser.error("--max-cost 不能为负数")
+    if len(args.paths) == 2 and all(os.path.isdir(path) for path in args.paths):
+        return diff_directories(args)
+    if len(args.paths) % 2:
+        args.parser.error("文件需要成对给出: OLD NEW [OLD NEW ...]")
+    pairs = [(args.paths[i], args.paths[i + 1], args.algorithm, args.unified, args.max_cost)
+             for i in range(0, len(args.paths), 2)]
+    if any("-" in pair[:2] for pair in pairs):
+        if len(pairs) > 1:
+            args.parser.error("只比较一对文件时才能使用标准输入 -")
+        try:
+            output = diff_stdin(*pairs[0])
+        except OSError as e:
+            report("diff", pairs[0][0], e)
+            return 2
+        sys.stdout.write(output)
+        return 1 if output else 0
+    return write_diffs(pairs, args.jobs)
+
+
+def command_merge(args):
+    from tool.merge3 import merge_files
+    try:
+        merged, conflicts = merge_files(args.base, args.ours, args.theirs, args.algorithm, not args.no_base)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8", newline="\n") as f:
+                f.write(merged)
+        else:
+            sys.stdout.write(merged)
+    except OSError as e:
+        report("merge", e.filename, e.strerror)
+        return 2
+    if conflicts:
+        report("merge", args.ours, f"{conflicts} 处冲突")
+        return 1
+    return 0
+
+
+def format_file(job):
+    """格式化一个文件，返回 (结果文本, 错误信息)；原地格式化时写回文件，结果文本为空"""
+    path, language, in_place = job
+    from tool.code_format import format_code
+    from tool.language_detect import LanguageDetector
+    try:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        formatted = format_code(text, language or LanguageDetector().detect(text))
+        if in_place:
+            if formatted != text:
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(formatted)
+            return "", None
+        return formatted, None
+    except (OSError, ValueError) as e:
+        return "", str(e)
+
+
+def command_fmt(args):
+    from tool.code_format import find_language
+    try:
+        language = find_language(args.language) if args.language else None
+    except ValueError as e:
+        args.parser.error(str(e))
+
+    if not args.files:
+        if args.in_place:
+            args.parser.error("从标准输入读取时不能使用 --in-place")
+        from tool.code_format import format_stream
+        try:
+            _, chunks = format_stream(sys.stdin, language)
+            chunk = ""
+            for chunk in chunks:
+                sys.stdout.write(chunk)
+            # 与格式化文件时相同，非空结果以换行结尾
+            if chunk and not chunk.endswith("\n"):
+                sys.stdout.write("\n")
+        except ValueError as e:
+            report("fmt", "-", e)
+            return 1
+        return 0
+
+    status = 0
+    jobs = [(path, language, args.in_place) for path in args.files]
+    for path, (output, error) in zip(args.files, run_jobs(format_file, jobs, args.jobs)):
+        if error:
+            report("fmt", path, error)
+            status = 1
+        elif output:
+            sys.stdout.write(output if output.endswith("\n") else output + "\n")
+    return status
+
+
+def command_uuid(args):
+    from tool.uuid_batch import write_uuids
+    write_uuids(sys.stdout.buffer, args.kind, args.count)
+    return 0
+
+
+def iter_line_blocks(file, size=TS_BLOCK_SIZE):
+    """按块读取文本，每块在行尾结束，产出去掉最后一个换行的文本"""
+    while True:
+        block = file.read(size)
+        if not block:
+            return
+        if not block.endswith("\n"):
+            block += file.readline()
+        yield block[:-1] if block.endswith("\n") else block
+
+
+def convert_file(job):
+    """转换一个文件中的时间戳，返回 (结果文本, 无法识别的行号列表, 错误信息)"""
+    path, local, unit = job
+    from tool.timestamp_convert import TimestampConverter
+    try:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+    except (OSError, ValueError) as e:
+        return "", [], str(e)
+    output, errors = TimestampConverter(local, unit).convert_text(text)
+    return output, errors, None
+
+
+def command_ts(args):
+    if not args.files:
+        from tool.timestamp_convert import TimestampConverter
+        converter = TimestampConverter(args.local, args.unit)
+        status = 0
+        line = 0
+        for block in iter_line_blocks(sys.stdin):
+            output, errors = converter.convert_text(block)
+            sys.stdout.write(output + "\n")
+            for number in errors:
+                report("ts", "-", f"第 {line + number} 行无法识别")
+                status = 1
+            line += block.count("\n") + 1
+        return status
+
+    status = 0
+    jobs = [(path, args.local, args.unit) for path in args.files]
+    for path, (output, errors, error) in zip(args.files, run_jobs(convert_file, jobs, args.jobs)):
+        if error:
+            report("ts", path, error)
+            status = 2
+            continue
+        if output:
+            sys.stdout.write(output + "\n")
+        for number in errors:
+            report("ts", path, f"第 {number} 行无法识别")
+            status = max(status, 1)
+    return status
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="dukit", description="DUKIT 命令行工具（不需要图形界面）")
+    parser.add_argument("--trace", metavar="FILE", help="结束时把各阶段的耗时写入 Chrome 追踪格式的 JSON 文件")
+    parser.add_argument("--profile", metavar="FILE", help="用 cProfile 分析整条命令，结束时写入 .prof 文件")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    jobs = argparse.ArgumentParser(add_help=False)
+    jobs.add_argument("-j", "--jobs", type=int, default=0, help="并行进程数，默认为 CPU 核数，1 表示不使用进程池")
+
+    diff = subparsers.add_parser("diff", parents=[jobs], help="输出 unified diff")
+    diff.add_argument("paths", nargs="+", metavar="OLD NEW", help="成对给出的文件，其中一侧可以为 - 表示标准输入")
+    diff.add_argument("-a", "--algorithm", choices=["myers", "patience", "histogram"], default="myers",
+                      help="差异算法")
+    diff.add_argument("-U", "--unified", type=int, default=3, help="上下文行数")
+    diff.add_argument("--max-cost", type=int, metavar="STEPS",
+                      help="每次分割最多搜索的编辑步数，超过后给出近似（不一定最短）的差异；0 表示不限制，总是计算最短差异")
+    diff.add_argument("--hash-cache", help="比较目录时保存文件摘要的 JSON 文件，下次比较时未变化的文件不再读取")
+    diff.add_argument("-c", "--checksum", action="store_true",
+                      help="比较目录时大小和修改时间都相同的文件也比较内容摘要")
+    diff.set_defaults(handler=command_diff, parser=diff)
+
+    merge = subparsers.add_parser("merge", help="三方合并，冲突处输出 diff3 格式的冲突标记")
+    merge.add_argument("base", help="共同祖先")
+    merge.add_argument("ours", help="我方修改后的文件")
+    merge.add_argument("theirs", help="对方修改后的文件")
+    merge.add_argument("-a", "--algorithm", choices=["myers", "patience", "histogram"], default="myers",
+                       help="差异算法")
+    merge.add_argument("-o", "--output", help="结果写入的文件，默认输出到标准输出")
+    merge.add_argument("--no-base", action="store_true", help="冲突中不输出共同祖先的内容")
+    merge.set_defaults(handler=command_merge, parser=merge)
+
+    fmt = subparsers.add_parser("fmt", parents=[jobs], help="格式化 JSON、XML，其他语言原样输出")
+    fmt.add_argument("files", nargs="*", help="输入文件，不给出时读取标准输入")
+    fmt.add_argument("-l", "--language", help="语言（如 json、xml），默认自动检测")
+    fmt.add_argument("-i", "--in-place", action="store_true", help="把结果写回原文件")
+    fmt.set_defaults(handler=command_fmt, parser=fmt)
+
+    uuid = subparsers.add_parser("uuid", help="批量生成 UUID、ULID、Snowflake ID")
+    uuid.add_argument("-k", "--kind", choices=["uuid1", "uuid4", "uuid7", "ulid", "snowflake"], default="uuid4",
+                      help="ID 类型")
+    uuid.add_argument("-n", "--count", type=int, default=1, help="生成个数")
+    uuid.set_defaults(handler=command_uuid, parser=uuid)
+
+    ts = subparsers.add_parser("ts", parents=[jobs], help="时间戳与 ISO 8601 时间互相转换，每行一个值")
+    ts.add_argument("files", nargs="*", help="输入文件，不给出时读取标准输入")
+    ts.add_argument("--local", action="store_true", help="按本地时间输出和解释没有时区的时间，默认 UTC")
+    ts.add_argument("-u", "--unit", choices=["s", "ms", "us", "ns"], default="s", help="ISO 时间转为时间戳时的精度")
+    ts.set_defaults(handler=command_ts, parser=ts)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, "files", None) == ["-"]:
+        args.files = []
+    elif "-" in getattr(args, "files", ()):
+        args.parser.error("多个文件中不能包含标准输入 -")
+    if args.trace or args.profile:
+        return run_traced(args)
+    return run_handler(args)
+
+
+def run_handler(args):
+    try:
+        status = args.handler(args)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # 输出被提前关闭（如管道到 head），不再报错
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    return status
+
+
+def run_traced(args):
+    """记录各阶段耗时运行命令，结束后写出追踪和性能分析文件"""
+    from tool import perf
+    perf.recorder.profiling = bool(args.profile)
+    # 整条命令作为最外层的区间，性能分析覆盖全部执行过程
+    with perf.span(f"dukit {args.command}"):
+        status = run_handler(args)
+    try:
+        if args.trace:
+            perf.recorder.dump_trace(args.trace)
+        if args.profile:
+            perf.recorder.dump_profile(args.profile)
+    except OSError as e:
+        report(args.command, e.filename, e.strerror)
+        return 2
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+import io
+
+import pytest
+
+from tool.code_format import find_language, format_code, format_stream
+from tool.language_detect import PLAIN_TEXT
+
+SAMPLES = {
+    "JSON": '{"a": [1, 2], "b": {"c": null}}',
+    "XML": '<?xml version="1.0"?><a><b x="1">t</b><c/></a>',
+    "Python": 'def f():\n    return 1\n',
+}
+
+
+@pytest.mark.parametrize("language, text", SAMPLES.items())
+def test_stream_matches_whole_text(language, text):
+    detected, chunks = format_stream(io.StringIO(text))
+    assert detected == language
+    assert "".join(chunks) == format_code(text, language)
+
+
+def test_blank_input():
+    assert format_code("  \n", "JSON") == ""
+    language, chunks = format_stream(io.StringIO(""), "XML")
+    assert language == "XML" and list(chunks) == []
+
+
+def test_find_language():
+    assert find_language("json") == "JSON" and find_language("cpp") == "C++"
+    assert find_language("plain text") == PLAIN_TEXT
+    with pytest.raises(ValueError):
+        find_language("cobol")
+
+
+def test_format_error():
+    with pytest.raises(ValueError):
+        format_code('{"a": }', "JSON")
@@ -0,0 +1,112 @@
+import random
+import sys
+from array import array
+
+import pytest
+
+from tool import perf
+from tool.diff_engine import (ALGORITHMS, MIN_SIMILARITY, OP_DELETE, OP_INSERT, DiffBudget, diff_ops, edit_distance,
+                              estimate_similarity, intraline_spans, minhash_sketch, myers_diff, myers_diff_trace,
+                              render_ops)
+
+
+def random_pair(rng):
+    # 两侧字母表不同，覆盖只在一侧出现的行被丢弃的情况
+    a_alphabet = "abcdefgh"[:rng.randint(1, 8)]
+    b_alphabet = "abcdefgh"[rng.randint(0, 4):]
+    a = [rng.choice(a_alphabet) for _ in range(rng.randint(0, 40))]
+    b = [rng.choice(b_alphabet) for _ in range(rng.randint(0, 40))]
+    return a, b
+
+
+def assert_reconstructs(a, b, ops):
+    lines = render_ops(a, b, ops)
+    assert [line[2:] for line in lines if line[0] != OP_INSERT] == a
+    assert [line[2:] for line in lines if line[0] != OP_DELETE] == b
+
+
+def test_linear_myers_matches_trace_edit_distance():
+    rng = random.Random(0)
+    for _ in range(500):
+        a, b = random_pair(rng)
+        assert edit_distance(myers_diff(a, b)) == edit_distance(myers_diff_trace(a, b)), (a, b)
+
+
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+def test_edit_script_reconstructs_both_sides(algorithm):
+    rng = random.Random(1)
+    for _ in range(300):
+        a, b = random_pair(rng)
+        # 开销上限很小时提前分割，结果同样必须能还原
+        for budget in (None, DiffBudget(max_cost=1, scale=False)):
+            assert_reconstructs(a, b, diff_ops(a, b, algorithm=algorithm, budget=budget))
+
+
+def test_similarity_estimate():
+    rng = random.Random(2)
+    base = array('i', [rng.randrange(100) for _ in range(5000)])
+    edited = array('i', base)
+    for _ in range(100):
+        edited[rng.randrange(len(edited))] = rng.randrange(100)
+    other = array('i', [rng.randrange(100) for _ in range(5000)])
+    assert estimate_similarity(minhash_sketch(base), minhash_sketch(base)) == 1.0
+    assert estimate_similarity(minhash_sketch(base), minhash_sketch(edited)) > 0.8
+    assert estimate_similarity(minhash_sketch(base), minhash_sketch(other)) < MIN_SIMILARITY
+
+
+def test_unrelated_input_is_approximate_with_low_similarity_note():
+    # 大量重复行、整体无关的输入
+    rng = random.Random(3)
+    vocab = [f"line {i}" for i in range(50)] + ["", "}"] * 10
+    a = [rng.choice(vocab) for _ in range(5000)]
+    b = [rng.choice(vocab) for _ in range(5000)]
+    budget = DiffBudget()
+    assert_reconstructs(a, b, diff_ops(a, b, budget=budget))
+    assert budget.approximate and budget.low_similarity and budget.similarity < MIN_SIMILARITY
+    assert "差异很多" in budget.note()
+
+
+def test_cost_limit_scales_with_input():
+    rng = random.Random(4)
+    a = [f"line {rng.randrange(200)}" for _ in range(20000)]
+    b = list(a)
+    for _ in range(1000):
+        b[rng.randrange(len(b))] = f"line {rng.randrange(200)}"
+    budget = DiffBudget()
+    ops = diff_ops(a, b, budget=budget)
+    assert budget.cost_limit > DiffBudget().max_cost and not budget.low_similarity
+    # 只改动了少量行，放宽后的上限足以算出最短差异
+    assert not budget.approximate and budget.note() is None
+    assert edit_distance(render_ops(a, b, ops)) == edit_distance(myers_diff(a, b))
+
+
+def test_cost_limit_alone_gives_neutral_note():
+    rng = random.Random(5)
+    a = [rng.choice("abcd") for _ in range(200)]
+    b = [rng.choice("abcd") for _ in range(200)]
+    budget = DiffBudget(max_cost=2, scale=False)
+    assert_reconstructs(a, b, diff_ops(a, b, budget=budget))
+    assert budget.approximate and not budget.low_similarity
+    assert budget.note() and "差异很多" not in budget.note()
+
+
+def test_intraline_diff_is_not_recorded():
+    # 逐行的行内差异不计入文件差异的各阶段
+    perf.recorder.reset()
+    intraline_spans("a b c", "a x c")
+    assert perf.recorder.summary() == []
+    diff_ops(["a"], ["b"])
+    assert {stage["stage"] for stage in perf.recorder.summary()} >= {"hash", "diff"}
+
+
+@pytest.mark.parametrize("algorithm", ALGORITHMS)
+def test_long_chain_of_sub_problems(algorithm):
+    # 相邻的唯一行两两交换：每次分割只去掉一小段，子问题的串联长度超过递归深度上限
+    count = 2 * sys.getrecursionlimit() + 500
+    a = [f"line {i}" for i in range(count)]
+    b = list(a)
+    for i in range(0, count - 1, 2):
+        b[i], b[i + 1] = b[i + 1], b[i]
+    ops = diff_ops(a, b, algorithm=algorithm)
+    assert_reconstructs(a, b, ops)
+    assert edit_distance(render_ops(a, b, ops)) == count
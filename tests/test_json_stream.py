@@ -0,0 +1,42 @@
+import io
+import json
+import random
+
+import pytest
+
+from tool.json_stream import JSONFormatError, iter_pretty_json, pretty_json, read_chunks
+
+
+def random_value(rng, depth=0):
+    kind = rng.randrange(7 if depth < 4 else 4)
+    if kind == 0:
+        return rng.choice([True, False, None])
+    if kind == 1:
+        return rng.choice([0, -1, 12345, 1.5, -2.5e-8])
+    if kind in (2, 3):
+        return "".join(rng.choice('ab"\\\n/é') for _ in range(rng.randrange(6)))
+    if kind in (4, 5):
+        return [random_value(rng, depth + 1) for _ in range(rng.randrange(4))]
+    return {str(i): random_value(rng, depth + 1) for i in range(rng.randrange(4))}
+
+
+def test_matches_json_dumps_and_chunked_input():
+    rng = random.Random(0)
+    for _ in range(2000):
+        value = random_value(rng)
+        compact = json.dumps(value)
+        expected = json.dumps(value, indent=4)
+        assert pretty_json(compact) == expected, compact
+        spaced = json.dumps(value, indent=rng.randrange(3))
+        for size in (1, 3, 7):
+            assert "".join(iter_pretty_json(read_chunks(io.StringIO(spaced), size))) == expected
+
+
+@pytest.mark.parametrize("bad", ['{"a" 1}', '[1, 2', '[1,]', '{"a": 1,\n  "b": tru}', '[1]\n 2', '{"a": 01}', '',
+                                 '{1: 2}', '[1}'])
+@pytest.mark.parametrize("chunked", [False, True])
+def test_error_position(bad, chunked):
+    source = read_chunks(io.StringIO(bad), 2) if chunked else bad
+    with pytest.raises(JSONFormatError) as info:
+        pretty_json(source)
+    assert 0 <= info.value.pos <= len(bad) and info.value.lineno >= 1 and info.value.colno >= 1
@@ -0,0 +1,44 @@
+import pytest
+
+from tool.language_detect import HEAD_SIZE, TAIL_SIZE, LanguageDetector, sample_text, score_languages
+
+SAMPLES = {
+    '{"a": [1, 2], "b": null}': "JSON",
+    '[\n  {"id": 1}\n]': "JSON",
+    '<?xml version="1.0"?><a><b/></a>': "XML",
+    '<root>\n  <item>1</item>\n</root>': "XML",
+    'import os\n\ndef main():\n    print(os.getcwd())\n': "Python",
+    'class A:\n    def f(self):\n        return self.x\n': "Python",
+    '#include <stdio.h>\n\nint main(void) {\n    printf("hi");\n    return 0;\n}\n': "C",
+    '#include <iostream>\n\nint main() {\n    std::cout << "hi" << std::endl;\n}\n': "C++",
+    'package com.example;\n\nimport java.util.List;\n\npublic class A {\n}\n': "Java",
+    'public class Main {\n    public static void main(String[] args) {\n        System.out.println(1);\n    }\n}\n': "Java",
+    'package main\n\nimport "fmt"\n\nfunc main() {\n\tx := 1\n\tfmt.Println(x)\n}\n': "Go",
+    'SELECT id, name FROM users WHERE id = 1;': "SQL",
+    'create table t (id int);': "SQL",
+    'name: demo\nversion: 1\nitems:\n  - a\n  - b\n': "YAML",
+    'key: value': "YAML",
+    'hello world\nthis is text': "Plain Text",
+    '': "Plain Text",
+}
+
+
+@pytest.mark.parametrize("text, expected", SAMPLES.items())
+def test_detect(text, expected):
+    assert LanguageDetector().detect(text) == expected, score_languages(text)
+
+
+def test_large_text_only_samples_head_and_tail():
+    # 检测耗时与文本长度无关：只对开头和结尾打分
+    large = "import os\n" * 1_000_000
+    assert len(sample_text(large)) == HEAD_SIZE + 1 + TAIL_SIZE
+    assert LanguageDetector().detect(large) == "Python"
+
+
+def test_result_cached_by_head():
+    detector = LanguageDetector()
+    head = "import os\n" * (HEAD_SIZE // 10 + 1)
+    assert detector.detect(head) == "Python"
+    # 开头不变时不再重新检测
+    assert detector.detect(head + "SELECT id FROM t;\n" * 1000) == "Python"
+    assert detector.detect('{"a": 1}') == "JSON"
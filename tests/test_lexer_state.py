@@ -0,0 +1,48 @@
+import pytest
+from pygments import lexers
+from pygments.lexer import RegexLexer
+
+from tool.lexer_state import ROOT_STACK, lex_with_state, supports_state
+
+SAMPLES = {
+    "python": 'def f():\n    """doc\n    string"""\n    return 1  # c\nx = """a\n\nb"""\n',
+    "xml": '<a x="1">\n<!-- c\nmore -->\n<?pi x?>\n</a>\n',
+    "c": '/* a\n b */ int main(void) {\n  return "s\\\n";\n}\n',
+    "java": 'class A { /* x\n y */ int f() { return 1; } }\n',
+    "go": 'func main() {\n\ts := `raw\nstring`\n}\n',
+    "sql": "select 'a\nb' from t;\n",
+}
+
+
+def token_types(tokens, length):
+    """每个字符的 token 类型"""
+    types = [None] * length
+    for pos, ttype, value in tokens:
+        types[pos:pos + len(value)] = [ttype] * len(value)
+    return types[:length]
+
+
+@pytest.mark.parametrize("name", SAMPLES)
+def test_line_by_line_matches_whole_text(name):
+    code = SAMPLES[name]
+    lexer = lexers.get_lexer_by_name(name)
+    assert supports_state(lexer)
+    expected = token_types(RegexLexer.get_tokens_unprocessed(lexer, code), len(code))
+    collected = []
+    stack, pos, start = ROOT_STACK, 0, 0
+    for line in code.splitlines(True):
+        start += len(line)
+        if pos < start:
+            tokens, stack, pos = lex_with_state(lexer, code, stack, pos, start)
+            collected.extend(tokens)
+    assert token_types(collected, len(code)) == expected
+
+
+def test_stops_at_token_boundary_with_state():
+    code = 'x = """a\nb"""\n'
+    lexer = lexers.get_lexer_by_name("python")
+    tokens, stack, pos = lex_with_state(lexer, code, stop=code.index("\n"))
+    # 停在多行字符串内部，状态栈记录了还没结束的字符串
+    assert pos == code.index("\n") and len(stack) > 1
+    rest, stack, pos = lex_with_state(lexer, code, stack, pos)
+    assert pos == len(code) and stack == ROOT_STACK
@@ -0,0 +1,30 @@
+from tool.line_index import MappedLines, build_line_index
+
+
+def test_build_line_index():
+    assert list(build_line_index(b"")) == [0]
+    assert list(build_line_index(b"a\nb\n")) == [0, 2, 4]
+    assert list(build_line_index(b"a\nb")) == [0, 2, 3]
+    # 单独的 \r 不分行
+    assert list(build_line_index(b"a\rb\n")) == [0, 4]
+
+
+def test_mapped_lines(tmp_path):
+    path = tmp_path / "lines.txt"
+    path.write_bytes(b"one\r\ntwo\n\nfour\xff\rstill four")
+    lines = MappedLines(str(path))
+    try:
+        assert list(lines) == ["one", "two", "", "four�\rstill four"]
+        assert lines[-1] == lines[3] and len(lines) == 4
+        keys = list(lines.iter_keys())
+        assert len(set(keys)) == 4 and all(len(key) == 16 for key in keys)
+    finally:
+        lines.close()
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    lines = MappedLines(str(path))
+    assert len(lines) == 0 and list(lines) == []
+    lines.close()
@@ -0,0 +1,36 @@
+import random
+
+from tool.merge3 import merge_lines
+
+BASE = ["a", "b", "c", "d", "e"]
+
+
+def test_non_conflicting_changes_merged():
+    ours = ["a", "B", "c", "d", "e"]
+    theirs = ["a", "b", "c", "d", "E", "f"]
+    assert merge_lines(BASE, ours, theirs) == (["a", "B", "c", "d", "E", "f"], 0)
+    assert merge_lines(BASE, ours, ours) == (ours, 0)
+    # 两侧删除相同的行
+    assert merge_lines(BASE, ["a", "c", "d", "e"], ["a", "c", "d", "e"]) == (["a", "c", "d", "e"], 0)
+    assert merge_lines([], ["x"], []) == (["x"], 0)
+
+
+def test_conflict_markers():
+    assert merge_lines(BASE, ["a", "x", "c", "d", "e"], ["a", "y", "c", "d", "e"], show_base=False) == (
+        ["a", "<<<<<<< ours", "x", "=======", "y", ">>>>>>> theirs", "c", "d", "e"], 1)
+    assert merge_lines(BASE, ["a", "x", "c"], ["a", "y", "c"])[1] == 1
+
+
+def test_one_sided_edits_random():
+    # 只改一侧时结果等于该侧；没有冲突时不输出冲突标记
+    rng = random.Random(0)
+    for _ in range(300):
+        base = [rng.choice("abcdef") for _ in range(rng.randrange(30))]
+        edited = [line for line in base if rng.random() > 0.2]
+        for _ in range(rng.randrange(4)):
+            edited.insert(rng.randrange(len(edited) + 1), rng.choice("xyz"))
+        assert merge_lines(base, edited, base) == (edited, 0), (base, edited)
+        assert merge_lines(base, base, edited) == (edited, 0), (base, edited)
+        other = [rng.choice("abcdefxyz") for _ in range(rng.randrange(30))]
+        merged, conflicts = merge_lines(base, edited, other, algorithm=rng.choice(["myers", "patience", "histogram"]))
+        assert conflicts or all(not line.startswith(("<<<<<<<", ">>>>>>>")) for line in merged)
@@ -0,0 +1,68 @@
+import json
+import pstats
+import threading
+import time
+
+import pytest
+
+from tool import perf
+from tool.perf import Recorder
+
+
+def test_nested_spans_and_threads():
+    recorder = Recorder(max_spans=5)
+    with recorder.span("outer", 10):
+        with recorder.span("inner") as inner:
+            # 事先不知道大小时在块内设置
+            inner.size = sum(1 for _ in range(3))
+    threads = [threading.Thread(target=lambda: [recorder.record("thread", time.perf_counter(), 0.001)
+                                                for _ in range(100)])
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    summary = {stage["stage"]: stage for stage in recorder.summary()}
+    assert summary["thread"]["count"] == 400 and summary["outer"]["last_size"] == 10
+    assert summary["inner"]["last_size"] == 3
+    assert summary["outer"]["total_ms"] >= summary["inner"]["total_ms"]
+    assert len(recorder.recent()) == 5
+
+
+def test_span_recorded_when_block_raises():
+    recorder = Recorder()
+    with pytest.raises(KeyError):
+        with recorder.span("failing", 1):
+            raise KeyError
+    assert [stage["stage"] for stage in recorder.summary()] == ["failing"]
+
+
+def test_dump_trace_and_profile(tmp_path):
+    recorder = Recorder()
+    with pytest.raises(ValueError):
+        recorder.dump_profile(str(tmp_path / "empty.prof"))
+    recorder.profiling = True
+    with recorder.span("profiled"):
+        sorted(str(i) for i in range(50000))
+    trace_path = tmp_path / "trace.json"
+    recorder.dump_trace(str(trace_path))
+    trace = json.loads(trace_path.read_text(encoding="utf-8"))
+    assert trace["traceEvents"][0]["name"] == "profiled" and trace["summary"][0]["count"] == 1
+    profile_path = str(tmp_path / "trace.prof")
+    recorder.dump_profile(profile_path)
+    assert pstats.Stats(profile_path).total_calls > 0
+
+
+def test_reset_bumps_version():
+    recorder = Recorder()
+    recorder.record("a", 0.0, 0.001)
+    version = recorder.version
+    recorder.reset()
+    assert recorder.version > version and recorder.summary() == [] and recorder.recent() == []
+
+
+def test_null_span_records_nothing():
+    version = perf.recorder.version
+    with perf.null_span("skipped", 3) as info:
+        info.size = 4
+    assert perf.recorder.version == version
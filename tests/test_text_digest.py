@@ -0,0 +1,29 @@
+import random
+
+from tool.text_digest import common_affix_lengths
+
+
+def naive_affix_lengths(a, b):
+    limit = min(len(a), len(b))
+    prefix = 0
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and a[-suffix - 1] == b[-suffix - 1]:
+        suffix += 1
+    return prefix, suffix
+
+
+def test_common_affix_lengths_random():
+    rng = random.Random(0)
+    for _ in range(500):
+        base = "".join(rng.choice("ab\n") for _ in range(rng.randrange(60)))
+        start = rng.randrange(len(base) + 1)
+        end = rng.randrange(start, len(base) + 1)
+        edited = base[:start] + "".join(rng.choice("abc") for _ in range(rng.randrange(5))) + base[end:]
+        assert common_affix_lengths(base, edited, block=4) == naive_affix_lengths(base, edited)
+
+
+def test_prefix_and_suffix_do_not_overlap():
+    assert common_affix_lengths("aaaa", "aa") == (2, 0)
+    assert common_affix_lengths("x" * 10000 + "1", "x" * 10000 + "2") == (10000, 0)
@@ -0,0 +1,113 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from tool.timestamp_convert import MIN_SECONDS, TimestampConverter, convert_text, load_numpy
+
+numpy = load_numpy()
+needs_numpy = pytest.mark.skipif(numpy is None, reason="需要 NumPy")
+
+CASES = {
+    "0": "1970-01-01T00:00:00Z",
+    "1700000000": "2023-11-14T22:13:20Z",
+    "1700000000123": "2023-11-14T22:13:20.123Z",
+    "1700000000123456": "2023-11-14T22:13:20.123456Z",
+    "1700000000123456789": "2023-11-14T22:13:20.123456789Z",
+    "-1": "1969-12-31T23:59:59Z",
+    "-1.5": "1969-12-31T23:59:58.500Z",
+    "-1700000000000": "1916-02-18T01:46:40.000Z",
+    "1700000000.5": "2023-11-14T22:13:20.500Z",
+    "1700000000.25": "2023-11-14T22:13:20.250Z",
+    "1700000000.1234": "2023-11-14T22:13:20.123400Z",
+    "2023-11-14T22:13:20Z": "1700000000",
+    "2023-11-14 22:13:20.999+00:00": "1700000000",
+    "2023-11-15T06:13:20+08:00": "1700000000",
+    "2023-11-14T17:13:20-0500": "1700000000",
+    "2023-11-14": "1699920000",
+}
+
+
+def convert_plain(converter, text):
+    output, errors = converter.convert_lines(text.splitlines())
+    return "\n".join(output), errors
+
+
+@pytest.mark.parametrize("source, expected", CASES.items())
+def test_convert_line(source, expected):
+    assert TimestampConverter().convert_line(source) == expected
+
+
+def test_output_unit():
+    assert TimestampConverter(unit="ns").convert_line("2023-11-14T22:13:20.123456789Z") == "1700000000123456789"
+    assert TimestampConverter(unit="ms").convert_line("1969-12-31T23:59:59.5Z") == "-500"
+
+
+def test_local_time_round_trip():
+    local = TimestampConverter(local=True)
+    text = local.convert_line("1700000000")
+    assert text[19] in "+-" and local.convert_line(text) == "1700000000"
+
+
+def test_convert_text_reports_error_lines():
+    output, errors = convert_text("1700000000\n\nhello\n2023-11-14T22:13:20Z\n" + "9" * 30)
+    assert output.split("\n") == ["2023-11-14T22:13:20Z", "", "", "1700000000", ""] and errors == [3, 5]
+
+
+@needs_numpy
+@pytest.mark.parametrize("scale", [1, 1000, 10 ** 6, 10 ** 9])
+@pytest.mark.parametrize("local_time", [False, True])
+def test_numpy_epochs_match_plain(scale, local_time):
+    # 整列同一精度的整数
+    rng = random.Random(scale)
+    column = "\n".join(str(rng.choice([1, -1]) * rng.randrange(10 ** 8, 4 * 10 ** 9) * scale + rng.randrange(scale))
+                       for _ in range(5000))
+    expected = convert_plain(TimestampConverter(local_time), column)
+    assert TimestampConverter(local_time).convert_epochs_numpy(numpy, column) == expected[0]
+
+
+@needs_numpy
+def test_numpy_utc_dates():
+    # 可表示范围的起点、世纪闰年前后、全范围随机值
+    rng = random.Random(0)
+    column = "\n".join(map(str, [MIN_SECONDS, 951782400, 951868800, 4107542400, -2208988800]
+                           + [rng.randrange(MIN_SECONDS, 10 ** 11) for _ in range(5000)]))
+    assert TimestampConverter().convert_epochs_numpy(numpy, column) == convert_plain(TimestampConverter(), column)[0]
+
+
+@needs_numpy
+@pytest.mark.parametrize("layout", ["{}T{}Z", "{} {}.{:03d}+08:00", "{}T{}.{:06d}-05:30", "{}T{}.{:09d}", "{}T{}.{}Z"])
+@pytest.mark.parametrize("unit", ["s", "ms", "ns"])
+def test_numpy_isos_match_plain(layout, unit):
+    rng = random.Random(layout + unit)
+    lines = []
+    for _ in range(5000):
+        # 纳秒精度只在 int64 的范围内走向量化路径
+        moment = (datetime(1700, 1, 1) + timedelta(seconds=rng.randrange(15778800000)) if unit == "ns"
+                  else datetime(1, 1, 1) + timedelta(seconds=rng.randrange(315537897600)))
+        date, clock = moment.isoformat().split("T")
+        lines.append(layout.format(date, clock, rng.randrange(10 ** 9 if "09d" in layout else 1000)))
+    column = "\n".join(lines)
+    expected = convert_plain(TimestampConverter(unit=unit), column)
+    result = TimestampConverter(unit=unit).convert_isos_numpy(numpy, column)
+    # 小数位数不固定时各行长度不同，交给逐行转换
+    assert result == (expected[0] if layout != "{}T{}.{}Z" else None)
+
+
+@needs_numpy
+@pytest.mark.parametrize("column", ["2023-02-29T00:00:00Z\n2023-01-01T00:00:00Z", "1700000000\n1700000000000", "1\n\n2"])
+def test_numpy_falls_back_to_lines(column):
+    # 无效日期、混合精度、空行交给逐行转换
+    assert TimestampConverter().convert_epochs_numpy(numpy, column) is None
+    assert TimestampConverter().convert_isos_numpy(numpy, column) is None
+
+
+@pytest.mark.parametrize("lines, sample", [
+    ([str(1700000000000 + i * 37) for i in range(200000)], "2023-11-14T22:13:20.037Z"),
+    ([f"2023-11-14T22:{i // 60000 % 60:02d}:{i // 1000 % 60:02d}.{i % 1000:03d}Z" for i in range(200000)],
+     "1699999200001"),
+])
+def test_large_text(lines, sample):
+    output, errors = TimestampConverter(unit="ms").convert_text("\n".join(lines))
+    assert not errors and output.split("\n", 2)[1] == sample
+    assert output.count("\n") == len(lines) - 1
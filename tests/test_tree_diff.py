@@ -0,0 +1,84 @@
+import os
+import time
+
+import pytest
+
+from tool.tree_diff import (STATUS_ADDED, STATUS_MODIFIED, STATUS_REMOVED, STATUS_UNCHANGED, HashCache, compare_trees,
+                            iter_diff_stats, tree_index)
+
+FILES = {
+    "same.txt": ("a\nb\n", "a\nb\n"),
+    "touched.txt": ("x\n", "x\n"),
+    "edited.txt": ("1\n2\n3\n", "1\n4\n3\n"),
+    "resized.txt": ("1\n", "1\n2\n"),
+    "sub/deep/old.txt": ("gone\n", None),
+    "sub/new.txt": (None, "n1\nn2\n"),
+    "bin.dat": ("\0\1", "\0\2"),
+}
+
+STATUSES = {
+    "same.txt": STATUS_UNCHANGED, "touched.txt": STATUS_UNCHANGED, "edited.txt": STATUS_MODIFIED,
+    "resized.txt": STATUS_MODIFIED, "sub/deep/old.txt": STATUS_REMOVED, "sub/new.txt": STATUS_ADDED,
+    "bin.dat": STATUS_MODIFIED,
+}
+
+
+@pytest.fixture
+def trees(tmp_path):
+    left_root = str(tmp_path / "left")
+    right_root = str(tmp_path / "right")
+    for rel, contents in FILES.items():
+        for root, content in zip((left_root, right_root), contents):
+            if content is not None:
+                path = os.path.join(root, rel)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w", encoding="utf-8", newline="\n") as f:
+                    f.write(content)
+    # 同样大小但修改时间不同，需要比较摘要
+    stamp = time.time_ns() - 10 ** 10
+    for rel in ("same.txt", "edited.txt", "bin.dat"):
+        os.utime(os.path.join(left_root, rel), ns=(stamp, stamp))
+    stamp += 10 ** 9
+    os.utime(os.path.join(left_root, "touched.txt"), ns=(stamp, stamp))
+    return left_root, right_root
+
+
+def test_compare_trees_with_hash_cache(trees, tmp_path):
+    left_root, right_root = trees
+    cache_path = str(tmp_path / "hashes.json")
+    cache = HashCache(cache_path)
+    assert compare_trees(left_root, right_root, cache) == STATUSES
+    cache.save()
+    # 第二次比较全部命中缓存
+    cache = HashCache(cache_path)
+    assert compare_trees(left_root, right_root, cache) == STATUSES and not cache.dirty
+
+
+def test_quick_check_skips_same_size_and_mtime(trees):
+    left_root, right_root = trees
+    # 大小和修改时间相同、内容不同的文件只在关闭快速检查时被发现
+    stamp = time.time_ns()
+    os.utime(os.path.join(left_root, "edited.txt"), ns=(stamp, stamp))
+    os.utime(os.path.join(right_root, "edited.txt"), ns=(stamp, stamp))
+    assert compare_trees(left_root, right_root)["edited.txt"] == STATUS_UNCHANGED
+    assert compare_trees(left_root, right_root, quick=False) == STATUSES
+
+
+def test_diff_stats_serial_and_parallel(trees):
+    left_root, right_root = trees
+    changed = sorted(rel for rel, status in STATUSES.items() if status != STATUS_UNCHANGED)
+    serial = list(iter_diff_stats(left_root, right_root, changed, jobs=1))
+    assert dict(serial) == {
+        "bin.dat": (-1, -1, "二进制文件"), "edited.txt": (1, 1, None), "resized.txt": (0, 1, None),
+        "sub/deep/old.txt": (1, 0, None), "sub/new.txt": (0, 2, None),
+    }
+    assert list(iter_diff_stats(left_root, right_root, changed, jobs=2)) == serial
+
+
+def test_tree_index():
+    children, dir_statuses = tree_index(STATUSES)
+    assert children[""] == [("sub", True), ("bin.dat", False), ("edited.txt", False), ("resized.txt", False),
+                            ("same.txt", False), ("touched.txt", False)]
+    assert children["sub"] == [("deep", True), ("new.txt", False)]
+    assert dir_statuses == {"": STATUS_MODIFIED, "sub": STATUS_MODIFIED, "sub/deep": STATUS_MODIFIED}
+    assert tree_index({"a/b.txt": STATUS_UNCHANGED})[1] == {"": STATUS_UNCHANGED, "a": STATUS_UNCHANGED}
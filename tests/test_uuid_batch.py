@@ -0,0 +1,193 @@
+import io
+import time
+import uuid
+
+import pytest
+
+from tool import uuid_batch
+from tool.uuid_batch import (BATCH_SIZE, GREGORIAN_OFFSET, RECORD_SIZE, SNOWFLAKE_EPOCH, SnowflakeGenerator,
+                             ULIDGenerator, UUID7Generator, format_uuids, generate_uuids, uuid4_bytes, write_uuids)
+
+MONOTONIC_KINDS = ("uuid7", "ulid", "snowflake")
+
+# 固定的时钟（毫秒）
+NOW_MS = 1_700_000_000_000
+
+
+def crockford_value(text):
+    return int(text.translate(str.maketrans("0123456789ABCDEFGHJKMNPQRSTVWXYZ",
+                                            "0123456789abcdefghijklmnopqrstuv")), 32)
+
+
+def sort_key(kind, value):
+    """按生成顺序应当严格递增的值"""
+    if kind == "uuid7":
+        return uuid.UUID(value).int
+    if kind == "ulid":
+        return crockford_value(value)
+    return int(value)
+
+
+def counter_key(kind, value):
+    """毫秒和计数器部分，逐个生成时依次加一（UUIDv7 去掉版本、变体和最后 32 位随机数）"""
+    if kind == "uuid7":
+        value = uuid.UUID(value).int
+        return (value >> 80) << 42 | ((value >> 64) & 0xFFF) << 30 | ((value >> 32) & 0x3FFFFFFF)
+    return sort_key(kind, value)
+
+
+def timestamp_ms(kind, value):
+    if kind == "uuid7":
+        return uuid.UUID(value).int >> 80
+    if kind == "ulid":
+        return crockford_value(value) >> 80
+    return (int(value) >> 22) + SNOWFLAKE_EPOCH
+
+
+def generate(generator, count):
+    text = generator.generate(count)
+    if isinstance(generator, UUID7Generator):
+        text = uuid_batch.format_uuids(text)
+    return text.decode("ascii").splitlines()
+
+
+def assert_strictly_increasing(kind, values):
+    keys = [sort_key(kind, value) for value in values]
+    assert all(x < y for x, y in zip(keys, keys[1:]))
+
+
+@pytest.fixture
+def frozen_clock(monkeypatch):
+    """让生成器看到的时钟停在 NOW_MS"""
+    monkeypatch.setattr(uuid_batch.time, "time_ns", lambda: NOW_MS * 1_000_000 + 123)
+
+
+@pytest.mark.parametrize("kind", MONOTONIC_KINDS)
+def test_multi_million_batches_sorted_and_unique(kind):
+    buffer = io.BytesIO()
+    total = 0
+    for count in (1, 5, 2_000_000, BATCH_SIZE + 7, 1):
+        total += write_uuids(buffer, kind, count)
+    lines = buffer.getvalue().splitlines()
+    assert len(lines) == total
+    if kind == "snowflake":
+        keys = list(map(int, lines))
+    else:
+        # 定宽文本，字典序与数值顺序相同
+        keys = lines
+    assert all(x < y for x, y in zip(keys, keys[1:]))
+    assert len(set(keys)) == total
+
+
+@pytest.mark.parametrize("make, kind", [(UUID7Generator, "uuid7"), (ULIDGenerator, "ulid"),
+                                        (SnowflakeGenerator, "snowflake")])
+def test_same_millisecond_across_calls(frozen_clock, make, kind):
+    generator = make()
+    first = generate(generator, 3)
+    second = generate(generator, 3)
+    values = first + second
+    assert {timestamp_ms(kind, value) for value in values} == {NOW_MS}
+    keys = [counter_key(kind, value) for value in values]
+    # 同一毫秒内继续计数
+    assert keys == list(range(keys[0], keys[0] + 6))
+
+
+@pytest.mark.parametrize("make, kind, attribute, limit", [
+    (UUID7Generator, "uuid7", "counter", 1 << UUID7Generator.COUNTER_BITS),
+    (ULIDGenerator, "ulid", "randomness", 1 << ULIDGenerator.RANDOM_BITS),
+    (SnowflakeGenerator, "snowflake", "sequence", 1 << SnowflakeGenerator.SEQUENCE_BITS),
+])
+def test_counter_overflow_borrows_next_millisecond(frozen_clock, make, kind, attribute, limit):
+    generator = make()
+    generate(generator, 1)
+    setattr(generator, attribute, limit - 3)
+    values = generate(generator, 10)
+    assert_strictly_increasing(kind, values)
+    assert [timestamp_ms(kind, value) for value in values] == [NOW_MS] * 3 + [NOW_MS + 1] * 7
+    # 借用的毫秒之后时钟仍未前进，继续在借用的毫秒内计数
+    more = generate(generator, 2)
+    assert_strictly_increasing(kind, values + more)
+    assert {timestamp_ms(kind, value) for value in more} == {NOW_MS + 1}
+
+
+@pytest.mark.parametrize("make, kind", [(UUID7Generator, "uuid7"), (ULIDGenerator, "ulid"),
+                                        (SnowflakeGenerator, "snowflake")])
+def test_clock_behind_last_millisecond(frozen_clock, make, kind):
+    generator = make()
+    generator.last_ms = NOW_MS + 1000
+    values = generate(generator, 5)
+    assert {timestamp_ms(kind, value) for value in values} == {NOW_MS + 1000}
+    assert_strictly_increasing(kind, values)
+
+
+def test_new_millisecond_starts_with_headroom(monkeypatch):
+    clock = [NOW_MS]
+    monkeypatch.setattr(uuid_batch.time, "time_ns", lambda: clock[0] * 1_000_000)
+    uuid7 = UUID7Generator()
+    ulid = ULIDGenerator()
+    for _ in range(50):
+        clock[0] += 1
+        uuid7.generate(1)
+        ulid.generate(1)
+        assert 1 <= uuid7.counter <= 1 << (UUID7Generator.COUNTER_BITS - 1)
+        assert 1 <= ulid.randomness <= 1 << (ULIDGenerator.RANDOM_BITS - 1)
+
+
+def test_ulid_low_bits_wrap_within_segment(frozen_clock):
+    generator = ULIDGenerator()
+    generate(generator, 1)
+    generator.randomness = (1 << 40) - 2
+    values = generate(generator, 4)
+    assert [crockford_value(value) - crockford_value(values[0]) for value in values] == [0, 1, 2, 3]
+
+
+def test_numpy_and_plain_formatting_match():
+    raw = uuid4_bytes(5000)
+    assert format_uuids(raw) == format_uuids(raw, use_numpy=False)
+
+
+@pytest.mark.parametrize("kind, version", [("uuid1", 1), ("uuid4", 4), ("uuid7", 7)])
+def test_uuid_version_and_variant(kind, version):
+    values = generate_uuids(kind, 200000)
+    parsed = [uuid.UUID(value) for value in values]
+    assert all(u.version == version and u.variant == uuid.RFC_4122 for u in parsed)
+    assert all(str(u) == value for u, value in zip(parsed, values))
+    assert len(set(values)) == len(values)
+    if kind == "uuid1":
+        times = [u.time for u in parsed]
+        assert times == sorted(times) and parsed[0].node == uuid.getnode()
+
+
+def test_uuid1_timestamp_low_bits_wrap(monkeypatch):
+    # 时间戳低 32 位在批内回绕
+    monkeypatch.setattr(uuid_batch, "last_timestamp",
+                        (((time.time_ns() // 100 + GREGORIAN_OFFSET) >> 32) + 1 << 32) - 6)
+    times = [uuid.UUID(value).time for value in generate_uuids("uuid1", 10)]
+    assert times == list(range(times[0], times[0] + 10)) and times[5] & 0xFFFFFFFF == 0
+
+
+def test_timestamps_follow_clock(frozen_clock):
+    assert timestamp_ms("uuid7", generate(UUID7Generator(), 1)[0]) == NOW_MS
+    values = generate(ULIDGenerator(), 1000)
+    assert all(len(value) == 26 and value[0] <= "7" for value in values)
+    assert timestamp_ms("ulid", values[0]) == NOW_MS
+    value = int(generate(SnowflakeGenerator(worker_id=5), 1)[0])
+    assert timestamp_ms("snowflake", str(value)) == NOW_MS and (value >> 12) & 1023 == 5
+
+
+def test_snowflake_worker_id_range():
+    with pytest.raises(ValueError):
+        SnowflakeGenerator(worker_id=1024)
+
+
+def test_write_uuids_reports_progress():
+    buffer = io.BytesIO()
+    seen = []
+    assert write_uuids(buffer, "uuid4", BATCH_SIZE * 2 + 5, seen.append) == BATCH_SIZE * 2 + 5
+    assert seen == [BATCH_SIZE, BATCH_SIZE * 2, BATCH_SIZE * 2 + 5]
+    assert len(buffer.getvalue()) == RECORD_SIZE * (BATCH_SIZE * 2 + 5)
+
+
+def test_unknown_kind():
+    with pytest.raises(ValueError):
+        generate_uuids("uuid3", 1)
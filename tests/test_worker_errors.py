@@ -0,0 +1,21 @@
+from tool.worker_errors import error_message
+
+
+def raise_and_describe(exception):
+    try:
+        raise exception
+    except Exception as e:
+        return error_message(e)
+
+
+def test_expected_errors_keep_message(capsys):
+    assert raise_and_describe(FileNotFoundError(2, "No such file", "x.txt")) == "[Errno 2] No such file: 'x.txt'"
+    assert raise_and_describe(ValueError("bad input")) == "bad input"
+    assert capsys.readouterr().err == ""
+
+
+def test_unexpected_errors_show_type_and_traceback(capsys):
+    assert raise_and_describe(KeyError("foo")) == "KeyError: 'foo'"
+    assert raise_and_describe(IndexError()) == "IndexError"
+    err = capsys.readouterr().err
+    assert "Traceback" in err and "KeyError" in err
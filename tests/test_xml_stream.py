@@ -0,0 +1,48 @@
+import random
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from tool.xml_stream import XMLFormatError, iter_pretty_xml, pretty_xml
+
+
+def random_element(rng, depth=0):
+    elem = ET.Element(rng.choice("abc"), {k: rng.choice(['1', 'x"y', 'a&b\n']) for k in rng.sample("pq", rng.randrange(3))})
+    elem.text = rng.choice([None, "", " ", "\n  ", "text", "a < b"])
+    if depth < 4:
+        for _ in range(rng.randrange(4)):
+            child = random_element(rng, depth + 1)
+            child.tail = rng.choice([None, "", "\n", "tail", " & "])
+            elem.append(child)
+    return elem
+
+
+def test_matches_element_tree_indent():
+    # 不含注释和命名空间时与 ET.indent + ET.tostring 的结果一致，分块输入与整体输入一致
+    rng = random.Random(0)
+    for _ in range(3000):
+        source = ET.tostring(random_element(rng), encoding="unicode")
+        root = ET.fromstring(source)
+        ET.indent(root, space="  ")
+        expected = ET.tostring(root, encoding="unicode")
+        assert pretty_xml(source) == expected, source
+        size = rng.randrange(1, 20)
+        chunks = (source[i:i + size] for i in range(0, len(source), size))
+        assert "".join(iter_pretty_xml(chunks)) == expected
+
+
+def test_keeps_comments_namespaces_and_declaration():
+    sample = ('<?xml version="1.0"?>\n<!-- head -->\n<soap:Envelope xmlns:soap="urn:s" xmlns="urn:d">'
+              '<soap:Body><?pi data?><item xml:lang="en" soap:id="1"><!-- c --></item></soap:Body></soap:Envelope>')
+    assert pretty_xml(sample) == (
+        '<?xml version="1.0"?>\n<!-- head -->\n<soap:Envelope xmlns:soap="urn:s" xmlns="urn:d">\n'
+        '  <soap:Body>\n    <?pi data?>\n    <item xml:lang="en" soap:id="1">\n      <!-- c -->\n    </item>\n'
+        '  </soap:Body>\n</soap:Envelope>')
+    assert "".join(iter_pretty_xml(sample[i:i + 3] for i in range(0, len(sample), 3))) == pretty_xml(sample)
+
+
+@pytest.mark.parametrize("bad", ["<a><b></a>", "<a>", "<a></a><b/>", "text"])
+def test_error_position(bad):
+    with pytest.raises(XMLFormatError) as info:
+        pretty_xml(bad)
+    assert info.value.lineno >= 1 and info.value.colno >= 1
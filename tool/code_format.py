@@ -0,0 +1,64 @@
+import itertools
+
+from tool import perf
+from tool.json_stream import iter_pretty_json, read_chunks
+from tool.language_detect import LanguageDetector, PLAIN_TEXT
+from tool.xml_stream import iter_pretty_xml
+
+# 语言 -> Pygments 别名
+SUPPORTED_LANGUAGES = {
+    "XML": "xml",
+    "JSON": "json",
+    "Python": "python",
+    "C": "c",
+    "C++": "cpp",
+    "Java": "java",
+    "Go": "go",
+    "YAML": "yaml",
+    "SQL": "sql",
+    PLAIN_TEXT: "text"
+}
+
+
+def find_language(name):
+    """按语言名或 Pygments 别名查找语言（不区分大小写），找不到时抛出 ValueError"""
+    lowered = name.lower()
+    for language, alias in SUPPORTED_LANGUAGES.items():
+        if lowered in (language.lower(), alias):
+            return language
+    raise ValueError(f"不支持的语言: {name}")
+
+
+def iter_format_code(source, language):
+    """按块产出格式化后的文本，source 可以是字符串或字符串块的可迭代对象
+
+    JSON 和 XML 流式重排缩进，格式错误时抛出带位置的 ValueError 子类；其他语言原样输出
+    """
+    if language == "JSON":
+        return iter_pretty_json(source, indent=4)
+    if language == "XML":
+        return iter_pretty_xml(source, indent="  ")
+    return iter((source,)) if isinstance(source, str) else iter(source)
+
+
+def format_code(text, language):
+    """格式化整段文本"""
+    if not text.strip():
+        return ""
+    with perf.span("format", len(text)):
+        return "".join(iter_format_code(text, language))
+
+
+def format_stream(file, language=None):
+    """流式格式化文本文件对象，按块产出结果；未指定语言时按第一块内容检测
+
+    返回 (语言, 结果块迭代器)
+    """
+    chunks = read_chunks(file)
+    first = next(chunks, "")
+    if language is None:
+        language = LanguageDetector().detect(first)
+    if not first.strip() and language in ("JSON", "XML"):
+        return language, iter(())
+    return language, iter_format_code(itertools.chain((first,), chunks), language)
+
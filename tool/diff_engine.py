@@ -0,0 +1,745 @@
+import filecmp
+import heapq
+import re
+from array import array
+from bisect import bisect_left
+from math import isqrt
+
+from tool import perf
+from tool.line_index import MappedLines
+
+# 编辑操作标记
+OP_EQUAL = " "
+OP_DELETE = "-"
+OP_INSERT = "+"
+
+
+# 每次分割最多搜索的编辑步数，超过后在走得最远的位置直接分割；实际的上限随输入增大（见 DiffBudget.prepare）
+DEFAULT_MAX_COST = 256
+# 差异很多时总开销约为 上限 × 两侧行数，输入较小时按该值放宽上限，使其能算出最短的编辑序列
+MAX_WORK = 50_000_000
+# 估计的相似度低于 MIN_SIMILARITY 时使用更小的上限：差异很多时最短编辑序列没有意义，只需尽快给出结果
+MIN_SIMILARITY = 0.25
+LOW_SIMILARITY_MAX_COST = 32
+# 中间部分的总行数达到该值时才估计相似度，更小的输入直接计算
+PRESCREEN_MIN_LINES = 2000
+# 相似度草图：每 SHINGLE_SIZE 个相邻行组成一个片段，保留哈希最小的 SKETCH_SIZE 个片段
+SHINGLE_SIZE = 3
+SKETCH_SIZE = 256
+
+
+class DiffCancelled(Exception):
+    """在进度回调中抛出，用于中断正在进行的差异计算"""
+
+
+def minhash_sketch(ids, size=SKETCH_SIZE, shingle=SHINGLE_SIZE):
+    """序列的 MinHash 草图（bottom-k）：相邻 shingle 行组成的片段取哈希后最小的 size 个值，升序排列
+
+    元组的哈希已经充分混合，直接作为 MinHash 的随机排列
+    """
+    if len(ids) < shingle:
+        shingles = [tuple(ids)] if len(ids) else []
+    else:
+        shingles = zip(*(ids[i:] for i in range(shingle)))
+    return heapq.nsmallest(size, set(map(hash, shingles)))
+
+
+def estimate_similarity(sketch_a, sketch_b, size=SKETCH_SIZE):
+    """由两个草图估计片段集合的 Jaccard 相似度：并集中最小的 size 个值里两侧都有的比例"""
+    if not sketch_a or not sketch_b:
+        return 1.0 if not sketch_a and not sketch_b else 0.0
+    both = set(sketch_a).intersection(sketch_b)
+    union = heapq.nsmallest(size, set(sketch_a).union(sketch_b))
+    return sum(1 for value in union if value in both) / len(union)
+
+
+class DiffBudget:
+    """限制差异计算的开销，差异很多的大输入也能在有限时间内给出结果
+
+    Myers 算法在某次分割中搜索超过 max_cost 步时，改在走得最远的位置分割（与 GNU diff、git 的做法相同），
+    结果仍能还原出两侧的内容，但不一定是最短的编辑序列；max_cost 为 None 时不限制。
+    scale 为 True 时实际的上限 cost_limit 取 max_cost、sqrt(N+M)（与 xdiff 相同）和 MAX_WORK / (N+M) 中最大的，
+    否则固定为 max_cost。
+    计算前用 MinHash 草图估计相似度，低于 min_similarity 时上限改为 low_similarity_cost。
+    计算后 similarity 为估计的相似度（输入较小时不估计，为 None），low_similarity 表示是否因相似度低收紧了上限，
+    approximate 表示是否提前分割过
+    """
+
+    def __init__(self, max_cost=DEFAULT_MAX_COST, min_similarity=MIN_SIMILARITY,
+                 low_similarity_cost=LOW_SIMILARITY_MAX_COST, scale=True):
+        self.max_cost = max_cost
+        self.scale = scale
+        self.min_similarity = min_similarity
+        self.low_similarity_cost = low_similarity_cost
+        self.cost_limit = max_cost
+        self.similarity = None
+        self.low_similarity = False
+        self.approximate = False
+
+    def prepare(self, a, b):
+        """按输入确定本次计算的开销上限，a、b 为中间部分的行 ID"""
+        self.similarity = None
+        self.low_similarity = False
+        self.approximate = False
+        if self.max_cost is None:
+            self.cost_limit = None
+            return
+        total = len(a) + len(b)
+        self.cost_limit = max(self.max_cost, isqrt(total), MAX_WORK // max(total, 1)) if self.scale else self.max_cost
+        if total < PRESCREEN_MIN_LINES:
+            return
+        self.similarity = estimate_similarity(minhash_sketch(a), minhash_sketch(b))
+        if self.similarity < self.min_similarity:
+            self.low_similarity = True
+            self.cost_limit = min(self.max_cost, self.low_similarity_cost)
+
+    def note(self):
+        """说明结果为什么可能不是最短的编辑序列，结果是精确的时返回 None"""
+        if not self.approximate:
+            return None
+        if self.low_similarity:
+            return f"两侧差异很多（估计相似度 {self.similarity:.0%}），为限制耗时给出的是近似结果，不一定是最短的差异"
+        return "为限制耗时在部分位置提前分割，结果可能不是最短的差异"
+
+
+def reconstruct(a, b, trace):
+    if not trace:
+        return []
+
+    x, y = len(a), len(b)
+    result = []
+
+    for d in range(len(trace) - 1, -1, -1):
+        current_v = trace[d]
+        k = x - y
+
+        # 获取前一步的k值
+        if d == 0:
+            prev_k = None  # d=0时无前一步
+        else:
+            if k == -d:
+                prev_k = k + 1  # 边界情况：最左侧只能从k+1来
+            elif k == d:
+                prev_k = k - 1  # 边界情况：最右侧只能从k-1来
+            else:
+                # 使用d-1步的v数据进行比较
+                prev_v = trace[d - 1]
+                # 比较prev_v中k-1和k+1的值
+                val_km1 = prev_v.get(k - 1, float('-inf'))
+                val_kp1 = prev_v.get(k + 1, float('-inf'))
+                if val_km1 < val_kp1:
+                    prev_k = k + 1  # 从上方移动（插入）
+                else:
+                    prev_k = k - 1  # 从左侧移动（删除）
+
+        # 计算前一步的坐标
+        if d > 0:
+            prev_x = trace[d - 1][prev_k]
+            prev_y = prev_x - prev_k
+        else:
+            prev_x, prev_y = 0, 0  # d=0时起点为(0,0)
+
+        # 回溯对角线（相同元素）
+        while x > prev_x and y > prev_y:
+            result.append("  " + a[x - 1])
+            x -= 1
+            y -= 1
+
+        # 回溯非对角线移动（插入/删除）
+        if d > 0:
+            if prev_x == x:
+                result.append("+ " + b[prev_y])  # 插入
+            else:
+                result.append("- " + a[prev_x])  # 删除
+            x, y = prev_x, prev_y  # 更新为前一步坐标
+
+    result.reverse()
+    return result
+
+
+def myers_diff_trace(a, b):
+    """基于完整 trace 回溯的 Myers 算法，内存 O(D²)，保留作为参考实现"""
+    N, M = len(a), len(b)
+    max_edit = N + M
+
+    # 记录每一步到达的位置
+    trace = []
+
+    # v - 记录该 k 线上到达的最远的 x 坐标
+    v = {1: 0}
+    for d in range(0, max_edit + 1):
+        current_v = {}
+        # 从起点出发走出 d 步时，它只可能落在 k={-d, -d+2, ...., d-2, d} 的 k 线上
+        # 循环，计算这一步可能落在的每条 k 线上的最远位置，直到碰到终点为止
+        for k in range(-d, d + 1, 2):
+
+            # 选择前一步 v 中 k 线上走得最远的 x
+            # k == -d: 最左边的对角线，没有 k-1，只能从 k+1 下移过来
+            # 如果当前不是最右边的对角线（否则没有 k+1）比较 v[k - 1] 和 v[k + 1]，谁的 x 更小
+            if k == -d or (k != d and v.get(k - 1, -1) < v.get(k + 1, -1)):
+                # 对 a 插入操作，向下移动 x 坐标不变
+                x = v.get(k + 1, 0)
+            else:
+                # 对 a 删除操作 +1 表示向右移动，删除元素
+                x = v.get(k - 1, 0) + 1
+            # 通过 k 推算出 y 坐标
+            y = x - k
+            # 斜对角移动
+            while x < N and y < M and a[x] == b[y]:
+                x += 1
+                y += 1
+
+            current_v[k] = x
+
+            # 找到最短编辑序列，结束搜索并且构造差异序列
+            if x >= N and y >= M:
+                trace.append(current_v)
+                return reconstruct(a, b, trace)
+
+        trace.append(current_v)
+        v = current_v
+
+    return []
+
+
+def _bounded_split(vf, vb, offset, d, n, m):
+    """搜索超过上限时的分割点：两个方向中离各自起点最远的位置，找不到有效位置时返回 None"""
+    best, split = 0, None
+    for k in range(-d, d + 1, 2):
+        x = vf[offset + k]
+        y = x - k
+        if 0 <= x <= n and 0 <= y <= m and best < x + y < n + m:
+            best, split = x + y, (x, y)
+        # 反向坐标以终点为原点
+        x = vb[offset + k]
+        y = x - k
+        if 0 <= x <= n and 0 <= y <= m and best < x + y < n + m:
+            best, split = x + y, (n - x, m - y)
+    return split
+
+
+def _middle_snake(a, a_lo, a_hi, b, b_lo, b_hi, progress=None, budget=None):
+    """同时从两端搜索，返回最短编辑路径中间的那条蛇 (x0, y0, x1, y1) 及编辑距离 D
+
+    坐标均相对于 (a_lo, b_lo)，只使用两个长度 O(N+M) 的数组
+    progress 不为空时，每加深一步用当前子问题的编辑距离下界回调一次；
+    搜索步数超过 budget.cost_limit 时返回走得最远的位置（长度为 0 的蛇），D 为 None，并标记 budget.approximate
+    """
+    max_cost = budget.cost_limit if budget is not None else None
+    n = a_hi - a_lo
+    m = b_hi - b_lo
+    delta = n - m
+    odd = delta & 1
+    max_d = (n + m + 1) // 2
+    offset = max_d + 1
+    # vf[k]: 正向走 d 步后 k 线上最远的 x；vb[k]: 反向（从终点往回）走 d 步后最远的 x
+    vf = [0] * (2 * offset + 1)
+    vb = [0] * (2 * offset + 1)
+
+    for d in range(max_d + 1):
+        if progress is not None:
+            progress(2 * d)
+
+        # 正向搜索
+        for k in range(-d, d + 1, 2):
+            i = offset + k
+            if k == -d or (k != d and vf[i - 1] < vf[i + 1]):
+                x = vf[i + 1]
+            else:
+                x = vf[i - 1] + 1
+            y = x - k
+            x0, y0 = x, y
+            while x < n and y < m and a[a_lo + x] == b[b_lo + y]:
+                x += 1
+                y += 1
+            vf[i] = x
+            # delta 为奇数时，最短路径的中点出现在正向第 d 步，与反向第 d-1 步重叠
+            if odd and -(d - 1) <= delta - k <= d - 1:
+                if x + vb[offset + delta - k] >= n:
+                    return x0, y0, x, y, 2 * d - 1
+
+        # 反向搜索，坐标以终点为原点
+        for k in range(-d, d + 1, 2):
+            i = offset + k
+            if k == -d or (k != d and vb[i - 1] < vb[i + 1]):
+                x = vb[i + 1]
+            else:
+                x = vb[i - 1] + 1
+            y = x - k
+            x0, y0 = x, y
+            while x < n and y < m and a[a_hi - 1 - x] == b[b_hi - 1 - y]:
+                x += 1
+                y += 1
+            vb[i] = x
+            # delta 为偶数时，中点出现在反向第 d 步，与正向第 d 步重叠
+            if not odd and -d <= delta - k <= d:
+                if x + vf[offset + delta - k] >= n:
+                    return n - x, m - y, n - x0, m - y0, 2 * d
+
+        if max_cost is not None and d >= max_cost:
+            split = _bounded_split(vf, vb, offset, d, n, m)
+            if split is not None:
+                budget.approximate = True
+                return (*split, *split, None)
+
+    # 不会走到这里：max_d 步内两个方向必然相遇
+    raise AssertionError("middle snake not found")
+
+
+def _strip_common(a, a_lo, a_hi, b, b_lo, b_hi, ops):
+    """输出公共前缀，返回去掉前缀和后缀之后的范围以及后缀长度（后缀由调用方最后输出）"""
+    start = a_lo
+    while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+        a_lo += 1
+        b_lo += 1
+    if a_lo > start:
+        ops.extend([(OP_EQUAL, i) for i in range(start, a_lo)])
+
+    suffix = 0
+    while a_lo < a_hi and b_lo < b_hi and a[a_hi - 1] == b[b_hi - 1]:
+        a_hi -= 1
+        b_hi -= 1
+        suffix += 1
+    return a_lo, a_hi, b_lo, b_hi, suffix
+
+
+def _emit_one_sided(a_lo, a_hi, b_lo, b_hi, ops):
+    """有一侧为空时直接输出插入或删除，返回是否已处理"""
+    if a_lo == a_hi:
+        ops.extend((OP_INSERT, j) for j in range(b_lo, b_hi))
+        return True
+    if b_lo == b_hi:
+        ops.extend((OP_DELETE, i) for i in range(a_lo, a_hi))
+        return True
+    return False
+
+
+def _diff_range(a, a_lo, a_hi, b, b_lo, b_hi, ops, progress=None, budget=None):
+    """计算 a[a_lo:a_hi] 与 b[b_lo:b_hi] 的编辑序列，按顺序追加到 ops
+
+    用栈代替递归：提前分割时子问题会一个接一个地串联，递归深度可能随输入长度增长
+    """
+    # 从末尾取出任务：四元组为待比较的子问题，二元组为 a 中一段相同的行
+    stack = [(a_lo, a_hi, b_lo, b_hi)]
+    while stack:
+        task = stack.pop()
+        if len(task) == 2:
+            ops.extend((OP_EQUAL, i) for i in range(*task))
+            continue
+        a_lo, a_hi, b_lo, b_hi = task
+        a_lo, a_hi, b_lo, b_hi, suffix = _strip_common(a, a_lo, a_hi, b, b_lo, b_hi, ops)
+        if suffix:
+            stack.append((a_hi, a_hi + suffix))
+        if _emit_one_sided(a_lo, a_hi, b_lo, b_hi, ops):
+            continue
+        x0, y0, x1, y1, _ = _middle_snake(a, a_lo, a_hi, b, b_lo, b_hi, progress, budget)
+        stack.append((a_lo + x1, a_hi, b_lo + y1, b_hi))
+        if x1 > x0:
+            stack.append((a_lo + x0, a_lo + x1))
+        stack.append((a_lo, a_lo + x0, b_lo, b_lo + y0))
+
+
+def myers_ops(a, b, progress=None, budget=None):
+    """线性空间的 Myers 算法（middle snake 分治），返回 [(操作, 下标), ...]
+
+    操作为 OP_EQUAL/OP_DELETE 时下标指向 a，为 OP_INSERT 时指向 b
+    progress(d) 会在搜索过程中被反复调用，可以在其中抛出 DiffCancelled 中断计算；
+    budget 为 DiffBudget 时限制每次分割的搜索步数
+    """
+    ops = []
+    _diff_range(a, 0, len(a), b, 0, len(b), ops, progress, budget)
+    return ops
+
+
+def _longest_increasing(pairs):
+    """pairs 按 a 下标有序，返回 b 下标严格递增的最长子序列（patience sorting）"""
+    tails = []  # tails[k]: 长度为 k+1 的递增子序列末尾元素在 pairs 中的下标
+    tail_values = []
+    back = [-1] * len(pairs)
+    for n, (_, j) in enumerate(pairs):
+        k = bisect_left(tail_values, j)
+        if k:
+            back[n] = tails[k - 1]
+        if k == len(tails):
+            tails.append(n)
+            tail_values.append(j)
+        else:
+            tails[k] = n
+            tail_values[k] = j
+
+    result = []
+    n = tails[-1] if tails else -1
+    while n != -1:
+        result.append(pairs[n])
+        n = back[n]
+    result.reverse()
+    return result
+
+
+def _patience_range(a, a_lo, a_hi, b, b_lo, b_hi, ops, progress=None, budget=None):
+    """以唯一行为锚点分割 a[a_lo:a_hi] 与 b[b_lo:b_hi]，编辑序列按顺序追加到 ops
+
+    与 _diff_range 相同用栈代替递归：每个锚点之间都是一个子问题，改动很多时子问题的嵌套可能很深
+    """
+    # 从末尾取出任务：四元组为待比较的子问题，二元组为 a 中一段相同的行
+    stack = [(a_lo, a_hi, b_lo, b_hi)]
+    while stack:
+        task = stack.pop()
+        if len(task) == 2:
+            ops.extend((OP_EQUAL, i) for i in range(*task))
+            continue
+        if progress is not None:
+            progress(0)
+        a_lo, a_hi, b_lo, b_hi = task
+        a_lo, a_hi, b_lo, b_hi, suffix = _strip_common(a, a_lo, a_hi, b, b_lo, b_hi, ops)
+        if suffix:
+            stack.append((a_hi, a_hi + suffix))
+        if _emit_one_sided(a_lo, a_hi, b_lo, b_hi, ops):
+            continue
+
+        # 两侧都只出现一次的行作为锚点候选
+        a_unique = {}
+        for i in range(a_lo, a_hi):
+            a_unique[a[i]] = -1 if a[i] in a_unique else i
+        b_unique = {}
+        for j in range(b_lo, b_hi):
+            value = b[j]
+            if a_unique.get(value, -1) >= 0:
+                b_unique[value] = -1 if value in b_unique else j
+        pairs = sorted((a_unique[value], j) for value, j in b_unique.items() if j >= 0)
+        anchors = _longest_increasing(pairs)
+
+        if not anchors:
+            # 没有可用的锚点，退回 Myers
+            _diff_range(a, a_lo, a_hi, b, b_lo, b_hi, ops, progress, budget)
+            continue
+        # 按相反的顺序入栈：最后一个锚点之后的部分最后处理
+        stack.append((anchors[-1][0] + 1, a_hi, anchors[-1][1] + 1, b_hi))
+        for n in range(len(anchors) - 1, -1, -1):
+            i, j = anchors[n]
+            stack.append((i, i + 1))
+            prev_i, prev_j = anchors[n - 1] if n else (a_lo - 1, b_lo - 1)
+            stack.append((prev_i + 1, i, prev_j + 1, j))
+
+
+def patience_ops(a, b, progress=None, budget=None):
+    """Patience 算法：以两侧都唯一的行的最长递增子序列为锚点分割，锚点之间用 Myers"""
+    ops = []
+    _patience_range(a, 0, len(a), b, 0, len(b), ops, progress, budget)
+    return ops
+
+
+# histogram 算法中出现次数超过该值的行不作为分割点
+HISTOGRAM_MAX_CHAIN = 64
+
+
+def _histogram_range(a, a_lo, a_hi, b, b_lo, b_hi, ops, progress=None, budget=None):
+    """以出现次数最少的行所在的公共区域分割 a[a_lo:a_hi] 与 b[b_lo:b_hi]，编辑序列按顺序追加到 ops
+
+    与 _diff_range 相同用栈代替递归：每次分割只去掉一段公共区域，改动很多时子问题会一个接一个地串联
+    """
+    # 从末尾取出任务：四元组为待比较的子问题，二元组为 a 中一段相同的行
+    stack = [(a_lo, a_hi, b_lo, b_hi)]
+    while stack:
+        task = stack.pop()
+        if len(task) == 2:
+            ops.extend((OP_EQUAL, i) for i in range(*task))
+            continue
+        if progress is not None:
+            progress(0)
+        a_lo, a_hi, b_lo, b_hi = task
+        a_lo, a_hi, b_lo, b_hi, suffix = _strip_common(a, a_lo, a_hi, b, b_lo, b_hi, ops)
+        if suffix:
+            stack.append((a_hi, a_hi + suffix))
+        if _emit_one_sided(a_lo, a_hi, b_lo, b_hi, ops):
+            continue
+
+        occurrences = {}
+        for i in range(a_lo, a_hi):
+            occurrences.setdefault(a[i], []).append(i)
+
+        # 寻找出现次数最少的行所在的最长公共区域，作为分割点
+        best = None  # (出现次数, -区域长度, a 起点, b 起点, 区域长度)
+        j = b_lo
+        while j < b_hi:
+            positions = occurrences.get(b[j])
+            next_j = j + 1
+            if positions and len(positions) <= HISTOGRAM_MAX_CHAIN and (best is None or len(positions) <= best[0]):
+                for i in positions:
+                    start_i, start_j = i, j
+                    while start_i > a_lo and start_j > b_lo and a[start_i - 1] == b[start_j - 1]:
+                        start_i -= 1
+                        start_j -= 1
+                    end_i, end_j = i + 1, j + 1
+                    while end_i < a_hi and end_j < b_hi and a[end_i] == b[end_j]:
+                        end_i += 1
+                        end_j += 1
+                    candidate = (len(positions), start_i - end_i, start_i, start_j, end_i - start_i)
+                    if best is None or candidate < best:
+                        best = candidate
+                    # 区域内的其他行不会找到更好的分割点，直接跳过
+                    next_j = max(next_j, end_j)
+            j = next_j
+
+        if best is None:
+            _diff_range(a, a_lo, a_hi, b, b_lo, b_hi, ops, progress, budget)
+            continue
+        _, _, start_i, start_j, length = best
+        stack.append((start_i + length, a_hi, start_j + length, b_hi))
+        stack.append((start_i, start_i + length))
+        stack.append((a_lo, start_i, b_lo, start_j))
+
+
+def histogram_ops(a, b, progress=None, budget=None):
+    """Histogram 算法：以出现次数最少的行所在的最长公共区域分割，找不到时用 Myers"""
+    ops = []
+    _histogram_range(a, 0, len(a), b, 0, len(b), ops, progress, budget)
+    return ops
+
+
+# 可选的差异算法
+ALGORITHMS = {
+    "myers": myers_ops,
+    "patience": patience_ops,
+    "histogram": histogram_ops,
+}
+
+
+def intern_lines(a, b):
+    """把每个不同的行映射成一个整数 ID，返回两个 array('i')，之后比较行只需比较整数"""
+    table = {}
+    a_ids = array('i', [table.setdefault(line, len(table)) for line in a])
+    b_ids = array('i', [table.setdefault(line, len(table)) for line in b])
+    return a_ids, b_ids
+
+
+def diff_ops(a, b, progress=None, algorithm="myers", budget=None, instrument=True):
+    """先做预处理再交给 ALGORITHMS 中对应的算法，返回的下标仍然指向原始的 a、b
+
+    1. 行内容转换为整数 ID
+    2. 去掉公共前缀和后缀
+    3. 丢弃只在一侧出现的行（它们不可能匹配，一定是删除或插入），不影响编辑距离
+    4. 给出 budget（DiffBudget）时估计剩余部分的相似度并限制计算开销，结果是否为近似的见 budget.approximate
+
+    instrument 为 False 时不向 perf 记录各阶段（如绘制时逐行的行内比较，否则会挤掉整个文件的比较记录）
+    """
+    span = perf.span if instrument else perf.null_span
+    # a、b 可以是生成器，输入大小在转换后才知道
+    with span("hash") as current:
+        a_ids, b_ids = intern_lines(a, b)
+        current.size = len(a_ids) + len(b_ids)
+    n, m = len(a_ids), len(b_ids)
+
+    prefix = 0
+    while prefix < n and prefix < m and a_ids[prefix] == b_ids[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < n - prefix and suffix < m - prefix and a_ids[n - 1 - suffix] == b_ids[m - 1 - suffix]:
+        suffix += 1
+    a_end, b_end = n - suffix, m - suffix
+
+    # 中间部分只保留在另一侧也出现过的行，同时记录它们在原序列中的下标
+    b_present = set(b_ids[prefix:b_end])
+    a_present = set(a_ids[prefix:a_end])
+    a_keep = array('i', [i for i in range(prefix, a_end) if a_ids[i] in b_present])
+    b_keep = array('i', [j for j in range(prefix, b_end) if b_ids[j] in a_present])
+    a_core = array('i', [a_ids[i] for i in a_keep])
+    b_core = array('i', [b_ids[j] for j in b_keep])
+    if budget is not None:
+        with span("screen", len(a_core) + len(b_core)):
+            budget.prepare(a_core, b_core)
+    with span("diff", len(a_keep) + len(b_keep)):
+        core = ALGORITHMS[algorithm](a_core, b_core, progress, budget)
+    with span("reconstruct", len(core)):
+        return map_core_ops(core, a_keep, b_keep, prefix, a_end, b_end, n)
+
+
+def map_core_ops(core, a_keep, b_keep, prefix, a_end, b_end, n):
+    """把核心算法的结果映射回原始下标，被丢弃的行按位置补成删除/插入"""
+    ops = [(OP_EQUAL, i) for i in range(prefix)]
+    ai = bj = prefix
+    fi = fj = 0
+    for op, _ in core:
+        if op != OP_INSERT:
+            target = a_keep[fi]
+            if target > ai:
+                ops.extend([(OP_DELETE, i) for i in range(ai, target)])
+            ai = target + 1
+            fi += 1
+        if op != OP_DELETE:
+            target = b_keep[fj]
+            if target > bj:
+                ops.extend([(OP_INSERT, j) for j in range(bj, target)])
+            bj = target + 1
+            fj += 1
+        if op == OP_EQUAL:
+            ops.append((OP_EQUAL, ai - 1))
+        elif op == OP_DELETE:
+            ops.append((OP_DELETE, ai - 1))
+        else:
+            ops.append((OP_INSERT, bj - 1))
+    ops.extend((OP_DELETE, i) for i in range(ai, a_end))
+    ops.extend((OP_INSERT, j) for j in range(bj, b_end))
+    ops.extend((OP_EQUAL, i) for i in range(a_end, n))
+    return ops
+
+
+def pack_ops(ops):
+    """把编辑序列压缩成操作符字符串（每个操作一个字节）和行下标 array('i')"""
+    return "".join([op for op, _ in ops]), array('i', [i for _, i in ops])
+
+
+def diff_files(a_path, b_path, progress=None, algorithm="myers", budget=None):
+    """比较磁盘上的两个文件：内存映射后只建立行偏移索引，全文不解码成字符串
+
+    返回 (a 行, b 行, 操作符, 下标)，行为 MappedLines，用完后由调用方关闭；两个文件完全一致时返回 None
+    budget 与 diff_ops 相同
+    """
+    if filecmp.cmp(a_path, b_path, shallow=False):
+        return None
+    with perf.span("read") as current:
+        a_lines = MappedLines(a_path)
+        try:
+            b_lines = MappedLines(b_path)
+        except BaseException:
+            a_lines.close()
+            raise
+        current.size = len(a_lines) + len(b_lines)
+    try:
+        # 用每行的摘要参与比较，结果中的下标对应文件中的行号
+        codes, indexes = pack_ops(diff_ops(a_lines.iter_keys(), b_lines.iter_keys(), progress, algorithm,
+                                           budget))
+    except BaseException:
+        a_lines.close()
+        b_lines.close()
+        raise
+    return a_lines, b_lines, codes, indexes
+
+
+def iter_hunks(codes, context=3):
+    """按 unified diff 的规则把编辑序列分组，惰性地逐个产出 hunk
+
+    codes 为操作符序列（如 pack_ops 返回的字符串），产出 (a_start, a_count, b_start, b_count, lo, hi)，
+    a_start/b_start 从 0 开始，codes[lo:hi] 为该 hunk 包含的行；
+    两处改动之间超过 2*context 行的相同内容不会出现在任何 hunk 中
+    """
+    n = len(codes)
+    k = 0
+    a_pos = b_pos = 0
+    prev_end = 0
+    while True:
+        # 跳过 hunk 之间的相同行
+        while k < n and codes[k] == OP_EQUAL:
+            k += 1
+            a_pos += 1
+            b_pos += 1
+        if k >= n:
+            return
+
+        lo = max(k - context, prev_end)
+        a_start = a_pos - (k - lo)
+        b_start = b_pos - (k - lo)
+        while True:
+            while k < n and codes[k] != OP_EQUAL:
+                if codes[k] == OP_DELETE:
+                    a_pos += 1
+                else:
+                    b_pos += 1
+                k += 1
+            # 改动之后的相同行不超过 2*context 行时，下一处改动并入当前 hunk
+            run = 0
+            while k < n and codes[k] == OP_EQUAL and run <= 2 * context:
+                k += 1
+                a_pos += 1
+                b_pos += 1
+                run += 1
+            if k < n and codes[k] != OP_EQUAL and run <= 2 * context:
+                continue
+            break
+
+        tail = min(run, context)
+        hi = k - run + tail
+        yield a_start, a_pos - run + tail - a_start, b_start, b_pos - run + tail - b_start, lo, hi
+        prev_end = hi
+
+
+def format_hunk_range(start, count):
+    """unified diff 中的行号范围，行号从 1 开始，空范围指向前一行"""
+    if count == 1:
+        return str(start + 1)
+    if count == 0:
+        return f"{start},0"
+    return f"{start + 1},{count}"
+
+
+def format_hunk_header(a_start, a_count, b_start, b_count):
+    return f"@@ -{format_hunk_range(a_start, a_count)} +{format_hunk_range(b_start, b_count)} @@"
+
+
+def unified_diff(a, b, codes, indexes, context=3, from_file="a", to_file="b"):
+    """惰性产出 unified diff 文本（每项以换行结尾），可直接 writelines 到文件"""
+    header_written = False
+    for a_start, a_count, b_start, b_count, lo, hi in iter_hunks(codes, context):
+        if not header_written:
+            yield f"--- {from_file}\n"
+            yield f"+++ {to_file}\n"
+            header_written = True
+        yield format_hunk_header(a_start, a_count, b_start, b_count) + "\n"
+        for k in range(lo, hi):
+            op = codes[k]
+            yield op + (b[indexes[k]] if op == OP_INSERT else a[indexes[k]]) + "\n"
+
+
+# 按词比较时的分词规则：连续的单词字符、连续的空白、单个标点各为一个词
+WORD_PATTERN = re.compile(r"\w+|\s+|[^\w\s]")
+
+
+def tokenize(line, mode="word"):
+    if mode == "char":
+        return list(line)
+    return WORD_PATTERN.findall(line)
+
+
+def _add_span(spans, start, length):
+    if spans and spans[-1][0] + spans[-1][1] == start:
+        spans[-1] = (spans[-1][0], spans[-1][1] + length)
+    else:
+        spans.append((start, length))
+
+
+def intraline_spans(old, new, mode="word"):
+    """比较一对改动行，返回 (old 中改动的字符区间, new 中改动的字符区间)，区间为 (起点, 长度)
+
+    mode 为 "word" 时按词比较，为 "char" 时按字符比较
+    """
+    a = tokenize(old, mode)
+    b = tokenize(new, mode)
+    a_offsets = [0]
+    for token in a:
+        a_offsets.append(a_offsets[-1] + len(token))
+    b_offsets = [0]
+    for token in b:
+        b_offsets.append(b_offsets[-1] + len(token))
+
+    old_spans, new_spans = [], []
+    # 绘制每个改动行时都会调用，不计入文件比较的各阶段
+    for op, i in diff_ops(a, b, instrument=False):
+        if op == OP_DELETE:
+            _add_span(old_spans, a_offsets[i], len(a[i]))
+        elif op == OP_INSERT:
+            _add_span(new_spans, b_offsets[i], len(b[i]))
+    return old_spans, new_spans
+
+
+def render_ops(a, b, ops):
+    """把编辑序列转换成 "  x" / "- x" / "+ x" 形式的文本行"""
+    return [op + " " + (b[i] if op == OP_INSERT else a[i]) for op, i in ops]
+
+
+def myers_diff(a, b, progress=None):
+    return render_ops(a, b, diff_ops(a, b, progress))
+
+
+def edit_distance(lines):
+    return sum(1 for line in lines if line[:1] in (OP_DELETE, OP_INSERT))
+
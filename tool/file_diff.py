@@ -1,112 +1,684 @@
-import hashlib
 import time
+from array import array
 
-from PySide6.QtCore import QSize, QRect, Qt
-from PySide6.QtGui import QFont, QPainter, QColor, QTextCharFormat, QTextFormat
-from PySide6.QtWidgets import QWidget, QPlainTextEdit, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QTextEdit
+from PySide6.QtCore import (QSize, QRect, Qt, QObject, QRunnable, QThreadPool, Signal, QTimer, QEvent,
+                            QAbstractListModel, QAbstractItemModel, QModelIndex)
+from PySide6.QtGui import QFont, QPainter, QColor, QTextFormat, QKeySequence, QTextDocument
+from PySide6.QtWidgets import (QWidget, QPlainTextEdit, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QTextEdit,
+                               QListView, QStyledItemDelegate, QStyle, QAbstractItemView, QApplication,
+                               QCheckBox, QSpinBox, QFileDialog, QComboBox, QTreeView, QStackedWidget, QDialog,
+                               QHeaderView)
 
+from tool import perf
+from tool.diff_engine import (DiffBudget, diff_ops, diff_files, pack_ops, iter_hunks, format_hunk_header, unified_diff, intraline_spans,
+                               DiffCancelled, OP_EQUAL, OP_DELETE, OP_INSERT)
+from tool.line_index import MappedLines
+from tool.merge3 import merge_files
+from tool.tree_diff import (HashCache, compare_trees, iter_diff_stats, pair_paths, tree_index,
+                            STATUS_ADDED, STATUS_REMOVED, STATUS_MODIFIED, STATUS_UNCHANGED)
+from tool.worker_errors import error_message
 
-def hash_text(text):
-    return hashlib.sha256(text.encode('utf-8')).hexdigest()
 
+def close_mapped_lines(*sides):
+    """关闭文件比较结果中的内存映射；文本比较的结果是普通列表，不需要处理"""
+    for lines in sides:
+        if isinstance(lines, MappedLines):
+            lines.close()
 
-def reconstruct(a, b, trace):
-    if not trace:
-        return []
 
-    x, y = len(a), len(b)
-    result = []
+class DiffWorkerSignals(QObject):
+    progress = Signal(int, int)  # 请求序号, 编辑距离下界
+    finished = Signal(int, object)  # 请求序号, (a 行, b 行, 操作数组, 下标数组)，None 表示两个文本一致
+    cancelled = Signal(int)  # 请求序号
+    failed = Signal(int, str)  # 请求序号, 错误信息
 
-    for d in range(len(trace) - 1, -1, -1):
-        current_v = trace[d]
-        k = x - y
 
-        # 获取前一步的k值
-        if d == 0:
-            prev_k = None  # d=0时无前一步
-        else:
-            if k == -d:
-                prev_k = k + 1  # 边界情况：最左侧只能从k+1来
-            elif k == d:
-                prev_k = k - 1  # 边界情况：最右侧只能从k-1来
+class DiffWorker(QRunnable):
+    """在线程池中计算差异，避免阻塞界面"""
+
+    # 两次进度通知之间的最小间隔（秒）
+    PROGRESS_INTERVAL = 0.1
+
+    def __init__(self, revision, a_text, b_text, algorithm="myers"):
+        super().__init__()
+        self.revision = revision
+        self.algorithm = algorithm
+        self.a_text = a_text
+        self.b_text = b_text
+        self.signals = DiffWorkerSignals()
+        # 限制差异很多时的计算开销，完成后可以从中得知结果是否为近似的
+        self.budget = DiffBudget()
+        self.cancel_requested = False
+        self.max_distance = 0
+        self.last_report = 0.0
+
+    def cancel(self):
+        self.cancel_requested = True
+
+    def report_progress(self, d):
+        if self.cancel_requested:
+            raise DiffCancelled()
+        # 子问题的下界比整体小，只报告目前见过的最大值
+        if d <= self.max_distance:
+            return
+        self.max_distance = d
+        now = time.monotonic()
+        if now - self.last_report >= self.PROGRESS_INTERVAL:
+            self.last_report = now
+            self.signals.progress.emit(self.revision, d)
+
+    def compute(self):
+        """返回 (a 行, b 行, 操作, 下标)，两侧完全一致时返回 None"""
+        # 直接比较字符串：长度不同时立即返回，否则是一次内存比较，比先计算摘要更快
+        if self.a_text == self.b_text:
+            return None
+        a_lines = self.a_text.splitlines()
+        b_lines = self.b_text.splitlines()
+        codes, indexes = pack_ops(diff_ops(a_lines, b_lines, self.report_progress, self.algorithm, self.budget))
+        return a_lines, b_lines, codes, indexes
+
+    def run(self):
+        try:
+            if self.cancel_requested:
+                raise DiffCancelled()
+            diff = self.compute()
+        except DiffCancelled:
+            self.signals.cancelled.emit(self.revision)
+            return
+        except Exception as e:
+            self.signals.failed.emit(self.revision, error_message(e))
+            return
+        self.signals.finished.emit(self.revision, diff)
+
+
+class FileDiffWorker(DiffWorker):
+    """直接比较磁盘上的两个文件：内存映射后只建立行偏移索引，全文不进入编辑器也不解码成字符串"""
+
+    def __init__(self, revision, a_path, b_path, algorithm="myers"):
+        super().__init__(revision, None, None, algorithm=algorithm)
+        self.a_path = a_path
+        self.b_path = b_path
+
+    def compute(self):
+        return diff_files(self.a_path, self.b_path, self.report_progress, self.algorithm, self.budget)
+
+
+class DirectoryDiffWorkerSignals(QObject):
+    progress = Signal(int, str)  # 请求序号, 进度说明
+    compared = Signal(int, object)  # 请求序号, {相对路径: 状态}
+    stats = Signal(int, object)  # 请求序号, [(相对路径, (删除行数, 插入行数, 说明))]
+    finished = Signal(int)  # 请求序号
+    cancelled = Signal(int)  # 请求序号
+    failed = Signal(int, str)  # 请求序号, 错误信息
+
+
+class DirectoryDiffWorker(QRunnable):
+    """比较两个目录：先按大小、修改时间和摘要找出有变化的文件，再在进程池中并行统计每个文件的差异行数"""
+
+    # 两次进度通知之间的最小间隔（秒）
+    PROGRESS_INTERVAL = 0.1
+
+    def __init__(self, revision, left_root, right_root, cache, algorithm="myers"):
+        super().__init__()
+        self.revision = revision
+        self.left_root = left_root
+        self.right_root = right_root
+        self.cache = cache
+        self.algorithm = algorithm
+        self.signals = DirectoryDiffWorkerSignals()
+        self.cancel_requested = False
+        self.last_report = 0.0
+
+    def cancel(self):
+        self.cancel_requested = True
+
+    def report_progress(self, message, force=False):
+        if self.cancel_requested:
+            raise DiffCancelled()
+        now = time.monotonic()
+        if force or now - self.last_report >= self.PROGRESS_INTERVAL:
+            self.last_report = now
+            self.signals.progress.emit(self.revision, message)
+            return True
+        return False
+
+    def run(self):
+        try:
+            self.report_progress("正在扫描目录...", force=True)
+            statuses = compare_trees(self.left_root, self.right_root, self.cache,
+                                     lambda done, total: self.report_progress(f"正在比较文件内容 {done}/{total}"))
+            self.signals.compared.emit(self.revision, statuses)
+            changed = sorted(rel for rel, status in statuses.items() if status != STATUS_UNCHANGED)
+            # 图形界面进程中已有多个线程，子进程用 spawn 方式启动，不复制当前进程
+            import multiprocessing
+            results = iter_diff_stats(self.left_root, self.right_root, changed, self.algorithm,
+                                      mp_context=multiprocessing.get_context("spawn"))
+            batch = []
+            try:
+                with perf.span("diff", len(changed)):
+                    for done, item in enumerate(results, 1):
+                        batch.append(item)
+                        if self.report_progress(f"正在统计差异 {done}/{len(changed)}"):
+                            self.signals.stats.emit(self.revision, batch)
+                            batch = []
+            finally:
+                results.close()
+            if batch:
+                self.signals.stats.emit(self.revision, batch)
+        except DiffCancelled:
+            self.signals.cancelled.emit(self.revision)
+            return
+        except Exception as e:
+            self.signals.failed.emit(self.revision, error_message(e))
+            return
+        self.signals.finished.emit(self.revision)
+
+
+class MergeWorkerSignals(QObject):
+    finished = Signal(object)  # (合并后的文本, 冲突数)
+    failed = Signal(str)  # 错误信息
+
+
+class MergeWorker(QRunnable):
+    """在线程池中三方合并三个文件"""
+
+    def __init__(self, base_path, ours_path, theirs_path, algorithm="myers"):
+        super().__init__()
+        self.paths = (base_path, ours_path, theirs_path)
+        self.algorithm = algorithm
+        self.signals = MergeWorkerSignals()
+
+    def run(self):
+        try:
+            result = merge_files(*self.paths, algorithm=self.algorithm)
+        except Exception as e:
+            self.signals.failed.emit(error_message(e))
+            return
+        self.signals.finished.emit(result)
+
+
+class TreeNode:
+    __slots__ = ("name", "path", "is_dir", "parent", "row", "children")
+
+    def __init__(self, name, path, is_dir, parent=None, row=0):
+        self.name = name
+        self.path = path
+        self.is_dir = is_dir
+        self.parent = parent
+        self.row = row
+        # 为 None 表示子项还没有创建
+        self.children = None
+
+
+class DirectoryTreeModel(QAbstractItemModel):
+    """目录比较结果的树模型：目录的子节点在第一次展开时才创建，几万个文件也只为看到的部分建立节点"""
+
+    HEADERS = ["名称", "状态", "变更"]
+
+    STATUS_TEXT = {
+        STATUS_ADDED: "新增",
+        STATUS_REMOVED: "删除",
+        STATUS_MODIFIED: "修改",
+        STATUS_UNCHANGED: "相同",
+    }
+
+    STATUS_COLORS = {
+        STATUS_ADDED: QColor("green"),
+        STATUS_REMOVED: QColor("red"),
+        STATUS_MODIFIED: QColor("#0070c0"),
+        STATUS_UNCHANGED: QColor("gray"),
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.statuses = {}
+        # 目录 -> [(名称, 是否目录)]，以及目录的状态
+        self.children_index = {}
+        self.dir_statuses = {}
+        # 相对路径 -> (删除行数, 插入行数, 说明)
+        self.stats = {}
+        # 已经创建的节点，统计结果到达时用来找到需要刷新的行
+        self.nodes = {}
+        self.only_changed = True
+        self.root = TreeNode("", "", True)
+
+    def set_statuses(self, statuses):
+        self.statuses = statuses
+        self.stats = {}
+        self.rebuild()
+
+    def set_only_changed(self, only_changed):
+        self.only_changed = only_changed
+        self.rebuild()
+
+    def rebuild(self):
+        with perf.span("render", len(self.statuses)):
+            self.beginResetModel()
+            shown = self.statuses
+            if self.only_changed:
+                shown = {rel: status for rel, status in shown.items() if status != STATUS_UNCHANGED}
+            self.children_index, self.dir_statuses = tree_index(shown)
+            self.root = TreeNode("", "", True)
+            self.nodes = {"": self.root}
+            self.create_children(self.root)
+            self.endResetModel()
+
+    def clear(self):
+        self.set_statuses({})
+
+    def create_children(self, node):
+        node.children = []
+        prefix = node.path + "/" if node.path else ""
+        for row, (name, is_dir) in enumerate(self.children_index.get(node.path, ())):
+            child = TreeNode(name, prefix + name, is_dir, node, row)
+            node.children.append(child)
+            self.nodes[child.path] = child
+
+    def node(self, index):
+        return index.internalPointer() if index.isValid() else self.root
+
+    def status(self, node):
+        return self.dir_statuses.get(node.path) if node.is_dir else self.statuses.get(node.path)
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self.node(parent)
+        if node.children is None or not 0 <= row < len(node.children):
+            return QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None or parent is self.root:
+            return QModelIndex()
+        return self.createIndex(parent.row, 0, parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        node = self.node(parent)
+        return len(node.children) if node.children is not None else 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self.node(parent)
+        return node.is_dir and bool(self.children_index.get(node.path))
+
+    def canFetchMore(self, parent):
+        node = self.node(parent)
+        return node.is_dir and node.children is None
+
+    def fetchMore(self, parent):
+        node = self.node(parent)
+        if node.children is not None:
+            return
+        count = len(self.children_index.get(node.path, ()))
+        self.beginInsertRows(parent, 0, count - 1)
+        self.create_children(node)
+        self.endInsertRows()
+
+    def change_text(self, node):
+        if node.is_dir:
+            return ""
+        stat = self.stats.get(node.path)
+        if stat is None:
+            return "" if self.statuses.get(node.path) == STATUS_UNCHANGED else "…"
+        deleted, inserted, note = stat
+        if deleted < 0:
+            return note
+        return f"-{deleted} +{inserted}" + (f"（{note}）" if note else "")
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role == Qt.ItemDataRole.DisplayRole:
+            column = index.column()
+            if column == 0:
+                return node.name + "/" if node.is_dir else node.name
+            if column == 1:
+                return self.STATUS_TEXT.get(self.status(node), "")
+            return self.change_text(node)
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return self.STATUS_COLORS.get(self.status(node))
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def add_stats(self, batch):
+        """记录一批差异统计结果，只刷新已经创建的行"""
+        for rel, stat in batch:
+            self.stats[rel] = stat
+            node = self.nodes.get(rel)
+            if node is not None:
+                index = self.createIndex(node.row, 2, node)
+                self.dataChanged.emit(index, index)
+
+
+class MergeResultDialog(QDialog):
+    """显示三方合并的结果，可以逐个跳到冲突处并保存"""
+
+    CONFLICT_MARKER = "<<<<<<< "
+
+    def __init__(self, text, conflicts, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("三方合并结果")
+        self.resize(900, 600)
+        self.merged_text = text
+        layout = QVBoxLayout()
+        summary = f"存在 {conflicts} 处冲突" if conflicts else "合并完成，没有冲突"
+        layout.addWidget(QLabel(summary))
+
+        self.text_edit = QPlainTextEdit()
+        self.text_edit.setReadOnly(True)
+        self.text_edit.setUndoRedoEnabled(False)
+        self.text_edit.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.text_edit.setFont(QFont("Consolas", 12))
+        self.text_edit.setPlainText(text)
+        layout.addWidget(self.text_edit, 1)
+
+        button_layout = QHBoxLayout()
+        next_button = QPushButton("下一处冲突")
+        next_button.setEnabled(conflicts > 0)
+        next_button.clicked.connect(self.find_next_conflict)
+        save_button = QPushButton("保存")
+        save_button.clicked.connect(self.save)
+        close_button = QPushButton("关闭")
+        close_button.clicked.connect(self.accept)
+        button_layout.addWidget(next_button)
+        button_layout.addStretch()
+        button_layout.addWidget(save_button)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+        self.setLayout(layout)
+
+    def find_next_conflict(self):
+        document = self.text_edit.document()
+        cursor = document.find(self.CONFLICT_MARKER, self.text_edit.textCursor(), QTextDocument.FindFlag.FindCaseSensitively)
+        if cursor.isNull():
+            # 到结尾后从头开始找
+            cursor = document.find(self.CONFLICT_MARKER, 0, QTextDocument.FindFlag.FindCaseSensitively)
+        if not cursor.isNull():
+            self.text_edit.setTextCursor(cursor)
+            self.text_edit.centerCursor()
+
+    def save(self):
+        path, _ = QFileDialog.getSaveFileName(self, "保存合并结果")
+        if not path:
+            return
+        with open(path, "w", encoding="utf-8", newline="\n") as f:
+            f.write(self.merged_text)
+        self.accept()
+
+
+class DiffResultModel(QAbstractListModel):
+    """差异结果模型，只保存原始行和压缩后的 (操作, 下标) 数组，显示时再按行取文本
+
+    开启折叠时按 hunk 显示：每个 hunk 前有一行 @@ 头，hunk 之间的相同内容折叠为一行，双击可展开
+    """
+
+    ROW_HEADER = "@"
+    ROW_FOLD = "~"
+
+    COLORS = {
+        OP_EQUAL: QColor("gray"),
+        OP_DELETE: QColor("red"),
+        OP_INSERT: QColor("green"),
+        ROW_HEADER: QColor("#0070c0"),
+        ROW_FOLD: QColor("#808000"),
+    }
+
+    # 行内差异的背景色
+    INTRALINE_COLORS = {
+        OP_DELETE: QColor(255, 0, 0, 50),
+        OP_INSERT: QColor(0, 160, 0, 50),
+    }
+    # 改动块超过这么多行时不再配对计算行内差异
+    INTRALINE_MAX_BLOCK = 2000
+    # 超长的行不计算行内差异
+    INTRALINE_MAX_CHARS = 4000
+    INTRALINE_CACHE_SIZE = 10000
+
+    def __init__(self):
+        super().__init__()
+        self.a_lines = []
+        self.b_lines = []
+        self.codes = ""
+        self.indexes = array('i')
+        self.message = None
+        self.context = None
+        # 视图行到编辑序列的映射：>= 0 为编辑序列下标，< 0 为 segments[-value - 1]（hunk 头或折叠行）
+        # 为 None 时逐行显示全部编辑序列
+        self.rows = None
+        self.segments = []
+        # 行内差异模式：None 关闭，"word" 按词，"char" 按字符
+        self.intraline_mode = None
+        # (删除行在编辑序列中的下标, 插入行的下标) -> intraline_spans 的结果
+        self.intraline_cache = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self.message is not None:
+            return 1
+        if self.rows is not None:
+            return len(self.rows)
+        return len(self.codes)
+
+    def line(self, row):
+        """返回第 row 行的 (操作, 文本)，hunk 头和折叠行的操作为 ROW_HEADER / ROW_FOLD"""
+        if self.message is not None:
+            return OP_EQUAL, self.message
+        k = row if self.rows is None else self.rows[row]
+        if k < 0:
+            segment = self.segments[-k - 1]
+            if segment[0] == self.ROW_HEADER:
+                return segment
+            return self.ROW_FOLD, f"⋯ 已折叠 {segment[2] - segment[1]} 行相同内容（双击展开）"
+        op = self.codes[k]
+        lines = self.b_lines if op == OP_INSERT else self.a_lines
+        return op, lines[self.indexes[k]]
+
+    def line_text(self, row):
+        op, text = self.line(row)
+        if self.message is not None or op in (self.ROW_HEADER, self.ROW_FOLD):
+            return text
+        return f"{op} {text}"
+
+    def intraline(self, row):
+        """返回第 row 行需要高亮的字符区间，只在绘制可见行时按需计算
+
+        同一改动块中第 n 个删除行与第 n 个插入行配对，结果按行对缓存
+        """
+        if self.intraline_mode is None or self.message is not None:
+            return None
+        k = row if self.rows is None else self.rows[row]
+        if k < 0:
+            return None
+        codes = self.codes
+        op = codes[k]
+        if op == OP_EQUAL:
+            return None
+
+        start = codes.rfind(OP_EQUAL, 0, k) + 1
+        end = codes.find(OP_EQUAL, k)
+        if end == -1:
+            end = len(codes)
+        if end - start > self.INTRALINE_MAX_BLOCK:
+            return None
+        other = OP_INSERT if op == OP_DELETE else OP_DELETE
+        pos = start - 1
+        for _ in range(codes.count(op, start, k) + 1):
+            pos = codes.find(other, pos + 1, end)
+            if pos == -1:
+                return None
+        key = (k, pos) if op == OP_DELETE else (pos, k)
+
+        spans = self.intraline_cache.get(key)
+        if spans is None:
+            old = self.a_lines[self.indexes[key[0]]]
+            new = self.b_lines[self.indexes[key[1]]]
+            if len(old) + len(new) > self.INTRALINE_MAX_CHARS:
+                spans = ([], [])
             else:
-                # 使用d-1步的v数据进行比较
-                prev_v = trace[d - 1]
-                # 比较prev_v中k-1和k+1的值
-                val_km1 = prev_v.get(k - 1, float('-inf'))
-                val_kp1 = prev_v.get(k + 1, float('-inf'))
-                if val_km1 < val_kp1:
-                    prev_k = k + 1  # 从上方移动（插入）
-                else:
-                    prev_k = k - 1  # 从左侧移动（删除）
-
-        # 计算前一步的坐标
-        if d > 0:
-            prev_x = trace[d - 1][prev_k]
-            prev_y = prev_x - prev_k
+                spans = intraline_spans(old, new, self.intraline_mode)
+            if len(self.intraline_cache) >= self.INTRALINE_CACHE_SIZE:
+                self.intraline_cache.clear()
+            self.intraline_cache[key] = spans
+        return spans[0] if op == OP_DELETE else spans[1]
+
+    def set_intraline_mode(self, mode):
+        self.intraline_mode = mode
+        self.intraline_cache = {}
+        if self.rowCount():
+            self.dataChanged.emit(self.index(0), self.index(self.rowCount() - 1))
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.line_text(index.row())
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return self.COLORS[self.line(index.row())[0]]
+        return None
+
+    def build_rows(self):
+        if self.context is None or not self.codes:
+            self.rows = None
+            self.segments = []
+            return
+
+        rows = array('i')
+        segments = []
+        prev = 0
+        for a_start, a_count, b_start, b_count, lo, hi in iter_hunks(self.codes, self.context):
+            if lo > prev:
+                segments.append((self.ROW_FOLD, prev, lo))
+                rows.append(-len(segments))
+            segments.append((self.ROW_HEADER, format_hunk_header(a_start, a_count, b_start, b_count)))
+            rows.append(-len(segments))
+            rows.extend(range(lo, hi))
+            prev = hi
+        if len(self.codes) > prev:
+            segments.append((self.ROW_FOLD, prev, len(self.codes)))
+            rows.append(-len(segments))
+        self.rows = rows
+        self.segments = segments
+
+    def release(self):
+        """关闭上一次结果打开的文件映射"""
+        close_mapped_lines(self.a_lines, self.b_lines)
+
+    def set_diff(self, a_lines, b_lines, codes, indexes):
+        with perf.span("render", len(codes)):
+            self.beginResetModel()
+            self.release()
+            self.a_lines, self.b_lines = a_lines, b_lines
+            self.codes, self.indexes = codes, indexes
+            self.message = None
+            self.intraline_cache = {}
+            self.build_rows()
+            self.endResetModel()
+
+    def set_context(self, context):
+        """设置 hunk 上下文行数，None 表示不折叠"""
+        with perf.span("render", len(self.codes)):
+            self.beginResetModel()
+            self.context = context
+            self.build_rows()
+            self.endResetModel()
+
+    def expand(self, row):
+        """展开第 row 行的折叠内容"""
+        if self.rows is None or self.message is not None:
+            return
+        k = self.rows[row]
+        if k >= 0 or self.segments[-k - 1][0] != self.ROW_FOLD:
+            return
+        _, lo, hi = self.segments[-k - 1]
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.rows[row]
+        self.endRemoveRows()
+        self.beginInsertRows(QModelIndex(), row, row + hi - lo - 1)
+        self.rows[row:row] = array('i', range(lo, hi))
+        self.endInsertRows()
+
+    def has_diff(self):
+        return self.message is None and bool(self.codes)
+
+    def set_message(self, message):
+        self.beginResetModel()
+        self.release()
+        self.a_lines, self.b_lines = [], []
+        self.codes, self.indexes = "", array('i')
+        self.message = message
+        self.build_rows()
+        self.endResetModel()
+
+    def clear(self):
+        self.set_diff([], [], "", array('i'))
+
+
+class DiffLineDelegate(QStyledItemDelegate):
+    """直接从模型取行绘制，跳过 data() 的多次角色查询"""
+
+    def paint(self, painter, option, index):
+        model = index.model()
+        row = index.row()
+        op, _ = model.line(row)
+        text = model.line_text(row)
+        rect = option.rect.adjusted(4, 0, 0, 0)
+        painter.save()
+        if option.state & QStyle.StateFlag.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+            painter.setPen(option.palette.highlightedText().color())
         else:
-            prev_x, prev_y = 0, 0  # d=0时起点为(0,0)
-
-        # 回溯对角线（相同元素）
-        while x > prev_x and y > prev_y:
-            result.append("  " + a[x - 1])
-            x -= 1
-            y -= 1
-
-        # 回溯非对角线移动（插入/删除）
-        if d > 0:
-            if prev_x == x:
-                result.append("+ " + b[prev_y])  # 插入
-            else:
-                result.append("- " + a[prev_x])  # 删除
-            x, y = prev_x, prev_y  # 更新为前一步坐标
-
-    result.reverse()
-    return result
-
-
-def myers_diff(a, b):
-    N, M = len(a), len(b)
-    max_edit = N + M
-
-    # 记录每一步到达的位置
-    trace = []
-
-    # v - 记录该 k 线上到达的最远的 x 坐标
-    v = {1: 0}
-    for d in range(0, max_edit + 1):
-        current_v = {}
-        # 从起点出发走出 d 步时，它只可能落在 k={-d, -d+2, ...., d-2, d} 的 k 线上
-        # 循环，计算这一步可能落在的每条 k 线上的最远位置，直到碰到终点为止
-        for k in range(-d, d + 1, 2):
-
-            # 选择前一步 v 中 k 线上走得最远的 x
-            # k == -d: 最左边的对角线，没有 k-1，只能从 k+1 下移过来
-            # 如果当前不是最右边的对角线（否则没有 k+1）比较 v[k - 1] 和 v[k + 1]，谁的 x 更小
-            if k == -d or (k != d and v.get(k - 1, -1) < v.get(k + 1, -1)):
-                # 对 a 插入操作，向下移动 x 坐标不变
-                x = v.get(k + 1, 0)
-            else:
-                # 对 a 删除操作 +1 表示向右移动，删除元素
-                x = v.get(k - 1, 0) + 1
-            # 通过 k 推算出 y 坐标
-            y = x - k
-            # 斜对角移动
-            while x < N and y < M and a[x] == b[y]:
-                x += 1
-                y += 1
+            spans = model.intraline(row)
+            if spans:
+                # 行首有两个字符的操作符前缀
+                metrics = option.fontMetrics
+                for start, length in spans:
+                    x = rect.left() + metrics.horizontalAdvance(text[:start + 2])
+                    width = metrics.horizontalAdvance(text[start + 2:start + 2 + length])
+                    painter.fillRect(x, rect.top(), width, rect.height(), DiffResultModel.INTRALINE_COLORS[op])
+            painter.setPen(DiffResultModel.COLORS[op])
+        painter.drawText(rect, Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, text)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        return QSize(option.fontMetrics.horizontalAdvance(index.model().line_text(index.row())) + 8,
+                     option.fontMetrics.height())
 
-            current_v[k] = x
 
-            # 找到最短编辑序列，结束搜索并且构造差异序列
-            if x >= N and y >= M:
-                trace.append(current_v)
-                return reconstruct(a, b, trace)
+class DiffResultView(QListView):
+    """只绘制可见行的差异结果视图，行数再多渲染开销也不变"""
 
-        trace.append(current_v)
-        v = current_v
+    def __init__(self):
+        super().__init__()
+        self.result_model = DiffResultModel()
+        self.setModel(self.result_model)
+        self.setItemDelegate(DiffLineDelegate(self))
+        self.setFont(QFont("Consolas", 12))
+        # 所有行等高，视图无需逐行测量
+        self.setUniformItemSizes(True)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.doubleClicked.connect(lambda index: self.result_model.expand(index.row()))
 
-    return []
+    def clear(self):
+        self.result_model.clear()
+
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.StandardKey.Copy):
+            rows = sorted(index.row() for index in self.selectedIndexes())
+            QApplication.clipboard().setText("\n".join(self.result_model.line_text(row) for row in rows))
+            return
+        super().keyPressEvent(event)
 
 
 class LineNumberArea(QWidget):
@@ -115,28 +687,141 @@ class LineNumberArea(QWidget):
         self.editor = editor
 
     def sizeHint(self):
-        # 根据行号位数计算宽度
-        digits = len(str(max(1, self.editor.blockCount())))
-        space = 3 + self.editor.fontMetrics().horizontalAdvance('9') * digits + 5
-        return QSize(space, 0)
+        return QSize(self.editor.line_number_area_width(), 0)
 
     def paintEvent(self, event):
         self.editor.line_number_area_paint_event(event)
 
 
 class CustomPlainTextEdit(QPlainTextEdit):
+    """带行号的编辑框；文本超过阈值时进入大文档模式：不自动换行、不记录撤销，粘贴或拖入的大段内容分块载入"""
+
+    # 超过任一阈值时进入大文档模式
+    LARGE_DOCUMENT_CHARS = 4 * 1024 * 1024
+    LARGE_DOCUMENT_LINES = 100000
+    # 粘贴或拖入超过该字符数的内容时分块载入，每块的字符数相同
+    LOAD_CHUNK_CHARS = 256 * 1024
+
+    load_progress = Signal(int, int)  # 已载入字符数, 总字符数
+    load_finished = Signal()
+
     def __init__(self):
         super().__init__()
         self.lineNumberArea = LineNumberArea(self)
+        self.large_document = False
+        # 行号栏宽度按位数缓存，行数的位数变化时才重新计算
+        self.gutter_digits = 0
+        self.gutter_width = 0
+        self.viewport_margin = -1
+        # 当前行高亮所在的块，光标在同一行内移动时不重建 ExtraSelections
+        self.highlighted_line = None
+        # 分块载入的状态：(文本, 已载入字符数, 载入前是否只读)，None 表示没有正在进行的载入
+        self.load_state = None
+        self.load_cursor = None
+        self.load_timer = QTimer(self)
+        self.load_timer.setInterval(0)
+        self.load_timer.timeout.connect(self.load_next_chunk)
         self.setFont(QFont("Consolas", 12))
         self.blockCountChanged.connect(self.update_line_number_area_width)
-        self.textChanged.connect(self.update_line_number_area_width)
+        self.blockCountChanged.connect(self.update_document_mode)
         self.verticalScrollBar().valueChanged.connect(self.update_line_number_area_on_scroll)
         self.updateRequest.connect(self.update_line_number_area)
         self.update_line_number_area_width()
         self.cursorPositionChanged.connect(self.highlight_current_line)
 
+    def is_loading(self):
+        return self.load_state is not None
+
+    def set_large_document(self, large):
+        """大文档模式下不自动换行（每块高度相同，行号可以直接按行高计算）并关闭撤销记录"""
+        if large == self.large_document:
+            return
+        self.large_document = large
+        self.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap if large
+                             else QPlainTextEdit.LineWrapMode.WidgetWidth)
+        # 关闭时同时清空已有的撤销记录
+        self.setUndoRedoEnabled(not large)
+
+    def is_large(self, chars, lines):
+        return chars > self.LARGE_DOCUMENT_CHARS or lines > self.LARGE_DOCUMENT_LINES
+
+    def update_document_mode(self):
+        """行数变化后按文档大小切换模式；分块载入期间保持载入前决定的模式"""
+        if self.load_state is None:
+            self.set_large_document(self.is_large(self.document().characterCount(), self.blockCount()))
+
+    def insertFromMimeData(self, source):
+        """粘贴或拖入的内容较大时分块载入；拖入本地文件时载入文件内容"""
+        if source.hasUrls() and all(url.isLocalFile() for url in source.urls()) and len(source.urls()) == 1:
+            path = source.urls()[0].toLocalFile()
+            try:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    self.load_text(f.read())
+            except OSError:
+                super().insertFromMimeData(source)
+            return
+        text = source.text() if source.hasText() else ""
+        if len(text) > self.LOAD_CHUNK_CHARS:
+            self.load_text(text)
+            return
+        super().insertFromMimeData(source)
+
+    def load_text(self, text):
+        """在光标处（替换选中的内容）分块插入 text，载入期间编辑框只读，通过 load_progress 报告进度"""
+        self.cancel_loading()
+        cursor = self.textCursor()
+        cursor.removeSelectedText()
+        # 先按插入后的大小切换模式，插入过程中不再逐块换行和记录撤销
+        self.set_large_document(self.is_large(self.document().characterCount() + len(text),
+                                              self.blockCount() + text.count("\n")))
+        self.load_cursor = cursor
+        self.load_state = (text, 0, self.isReadOnly())
+        self.setReadOnly(True)
+        self.load_next_chunk()
+
+    def load_next_chunk(self):
+        if self.load_state is None:
+            self.load_timer.stop()
+            return
+        text, offset, read_only = self.load_state
+        chunk = text[offset:offset + self.LOAD_CHUNK_CHARS]
+        with perf.span("set_text", len(chunk)):
+            self.load_cursor.insertText(chunk)
+        offset += len(chunk)
+        self.load_progress.emit(offset, len(text))
+        if offset < len(text):
+            self.load_state = (text, offset, read_only)
+            self.load_timer.start()
+            return
+        self.setTextCursor(self.load_cursor)
+        self.finish_loading(read_only)
+        self.load_finished.emit()
+
+    def cancel_loading(self):
+        """停止正在进行的载入，已插入的部分保留"""
+        if self.load_state is not None:
+            self.finish_loading(self.load_state[2])
+
+    def finish_loading(self, read_only):
+        self.load_state = None
+        self.load_cursor = None
+        self.load_timer.stop()
+        self.setReadOnly(read_only)
+        self.update_document_mode()
+
+    def clear(self):
+        self.cancel_loading()
+        super().clear()
+        self.update_document_mode()
+        # clear() 结束时会恢复清空前的撤销设置，这里按当前模式重新设置
+        self.setUndoRedoEnabled(not self.large_document)
+
     def highlight_current_line(self):
+        # 光标仍在同一行时高亮不变（选区的光标会随编辑自动移动）
+        line = (self.textCursor().blockNumber(), self.isReadOnly())
+        if line == self.highlighted_line:
+            return
+        self.highlighted_line = line
         extra_selections = []
 
         if not self.isReadOnly():
@@ -150,9 +835,33 @@ class CustomPlainTextEdit(QPlainTextEdit):
 
         self.setExtraSelections(extra_selections)
 
+    def setReadOnly(self, read_only):
+        super().setReadOnly(read_only)
+        self.highlight_current_line()
+
+    def line_number_area_width(self):
+        """根据行号位数计算宽度，位数不变时直接返回缓存的结果"""
+        digits = len(str(max(1, self.blockCount())))
+        if digits != self.gutter_digits:
+            self.gutter_digits = digits
+            self.gutter_width = 3 + self.fontMetrics().horizontalAdvance('9') * digits + 5
+        return self.gutter_width
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.Type.FontChange:
+            # 字体变化后重新计算行号栏宽度
+            self.gutter_digits = 0
+            self.update_line_number_area_width()
+
     def update_line_number_area_width(self):
-        self.setViewportMargins(self.lineNumberArea.sizeHint().width(), 0, 0, 0)
-        self.lineNumberArea.update()
+        width = self.line_number_area_width()
+        if width == self.viewport_margin:
+            return
+        self.viewport_margin = width
+        self.setViewportMargins(width, 0, 0, 0)
+        cr = self.contentsRect()
+        self.lineNumberArea.setGeometry(QRect(cr.left(), cr.top(), width, cr.height()))
 
     def update_line_number_area_on_scroll(self, value):
         self.lineNumberArea.update()
@@ -168,30 +877,56 @@ class CustomPlainTextEdit(QPlainTextEdit):
     def resizeEvent(self, event):
         super().resizeEvent(event)
         cr = self.contentsRect()
-        self.lineNumberArea.setGeometry(QRect(cr.left(), cr.top(), self.lineNumberArea.sizeHint().width(), cr.height()))
+        self.lineNumberArea.setGeometry(QRect(cr.left(), cr.top(), self.line_number_area_width(), cr.height()))
 
     def line_number_area_paint_event(self, event):
         painter = QPainter(self.lineNumberArea)
-        painter.fillRect(event.rect(), QColor("#f0f0f0"))
+        rect = event.rect()
+        painter.fillRect(rect, QColor("#f0f0f0"))
+        painter.setPen(Qt.GlobalColor.black)
+        width = self.lineNumberArea.width() - 3
+        align = Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
 
         block = self.firstVisibleBlock()
+        if not block.isValid():
+            return
         block_number = block.blockNumber()
         top = self.blockBoundingGeometry(block).translated(self.contentOffset()).top()
-        font_metrics = self.fontMetrics()
-        line_height = font_metrics.height()
-
-        while block.isValid() and top <= event.rect().bottom():
-            if block.isVisible() and top + line_height >= event.rect().top():
-                number = str(block_number + 1)
-                painter.setPen(Qt.GlobalColor.black)
-                painter.drawText(0, int(top), self.lineNumberArea.width() - 3, line_height,
-                                 Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter, number)
+
+        if self.lineWrapMode() == QPlainTextEdit.LineWrapMode.NoWrap:
+            # 不换行时每块只有一行、高度相同，直接按行高算出需要绘制的行号范围，不再逐块查询几何信息
+            line_height = self.blockBoundingRect(block).height()
+            first = max(int((rect.top() - top) // line_height), 0)
+            last = min(int((rect.bottom() - top) // line_height) + 1, self.blockCount() - block_number)
+            height = int(line_height)
+            for row in range(first, last):
+                painter.drawText(0, int(top + row * line_height), width, height, align, str(block_number + row + 1))
+            return
+
+        while block.isValid() and top <= rect.bottom():
+            # 换行时各块高度不同，逐块累加高度
+            bottom = top + self.blockBoundingRect(block).height()
+            if block.isVisible() and bottom >= rect.top():
+                painter.drawText(0, int(top), width, self.fontMetrics().height(), align, str(block_number + 1))
             block = block.next()
             block_number += 1
-            top = self.blockBoundingGeometry(block).translated(self.contentOffset()).top()
+            top = bottom
 
 
 class FileCompareWidget(QWidget):
+    # 算法选择框显示的名称 -> diff_engine.ALGORITHMS 中的键
+    ALGORITHM_NAMES = {
+        "Myers": "myers",
+        "Patience": "patience",
+        "Histogram": "histogram",
+    }
+
+    INTRALINE_MODES = {
+        "关闭": None,
+        "按词": "word",
+        "按字符": "char",
+    }
+
     def __init__(self, main_window):
         super().__init__()
         self.main_window = main_window
@@ -199,16 +934,141 @@ class FileCompareWidget(QWidget):
         self.clear_right_text_button = None
         self.clear_left_text_button = None
         self.compare_button = None
+        self.cancel_button = None
+        self.open_files_button = None
+        self.open_directories_button = None
+        self.merge_button = None
+        self.algorithm_combo = None
+        self.fold_check = None
+        self.context_spin = None
+        self.intraline_combo = None
+        self.export_button = None
         self.diff_result = None
         self.right_text = None
         self.left_text = None
+        # 文件模式下左右两侧对应的文件路径，为 None 时比较编辑框中的文本
+        self.left_path = None
+        self.right_path = None
+        # 目录模式下左右两侧的目录，为 None 时不在目录模式
+        self.left_root = None
+        self.right_root = None
+        self.editor_stack = None
+        self.tree_view = None
+        self.tree_label = None
+        self.only_changed_check = None
+        # 每次发起比较递增，用来丢弃过期的结果
+        self.diff_revision = 0
+        self.diff_worker = None
+        self.diff_start_time = 0
+        self.directory_revision = 0
+        self.directory_worker = None
+        self.directory_start_time = 0
+        # 目录比较的摘要缓存，再次比较时大小和修改时间没变的文件不再读取
+        self.hash_cache = HashCache()
+        self.merge_worker = None
+        self.merge_dialog = None
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(1)
+        # 目录比较单独使用一个线程，比较过程中仍然可以查看单个文件的差异
+        self.directory_pool = QThreadPool()
+        self.directory_pool.setMaxThreadCount(1)
         self.setup_ui()
 
+    def clear_left_text(self):
+        self.close_files()
+        self.close_directories()
+        self.left_text.clear()
+
+    def clear_right_text(self):
+        self.close_files()
+        self.close_directories()
+        self.right_text.clear()
+
     def clear_all_texts(self):
+        self.close_files()
+        self.close_directories()
         self.left_text.clear()
         self.right_text.clear()
         self.diff_result.clear()
 
+    def open_files(self):
+        """文件模式：直接从磁盘比较两个文件，内容不加载到编辑框"""
+        left_path, _ = QFileDialog.getOpenFileName(self, "选择旧文件")
+        if not left_path:
+            return
+        right_path, _ = QFileDialog.getOpenFileName(self, "选择新文件")
+        if not right_path:
+            return
+        self.close_directories()
+        self.left_path, self.right_path = left_path, right_path
+        for editor, path in ((self.left_text, left_path), (self.right_text, right_path)):
+            editor.clear()
+            editor.setReadOnly(True)
+            editor.setPlaceholderText(f"已打开文件: {path}")
+        self.update_status(f"文件模式: {left_path} ↔ {right_path}")
+
+    def close_files(self):
+        if self.left_path is None:
+            return
+        self.left_path = self.right_path = None
+        self.left_text.setReadOnly(False)
+        self.right_text.setReadOnly(False)
+        self.left_text.setPlaceholderText("旧文本")
+        self.right_text.setPlaceholderText("新文本")
+
+    def open_directories(self):
+        """目录模式：比较两个目录下的所有文件，结果显示为目录树，点击文件查看该文件的差异"""
+        left_root = QFileDialog.getExistingDirectory(self, "选择旧目录")
+        if not left_root:
+            return
+        right_root = QFileDialog.getExistingDirectory(self, "选择新目录")
+        if not right_root:
+            return
+        self.close_files()
+        self.left_root, self.right_root = left_root, right_root
+        self.tree_label.setText(f"{left_root} ↔ {right_root}")
+        self.editor_stack.setCurrentIndex(1)
+        self.run_directory_diff()
+
+    def close_directories(self):
+        if self.left_root is None:
+            return
+        if self.directory_worker is not None:
+            self.directory_worker.cancel()
+            self.directory_worker = None
+            self.update_cancel_button()
+        # 丢弃仍在进行中的目录比较的结果
+        self.directory_revision += 1
+        self.left_root = self.right_root = None
+        self.tree_view.model().clear()
+        self.editor_stack.setCurrentIndex(0)
+
+    def open_merge_files(self):
+        """三方合并：依次选择共同祖先、我方和对方的文件"""
+        paths = []
+        for title in ("选择共同祖先（base）文件", "选择我方（ours）文件", "选择对方（theirs）文件"):
+            path, _ = QFileDialog.getOpenFileName(self, title)
+            if not path:
+                return
+            paths.append(path)
+        worker = MergeWorker(*paths, self.ALGORITHM_NAMES[self.algorithm_combo.currentText()])
+        worker.signals.finished.connect(self.on_merge_finished)
+        worker.signals.failed.connect(self.on_merge_failed)
+        self.merge_worker = worker
+        self.update_status("正在合并...")
+        self.thread_pool.start(worker)
+
+    def on_merge_finished(self, result):
+        self.merge_worker = None
+        text, conflicts = result
+        self.update_status(f"三方合并完成，{conflicts} 处冲突" if conflicts else "三方合并完成，没有冲突")
+        self.merge_dialog = MergeResultDialog(text, conflicts, self)
+        self.merge_dialog.show()
+
+    def on_merge_failed(self, message):
+        self.merge_worker = None
+        self.update_status(f"三方合并失败: {message}")
+
     def setup_ui(self):
         layout = QVBoxLayout()
 
@@ -217,61 +1077,283 @@ class FileCompareWidget(QWidget):
         self.right_text = CustomPlainTextEdit()
         self.left_text.setPlaceholderText("旧文本")
         self.right_text.setPlaceholderText("新文本")
+        for editor in (self.left_text, self.right_text):
+            editor.load_progress.connect(self.on_editor_load_progress)
+            editor.load_finished.connect(self.on_editor_load_finished)
         editor_layout.addWidget(self.left_text)
         editor_layout.addWidget(self.right_text)
+        editor_page = QWidget()
+        editor_layout.setContentsMargins(0, 0, 0, 0)
+        editor_page.setLayout(editor_layout)
+
+        # 目录模式：比较结果的目录树
+        tree_page = QWidget()
+        tree_layout = QVBoxLayout()
+        tree_layout.setContentsMargins(0, 0, 0, 0)
+        tree_bar = QHBoxLayout()
+        self.tree_label = QLabel()
+        tree_bar.addWidget(self.tree_label)
+        tree_bar.addStretch()
+        self.only_changed_check = QCheckBox("只显示有差异的文件")
+        self.only_changed_check.setChecked(True)
+        tree_bar.addWidget(self.only_changed_check)
+        tree_layout.addLayout(tree_bar)
+        self.tree_view = QTreeView()
+        self.tree_view.setModel(DirectoryTreeModel())
+        # 所有行等高，视图无需逐行测量
+        self.tree_view.setUniformRowHeights(True)
+        self.tree_view.header().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.tree_view.header().setStretchLastSection(False)
+        self.tree_view.clicked.connect(self.show_tree_file)
+        self.only_changed_check.toggled.connect(self.tree_view.model().set_only_changed)
+        tree_layout.addWidget(self.tree_view)
+        tree_page.setLayout(tree_layout)
+
+        self.editor_stack = QStackedWidget()
+        self.editor_stack.addWidget(editor_page)
+        self.editor_stack.addWidget(tree_page)
 
-        self.diff_result = CustomPlainTextEdit()
-        self.diff_result.setReadOnly(True)
+        self.diff_result = DiffResultView()
 
         btn_layout = QHBoxLayout()
 
         self.compare_button = QPushButton("比较差异")
         self.compare_button.clicked.connect(self.run_diff)
+        self.cancel_button = QPushButton("取消比较")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_diff)
+        self.algorithm_combo = QComboBox()
+        self.algorithm_combo.addItems(self.ALGORITHM_NAMES.keys())
+        self.algorithm_combo.setToolTip("Patience/Histogram 以唯一行为锚点分割，适合有代码块移动的源文件")
+        self.open_files_button = QPushButton("打开文件")
+        self.open_files_button.clicked.connect(self.open_files)
+        self.open_directories_button = QPushButton("比较目录")
+        self.open_directories_button.clicked.connect(self.open_directories)
+        self.merge_button = QPushButton("三方合并")
+        self.merge_button.clicked.connect(self.open_merge_files)
         self.clear_left_text_button = QPushButton("清空左侧")
         self.clear_right_text_button = QPushButton("清空右侧")
         self.clear_all_text_button = QPushButton("清空所有")
-        self.clear_left_text_button.clicked.connect(self.left_text.clear)
-        self.clear_right_text_button.clicked.connect(self.right_text.clear)
+        self.clear_left_text_button.clicked.connect(self.clear_left_text)
+        self.clear_right_text_button.clicked.connect(self.clear_right_text)
         self.clear_all_text_button.clicked.connect(self.clear_all_texts)
 
 
-        layout.addLayout(editor_layout)
+        layout.addWidget(self.editor_stack)
+        btn_layout.addWidget(QLabel("算法:"))
+        btn_layout.addWidget(self.algorithm_combo)
         btn_layout.addWidget(self.compare_button)
+        btn_layout.addWidget(self.cancel_button)
+        btn_layout.addWidget(self.open_files_button)
+        btn_layout.addWidget(self.open_directories_button)
+        btn_layout.addWidget(self.merge_button)
         btn_layout.addWidget(self.clear_left_text_button)
         btn_layout.addWidget(self.clear_right_text_button)
         btn_layout.addWidget(self.clear_all_text_button)
         layout.addLayout(btn_layout)
 
-        layout.addWidget(QLabel("对比结果："))
+        result_bar = QHBoxLayout()
+        result_bar.addWidget(QLabel("对比结果："))
+        self.fold_check = QCheckBox("折叠相同内容")
+        self.fold_check.setChecked(True)
+        self.fold_check.toggled.connect(self.update_fold_context)
+        result_bar.addWidget(self.fold_check)
+        result_bar.addWidget(QLabel("上下文行数:"))
+        self.context_spin = QSpinBox()
+        self.context_spin.setRange(0, 1000)
+        self.context_spin.setValue(3)
+        self.context_spin.valueChanged.connect(self.update_fold_context)
+        result_bar.addWidget(self.context_spin)
+        result_bar.addWidget(QLabel("行内差异:"))
+        self.intraline_combo = QComboBox()
+        self.intraline_combo.addItems(self.INTRALINE_MODES.keys())
+        self.intraline_combo.setCurrentText("按词")
+        self.intraline_combo.currentTextChanged.connect(self.update_intraline_mode)
+        result_bar.addWidget(self.intraline_combo)
+        result_bar.addStretch()
+        self.export_button = QPushButton("导出 diff")
+        self.export_button.clicked.connect(self.export_diff)
+        result_bar.addWidget(self.export_button)
+        layout.addLayout(result_bar)
         layout.addWidget(self.diff_result)
+        self.update_fold_context()
+        self.update_intraline_mode()
 
         self.setLayout(layout)
 
+    def update_status(self, message):
+        if self.main_window:
+            self.main_window.update_status(message)
+
+    def update_fold_context(self):
+        self.context_spin.setEnabled(self.fold_check.isChecked())
+        context = self.context_spin.value() if self.fold_check.isChecked() else None
+        self.diff_result.result_model.set_context(context)
+
+    def update_intraline_mode(self):
+        self.diff_result.result_model.set_intraline_mode(self.INTRALINE_MODES[self.intraline_combo.currentText()])
+
+    def export_diff(self):
+        model = self.diff_result.result_model
+        if not model.has_diff():
+            self.update_status("没有可导出的差异")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "导出 diff", "changes.diff", "Diff 文件 (*.diff *.patch);;所有文件 (*)")
+        if not path:
+            return
+        with open(path, "w", encoding="utf-8", newline="\n") as f:
+            f.writelines(unified_diff(model.a_lines, model.b_lines, model.codes, model.indexes,
+                                      self.context_spin.value(), "旧文本", "新文本"))
+        self.update_status(f"差异已导出到 {path}")
+
+    def on_editor_load_progress(self, done, total):
+        self.update_status(f"正在载入文本 {done * 100 // total}%（{total:,} 字符）...")
+
+    def on_editor_load_finished(self):
+        editor = self.sender()
+        mode = "，已进入大文档模式（不自动换行、不记录撤销）" if editor.large_document else ""
+        self.update_status(f"文本载入完成，共 {editor.blockCount():,} 行{mode}")
+
     def run_diff(self):
-        start_time = int(time.time() * 1000)
+        if self.left_root is not None:
+            self.run_directory_diff()
+            return
+        if self.left_text.is_loading() or self.right_text.is_loading():
+            self.update_status("文本仍在载入，请载入完成后再比较")
+            return
+        self.start_diff_worker(self.left_path, self.right_path)
+
+    def start_diff_worker(self, left_path=None, right_path=None):
+        """比较两个文件，没有给出路径时比较编辑框中的文本"""
+        # 新的请求替换仍在进行中的旧请求
+        if self.diff_worker is not None:
+            self.diff_worker.cancel()
+
+        self.diff_revision += 1
+        self.diff_start_time = int(time.time() * 1000)
+        algorithm = self.ALGORITHM_NAMES[self.algorithm_combo.currentText()]
+        if left_path is not None:
+            worker = FileDiffWorker(self.diff_revision, left_path, right_path, algorithm)
+        else:
+            worker = DiffWorker(self.diff_revision, self.left_text.toPlainText(), self.right_text.toPlainText(),
+                                algorithm)
+        worker.signals.progress.connect(self.on_diff_progress)
+        worker.signals.finished.connect(self.on_diff_finished)
+        worker.signals.cancelled.connect(self.on_diff_cancelled)
+        worker.signals.failed.connect(self.on_diff_failed)
+        self.diff_worker = worker
+        self.cancel_button.setEnabled(True)
+        self.update_status("正在比较...")
+        self.thread_pool.start(worker)
+
+    def cancel_diff(self):
+        if self.diff_worker is not None:
+            self.diff_worker.cancel()
+        if self.directory_worker is not None:
+            self.directory_worker.cancel()
+
+    def update_cancel_button(self):
+        self.cancel_button.setEnabled(self.diff_worker is not None or self.directory_worker is not None)
+
+    def run_directory_diff(self):
+        if self.directory_worker is not None:
+            self.directory_worker.cancel()
+        self.directory_revision += 1
+        self.directory_start_time = int(time.time() * 1000)
+        worker = DirectoryDiffWorker(self.directory_revision, self.left_root, self.right_root, self.hash_cache,
+                                     self.ALGORITHM_NAMES[self.algorithm_combo.currentText()])
+        worker.signals.progress.connect(self.on_directory_progress)
+        worker.signals.compared.connect(self.on_directory_compared)
+        worker.signals.stats.connect(self.on_directory_stats)
+        worker.signals.finished.connect(self.on_directory_finished)
+        worker.signals.cancelled.connect(self.on_directory_cancelled)
+        worker.signals.failed.connect(self.on_directory_failed)
+        self.directory_worker = worker
+        self.update_cancel_button()
         self.diff_result.clear()
-        cursor = self.diff_result.textCursor()
+        self.directory_pool.start(worker)
+
+    def show_tree_file(self, index):
+        """在下方显示目录树中选中文件的差异"""
+        node = index.internalPointer()
+        if node.is_dir or self.left_root is None:
+            return
+        self.start_diff_worker(*pair_paths(self.left_root, self.right_root, node.path))
+        self.update_status(f"正在比较 {node.path}...")
+
+    def on_directory_progress(self, revision, message):
+        if revision == self.directory_revision:
+            self.update_status(message)
+
+    def on_directory_compared(self, revision, statuses):
+        if revision == self.directory_revision:
+            self.tree_view.model().set_statuses(statuses)
 
-        a_text = self.left_text.toPlainText()
-        b_text = self.right_text.toPlainText()
+    def on_directory_stats(self, revision, batch):
+        if revision == self.directory_revision:
+            self.tree_view.model().add_stats(batch)
 
-        if hash_text(a_text) == hash_text(b_text):
-            cursor.insertText("两个文本完全一致")
+    def finish_directory_worker(self, revision):
+        """目录比较结束后的处理，返回结果是否仍是最新的"""
+        if revision != self.directory_revision:
+            return False
+        self.directory_worker = None
+        self.update_cancel_button()
+        return True
+
+    def on_directory_finished(self, revision):
+        if not self.finish_directory_worker(revision):
+            return
+        counts = {status: 0 for status in DirectoryTreeModel.STATUS_TEXT}
+        for status in self.tree_view.model().statuses.values():
+            counts[status] += 1
+        summary = "，".join(f"{DirectoryTreeModel.STATUS_TEXT[status]} {count}" for status, count in counts.items())
+        end_time = int(time.time() * 1000)
+        self.update_status(f"目录比较完成：{summary}，耗时: {end_time - self.directory_start_time} 毫秒")
+
+    def on_directory_cancelled(self, revision):
+        if self.finish_directory_worker(revision):
+            self.update_status("目录比较已取消")
+
+    def on_directory_failed(self, revision, message):
+        if self.finish_directory_worker(revision):
+            self.update_status(f"目录比较失败: {message}")
+
+    def on_diff_progress(self, revision, distance):
+        if revision == self.diff_revision:
+            self.update_status(f"正在比较，编辑距离 ≥ {distance}")
+
+    def on_diff_cancelled(self, revision):
+        if revision != self.diff_revision:
+            return
+        self.diff_worker = None
+        self.update_cancel_button()
+        self.update_status("文件对比已取消")
+
+    def on_diff_failed(self, revision, message):
+        if revision != self.diff_revision:
+            return
+        self.diff_worker = None
+        self.update_cancel_button()
+        self.update_status(f"文件对比失败: {message}")
+
+    def on_diff_finished(self, revision, diff):
+        if revision != self.diff_revision:
+            # 已被新的比较取代：结果不再显示，关闭其中的文件映射，否则文件一直被占用
+            if diff is not None:
+                close_mapped_lines(diff[0], diff[1])
+            return
+        budget = self.diff_worker.budget
+        self.diff_worker = None
+        self.update_cancel_button()
+
+        if diff is None:
+            self.diff_result.result_model.set_message("两个文本完全一致")
         else:
-            a_lines = a_text.splitlines()
-            b_lines = b_text.splitlines()
-            diff = myers_diff(a_lines, b_lines)
-            for line in diff:
-                fmt = QTextCharFormat()
-                if line.startswith("-"):
-                    fmt.setForeground(QColor("red"))
-                elif line.startswith("+"):
-                    fmt.setForeground(QColor("green"))
-                else:
-                    fmt.setForeground(QColor("gray"))
-
-                cursor.setCharFormat(fmt)
-                cursor.insertText(line + "\n")
+            self.diff_result.result_model.set_diff(*diff)
         end_time = int(time.time() * 1000)
-        if self.main_window:
-            self.main_window.update_status(f'文件对比完成，耗时: {end_time - start_time} 毫秒')
\ No newline at end of file
+        message = f'文件对比完成，耗时: {end_time - self.diff_start_time} 毫秒'
+        note = budget.note()
+        if note:
+            message += f"（{note}）"
+        self.update_status(message)
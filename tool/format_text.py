@@ -1,51 +1,435 @@
 import re
-import json
-import xml.etree.ElementTree as ET
+import time
+from functools import lru_cache
+from bisect import bisect_left
+from itertools import accumulate
 from PySide6.QtWidgets import (
     QWidget, QSplitter, QVBoxLayout, QPlainTextEdit, QComboBox,
-    QLabel, QHBoxLayout, QApplication, QTextEdit
+    QLabel, QHBoxLayout, QApplication
 )
-from PySide6.QtCore import Qt, QTimer
-from pygments import lexers, highlight
-from pygments.formatters import HtmlFormatter
-from pygments.styles import get_style_by_name
+from PySide6.QtCore import Qt, QTimer, QObject, QRunnable, QThreadPool, Signal, QPoint
+from PySide6.QtGui import QSyntaxHighlighter, QTextCharFormat, QColor, QFont, QTextCursor, QTextLayout
+from tool import perf
+from tool.code_format import SUPPORTED_LANGUAGES, format_code
+from tool.language_detect import LanguageDetector
+from tool.lexer_state import ROOT_STACK, supports_state, lex_with_state
+from tool.text_digest import common_affix_lengths
+from tool.worker_errors import error_message
+
+# 码点超出 BMP 的字符，在 Qt 中占两个 UTF-16 单元
+ASTRAL_PATTERN = re.compile('[\U00010000-\U0010FFFF]')
+
+# 超过该字符数的文本只高亮可见区域附近的行（窗口模式）
+WINDOWED_CHARS = 1024 * 1024
+# 窗口模式下可见区域上下额外高亮的行数
+WINDOW_MARGIN = 100
+# 窗口模式下每隔多少行保存一次词法状态
+CHECKPOINT_LINES = 512
+# 窗口前缺少的检查点不超过这么多个时直接补齐，否则先近似高亮，检查点在空闲时逐个补齐
+SYNC_CHECKPOINTS = 4
+
+
+def utf16_offsets(text):
+    """Python 字符下标到 Qt（UTF-16）位置的映射表，全部是 BMP 字符时返回 None"""
+    if text.isascii() or not ASTRAL_PATTERN.search(text):
+        return None
+    return [0, *accumulate(2 if ord(c) > 0xFFFF else 1 for c in text)]
+
+
+@lru_cache(maxsize=None)
+def get_lexer(alias):
+    """按语言缓存词法分析器实例；pygments 在第一次需要时才导入"""
+    from pygments import lexers
+    return lexers.get_lexer_by_name(alias)
+
+
+@lru_cache(maxsize=None)
+def get_style(name):
+    from pygments.styles import get_style_by_name
+    return get_style_by_name(name)
+
+
+class PygmentsHighlighter(QSyntaxHighlighter):
+    """按块增量高亮
+
+    每个块结束时的词法状态（状态栈、下一块的续接位置、跨到下一块的 token）作为 block state 保存，
+    文本变化后 Qt 只从变化的块开始重新高亮，直到某块的结束状态与之前相同为止；
+    格式直接用 setFormat 设置，不经过 HTML。
+    正则在完整文本上匹配，跨行 token 的高亮与整体分析一致。
+    只依赖后文“是否存在”的匹配（例如 C 宏中没有闭合的 /*）在后文变化时不会重新检查，切换语言时整体重新高亮
+
+    文本超过 WINDOWED_CHARS 时切换到窗口模式：高亮器与文档分离，Qt 不再逐块回调，
+    只给可见区域及上下 WINDOW_MARGIN 行设置格式，离开窗口的块清除格式；
+    每 CHECKPOINT_LINES 行保存一次词法状态，窗口从最近的检查点继续分析，内存和延迟只与窗口大小有关。
+    第一次跳到远处时先从 root 状态近似高亮，空闲时补齐检查点后再准确高亮
+    """
+
+    def __init__(self, document, style_name="monokai"):
+        super().__init__(document)
+        # 窗口模式下 self.document() 为 None，始终通过它访问文档
+        self.target_document = document
+        self.style_name = style_name
+        self.lexer = None
+        # 当前分析器能否从保存的状态继续分析，切换分析器时确定
+        self.resumable = False
+        # 文档全文（末尾保证有换行），正则在它上面匹配
+        self.source = "\n"
+        # 非 BMP 字符在文档中的位置，用于把 Qt 位置换算为 Python 下标
+        self.astral_positions = []
+        # token 类型 -> QTextCharFormat
+        self.formats = {}
+        # 块状态 <-> 整数编号
+        self.state_ids = {}
+        self.states = []
+        # 窗口模式：检查点 [(第 k * CHECKPOINT_LINES 行的起始下标, 该行开始时的块状态)]
+        self.windowed = False
+        self.checkpoints = [(0, (ROOT_STACK, 0, ()))]
+        # 已设置格式的块范围 [起始块号, 结束块号)，以及最近一次的可见行
+        self.window = (0, 0)
+        self.visible_lines = (0, 0)
+        # 窗口是否从准确的状态开始高亮；不准确时后台补齐检查点后重新高亮
+        self.window_exact = True
+        self.checkpoint_goal = 0
+        self.checkpoint_timer = QTimer(self)
+        self.checkpoint_timer.setInterval(0)
+        self.checkpoint_timer.timeout.connect(self.extend_checkpoints)
+
+    def set_lexer(self, lexer):
+        """切换词法分析器，需要整体重新高亮"""
+        self.lexer = lexer
+        self.resumable = lexer is not None and supports_state(lexer)
+        self.state_ids.clear()
+        self.states.clear()
+        if self.windowed:
+            del self.checkpoints[1:]
+            self.refresh_window()
+        else:
+            self.rehighlight()
+
+    def set_windowed(self, windowed):
+        """切换窗口模式；分离时 Qt 清除全部格式，重新关联时整体重新高亮"""
+        if windowed == self.windowed:
+            return
+        self.windowed = windowed
+        self.window = (0, 0)
+        self.checkpoint_timer.stop()
+        del self.checkpoints[1:]
+        self.state_ids.clear()
+        self.states.clear()
+        self.setDocument(None if windowed else self.target_document)
+
+    def set_text(self, text):
+        """把文档内容更新为 text，只替换变化的部分，从而只重新高亮受影响的块"""
+        document = self.target_document
+        old = self.source[:-1]
+        prefix, suffix = common_affix_lengths(old, text)
+        if prefix == len(old) == len(text):
+            return
+
+        # 先切换模式再修改文本，进入窗口模式时修改不会触发逐块高亮
+        windowed = len(text) > WINDOWED_CHARS
+        self.set_windowed(windowed)
+        self.source = text + "\n"
+        self.astral_positions = [m.start() + i for i, m in enumerate(ASTRAL_PATTERN.finditer(text))]
+        if windowed:
+            # 修改位置之后的检查点失效（状态中跨到后面的 token 也不能越过修改位置）
+            self.checkpoints = [(offset, state) for offset, state in self.checkpoints
+                                if offset + max(state[1], 0) < prefix or offset == 0]
+            # 修改可能增删行使块号移动，先按原来的块号清除窗口
+            self.highlight_window(0, 0)
+        if not old:
+            # 空文档直接整体设置，同时清空过期的状态表
+            self.state_ids.clear()
+            self.states.clear()
+            document.setPlainText(text)
+            self.refresh_window()
+            return
+
+        old_offsets = utf16_offsets(old)
+        start = old_offsets[prefix] if old_offsets else prefix
+        end = old_offsets[len(old) - suffix] if old_offsets else len(old) - suffix
+        cursor = QTextCursor(document)
+        cursor.beginEditBlock()
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        cursor.insertText(text[prefix:len(text) - suffix])
+        cursor.endEditBlock()
+        if windowed:
+            self.refresh_window()
+            return
+
+        # 修改落在跨行 token 中间时，该 token 要从起始块重新匹配
+        if self.lexer is None or not self.resumable:
+            return
+        block = document.findBlock(start)
+        origin = block
+        previous = origin.previous()
+        while previous.isValid() and self.block_state(previous.userState())[2]:
+            origin = previous
+            previous = origin.previous()
+        # 逐块重新高亮：某块的结束状态变化后 Qt 会继续处理后面的块
+        while origin != block:
+            self.rehighlightBlock(origin)
+            origin = origin.next()
+
+    def format_for(self, ttype):
+        fmt = self.formats.get(ttype)
+        if fmt is None:
+            style = get_style(self.style_name).style_for_token(ttype)
+            fmt = QTextCharFormat()
+            if style["color"]:
+                fmt.setForeground(QColor("#" + style["color"]))
+            if style["bgcolor"]:
+                fmt.setBackground(QColor("#" + style["bgcolor"]))
+            if style["bold"]:
+                fmt.setFontWeight(QFont.Weight.Bold)
+            if style["italic"]:
+                fmt.setFontItalic(True)
+            if style["underline"]:
+                fmt.setFontUnderline(True)
+            self.formats[ttype] = fmt
+        return fmt
+
+    def state_id(self, state):
+        state_id = self.state_ids.get(state)
+        if state_id is None:
+            state_id = len(self.states)
+            self.state_ids[state] = state_id
+            self.states.append(state)
+        return state_id
+
+    def block_state(self, state_id):
+        """编号对应的块状态，未高亮过的块从 root 开始"""
+        if 0 <= state_id < len(self.states):
+            return self.states[state_id]
+        return ROOT_STACK, 0, ()
+
+    def lex_line(self, state, start, length):
+        """从块状态 state 继续分析 source 中从 start 开始、长 length 的一行
+
+        返回 ([(行内位置, 类型, 长度), ...], 下一行开始时的块状态)，位置可能为负（token 从前面的行开始）
+        """
+        stack, resume, pending = state
+        boundary = length + 1
+        tokens = list(pending)
+        if resume < boundary:
+            found, stack, end = lex_with_state(self.lexer, self.source, stack, start + resume, start + boundary)
+            tokens.extend((pos - start, ttype, len(value)) for pos, ttype, value in found)
+            resume = end - start
+        pending = tuple((pos - boundary, ttype, size) for pos, ttype, size in tokens if pos + size > boundary)
+        return tokens, (stack, resume - boundary, pending)
+
+    def line_tokens(self, text, state, start):
+        """一行的 token 和下一行开始时的块状态；不支持续接的分析器（JSON、YAML、纯文本）逐行独立分析"""
+        if self.resumable:
+            return self.lex_line(state, start, len(text))
+        return [(pos, ttype, len(value)) for pos, ttype, value in self.lexer.get_tokens_unprocessed(text + "\n")], state
+
+    def format_ranges(self, text, tokens):
+        """把 token 转换为 (Qt 位置, 长度, 格式)，截去超出本行的部分"""
+        length = len(text)
+        offsets = utf16_offsets(text)
+        for pos, ttype, size in tokens:
+            begin, end = max(pos, 0), min(pos + size, length)
+            if begin >= end:
+                continue
+            if offsets:
+                begin, end = offsets[begin], offsets[end]
+            yield begin, end - begin, self.format_for(ttype)
+
+    def highlightBlock(self, text):
+        if self.lexer is None:
+            return
+        position = self.currentBlock().position()
+        start = position - bisect_left(self.astral_positions, position)
+        tokens, state = self.line_tokens(text, self.block_state(self.previousBlockState()), start)
+        if self.resumable:
+            self.setCurrentBlockState(self.state_id(state))
+        for begin, size, fmt in self.format_ranges(text, tokens):
+            self.setFormat(begin, size, fmt)
+
+    def line_offset(self, line):
+        """第 line 行在 source 中的起始下标"""
+        block = self.target_document.findBlockByNumber(line)
+        if not block.isValid():
+            return len(self.source) - 1
+        position = block.position()
+        return position - bisect_left(self.astral_positions, position)
+
+    def advance(self, offset, state, target):
+        """从 offset 处的行开始一直分析到 target 处的行，返回 target 处开始时的块状态
+
+        中间的行一次匹配完，不逐行生成格式
+        """
+        if not self.resumable:
+            return state
+        stack, resume, pending = state
+        distance = target - offset
+        if resume < distance:
+            found, stack, end = lex_with_state(self.lexer, self.source, stack, offset + resume, target)
+            pending = tuple((pos - target, ttype, len(value)) for pos, ttype, value in found
+                            if pos + len(value) > target)
+            resume = end - offset
+        else:
+            pending = tuple((pos - distance, ttype, size) for pos, ttype, size in pending if pos + size > distance)
+        return stack, resume - distance, pending
+
+    def add_checkpoint(self):
+        offset, state = self.checkpoints[-1]
+        target = self.line_offset(len(self.checkpoints) * CHECKPOINT_LINES)
+        self.checkpoints.append((target, self.advance(offset, state, target)))
+
+    def extend_checkpoints(self):
+        """空闲时每次补一个检查点，到达窗口后按准确的状态重新高亮窗口"""
+        if len(self.checkpoints) <= self.checkpoint_goal:
+            self.add_checkpoint()
+            return
+        self.checkpoint_timer.stop()
+        if not self.window_exact:
+            self.refresh_window()
+
+    def state_at(self, line):
+        """第 line 行的 (起始下标, 开始时的块状态)，从不超过它的最近检查点继续分析
+
+        缺少的检查点太多时返回的状态为 None，并在空闲时补齐
+        """
+        offset = self.line_offset(line)
+        if not self.resumable:
+            return offset, (ROOT_STACK, 0, ())
+        index = line // CHECKPOINT_LINES
+        if index - len(self.checkpoints) >= SYNC_CHECKPOINTS:
+            self.checkpoint_goal = index
+            self.checkpoint_timer.start()
+            return offset, None
+        while len(self.checkpoints) <= index:
+            self.add_checkpoint()
+        checkpoint_offset, state = self.checkpoints[index]
+        return offset, self.advance(checkpoint_offset, state, offset)
+
+    def set_visible_lines(self, first, last):
+        """窗口模式下可见区域变为第 first 到 last 行，超出已高亮的范围时重新设置窗口"""
+        self.visible_lines = (first, last)
+        if not self.windowed:
+            return
+        low, high = self.window
+        if low <= max(first - WINDOW_MARGIN // 2, 0) and last + WINDOW_MARGIN // 2 < high:
+            return
+        self.highlight_window(max(first - WINDOW_MARGIN, 0), last + WINDOW_MARGIN + 1)
+
+    def refresh_window(self):
+        """文本或分析器变化后重新高亮当前窗口"""
+        if self.windowed:
+            first, last = self.visible_lines
+            self.highlight_window(max(first - WINDOW_MARGIN, 0), last + WINDOW_MARGIN + 1)
+
+    def highlight_window(self, low, high):
+        """给第 low 到 high - 1 块设置格式，清除之前窗口中其余块的格式"""
+        with perf.span("highlight", high - low):
+            self.apply_window(low, high)
+
+    def apply_window(self, low, high):
+        document = self.target_document
+        old_low, old_high = self.window
+        self.window = (low, high)
+        # 标记重新布局可能同步触发滚动条信号并再次进入这里，等窗口状态完整后再统一标记
+        dirty = []
+        for number in range(old_low, old_high):
+            if low <= number < high:
+                continue
+            block = document.findBlockByNumber(number)
+            if not block.isValid():
+                break
+            block.layout().clearFormats()
+            dirty.append((block.position(), block.length()))
+
+        block = document.findBlockByNumber(low)
+        self.window_exact = True
+        if block.isValid():
+            offset, state = self.state_at(low)
+            if state is None:
+                # 先假定窗口从 root 状态开始，检查点补齐后再准确地高亮
+                self.window_exact = False
+                state = (ROOT_STACK, 0, ())
+            while block.isValid() and block.blockNumber() < high:
+                text = block.text()
+                ranges = []
+                if self.lexer is not None:
+                    tokens, state = self.line_tokens(text, state, offset)
+                    for begin, size, fmt in self.format_ranges(text, tokens):
+                        format_range = QTextLayout.FormatRange()
+                        format_range.start = begin
+                        format_range.length = size
+                        format_range.format = fmt
+                        ranges.append(format_range)
+                block.layout().setFormats(ranges)
+                dirty.append((block.position(), block.length()))
+                offset += len(text) + 1
+                block = block.next()
+
+        for position, length in dirty:
+            document.markContentsDirty(position, length)
+
+
+class FormatWorkerSignals(QObject):
+    finished = Signal(int, object)  # 请求序号, (检测到的语言, 格式化结果, 格式错误信息或 None)
+    failed = Signal(int, str)  # 请求序号, 错误信息
+
+
+class FormatWorker(QRunnable):
+    """在线程池中检测语言并格式化，避免大文本阻塞界面"""
+
+    def __init__(self, revision, text, detect, format_func):
+        super().__init__()
+        self.revision = revision
+        self.text = text
+        self.detect = detect
+        self.format_func = format_func
+        self.signals = FormatWorkerSignals()
+
+    def run(self):
+        try:
+            language = self.detect(self.text)
+            try:
+                formatted, error = self.format_func(self.text, language), None
+            except ValueError as e:
+                # 输入格式有误：显示原文，并给出出错位置
+                formatted, error = self.text, str(e)
+        except Exception as e:
+            self.signals.failed.emit(self.revision, error_message(e))
+            return
+        self.signals.finished.emit(self.revision, (language, formatted, error))
 
 
 class FormatTextWidget(QWidget):
-    def __init__(self):
+    def __init__(self, main_window=None):
         super().__init__()
+        self.main_window = main_window
         self.original_edit = None
         self.detected_label = None
         self.language_combo = None
-        self.formatted_document = None
         self.formatted_display = None
+        self.highlighter = None
+        self.highlighted_language = None
+        # 每次请求格式化时递增，过期的结果直接丢弃
+        self.format_revision = 0
+        self.format_worker = None
+        # 工作线程忙时只记录有新请求，完成后按最新文本再处理一次
+        self.format_pending = False
+        self.format_start_time = 0
+        self.format_input_size = 0
+        # 只在工作线程中使用
+        self.detector = LanguageDetector()
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(1)
         self.setWindowTitle("代码格式化工具")
         # self.setMinimumSize(1000, 600)
 
         # 语言支持列表
-        self.supported_languages = {
-            "XML": "xml",
-            "JSON": "json",
-            "Python": "python",
-            "C": "c",
-            "C++": "cpp",
-            "Java": "java",
-            "Go": "go",
-            "YAML": "yaml",
-            "SQL": "sql",
-            "Plain Text": "text"
-        }
+        self.supported_languages = SUPPORTED_LANGUAGES
 
         self.init_ui()
         self.setup_connections()
 
-        # 初始化高亮样式
-        self.formatter = HtmlFormatter(
-            style=get_style_by_name("monokai"),
-            full=False,
-            noclasses=True
-        )
-
         # 防抖定时器
         self.update_timer = QTimer()
         self.update_timer.setInterval(500)
@@ -90,29 +474,20 @@ class FormatTextWidget(QWidget):
         splitter.addWidget(self.original_edit)
 
         # 格式化文本显示区
-        # 右侧显示控件优化
-        self.formatted_display = QTextEdit()
+        # 纯文本控件 + 增量语法高亮，避免每次生成并解析整篇 HTML
+        self.formatted_display = QPlainTextEdit()
         self.formatted_display.setReadOnly(True)
+        self.formatted_display.setUndoRedoEnabled(False)
 
         self.formatted_display.setStyleSheet("""
-            QTextEdit {
+            QPlainTextEdit {
                 font-family: 'Consolas', 'Courier New', monospace;
                 font-size: 12pt;
                 background-color: #2d2d2d;
                 color: #f8f8f2;
             }
         """)
-
-        # 提升富文本渲染性能
-        self.formatted_document = self.formatted_display.document()
-        self.formatted_document.setDefaultStyleSheet("""
-                pre { 
-                    font-family: 'Consolas', monospace; 
-                    background-color: #2d2d2d;
-                    padding: 10px;
-                    border-radius: 4px;
-                }
-            """)
+        self.highlighter = PygmentsHighlighter(self.formatted_display.document())
         splitter.addWidget(self.formatted_display)
 
         splitter.setSizes([500, 500])
@@ -123,116 +498,110 @@ class FormatTextWidget(QWidget):
     def setup_connections(self):
         self.original_edit.textChanged.connect(self.start_update_timer)
         self.language_combo.currentTextChanged.connect(self.update_formatted_text)
+        # 窗口模式下滚动或改变大小时高亮新的可见区域
+        scroll_bar = self.formatted_display.verticalScrollBar()
+        scroll_bar.valueChanged.connect(self.update_highlight_window)
+        scroll_bar.rangeChanged.connect(self.update_highlight_window)
 
     def start_update_timer(self):
         self.update_timer.start()
 
     def detect_language(self, text):
-        """自动检测代码语言[1,4](@ref)"""
-        if not text.strip():
-            return "Plain Text"
-
-        # 检测XML
-        if re.match(r'^\s*<(\?xml|!DOCTYPE|html|root|soap|rss)', text, re.I):
-            return "XML"
-
-        # 检测JSON
-        if re.match(r'^\s*[{\[]', text):
-            try:
-                json.loads(text)
-                return "JSON"
-            except:
-                pass
-
-        # 检测Python
-        if re.search(r'^\s*(import|def|class|from)\s', text, re.M):
-            return "Python"
-
-        # 检测C/C++
-        if re.search(r'^\s*#\s*include|^\s*(int|void|class)\s+\w+\s*\(', text, re.M):
-            return "C++" if re.search(r'^\s*#\s*include\s*<iostream>', text) else "C"
-
-        # 检测Java
-        if re.search(r'^\s*(package|import|public\s+class)\s', text, re.M):
-            return "Java"
-
-        # 检测Go
-        if re.search(r'^\s*(package|import|func)\s', text, re.M):
-            return "Go"
-
-        # 检测SQL
-        if re.search(r'\b(SELECT|INSERT|UPDATE|DELETE|CREATE|ALTER)\b', text, re.I):
-            return "SQL"
-
-        # 检测YAML
-        if re.search(r'^\s*[\w-]+\s*:', text) and not re.search(r'{\s*}', text):
-            return "YAML"
-
-        return "Plain Text"
+        """自动检测代码语言：只对开头和结尾的样本打分，开头不变时使用缓存结果"""
+        return self.detector.detect(text)
 
     def format_text(self, text, language):
-        """格式化不同语言的代码[1,4](@ref)"""
-        if not text.strip():
-            return ""
-
-        # 格式化JSON
-        if language == "JSON":
-            try:
-                parsed = json.loads(text)
-                return json.dumps(parsed, indent=4)
-            except Exception:
-                return text  # 返回原始文本
+        """格式化不同语言的代码：JSON、XML 流式重排缩进，格式错误时抛出带位置的 ValueError；其他语言保持原样"""
+        return format_code(text, language)
 
-        # 格式化XML
-        if language == "XML":
+    def highlight_code(self, text, language):
+        """使用Pygments进行代码高亮：语言变化时切换词法分析器，文本只替换变化的部分"""
+        if language != self.highlighted_language:
+            self.highlighted_language = language
+            lang_alias = self.supported_languages[language]
             try:
-                root = ET.fromstring(text)
-                ET.indent(root, space="  ")
-                return ET.tostring(root, encoding="unicode", method="xml")
+                # 获取语言对应的词法分析器
+                lexer = None if lang_alias == "text" else get_lexer(lang_alias)
             except Exception:
-                return text  # 返回原始文本
-
-        # 其他语言保持原样
-        return text
-
-    def highlight_code(self, text, language):
-        """使用Pygments进行代码高亮[7](@ref)"""
-        if not text.strip():
-            return ""
-
-        lang_alias = self.supported_languages[language]
-
-        try:
-            # 获取语言对应的词法分析器
-            lexer = lexers.get_lexer_by_name(lang_alias)
-            # 生成带样式的HTML
-            highlighted = highlight(text, lexer, self.formatter)
-            return highlighted
-        except Exception:
-            # 高亮失败时返回纯文本
-            return f"<pre>{text}</pre>"
+                # 找不到分析器时显示纯文本
+                lexer = None
+            # 先替换文本再切换分析器，整篇只高亮一次
+            self.highlighter.lexer = None
+            with perf.span("set_text", len(text)):
+                self.highlighter.set_text(text)
+            with perf.span("highlight", len(text)):
+                self.highlighter.set_lexer(lexer)
+        else:
+            # 非窗口模式下 Qt 在修改文本时同步高亮变化的块，这部分计入 set_text
+            with perf.span("set_text", len(text)):
+                self.highlighter.set_text(text)
+        self.update_highlight_window()
+
+    def update_highlight_window(self, *args):
+        """把右侧当前可见的行号范围告诉高亮器"""
+        viewport = self.formatted_display.viewport()
+        first = self.formatted_display.cursorForPosition(QPoint(0, 0)).blockNumber()
+        last = self.formatted_display.cursorForPosition(QPoint(0, viewport.height() - 1)).blockNumber()
+        self.highlighter.set_visible_lines(first, last)
+
+    def update_status(self, message):
+        if self.main_window:
+            self.main_window.update_status(message)
 
     def update_formatted_text(self):
-        """更新右侧格式化后的文本"""
+        """请求更新右侧格式化后的文本，检测和格式化在工作线程中进行"""
+        self.format_revision += 1
+        if self.format_worker is not None:
+            # 同一时间只处理一个请求，期间的多次请求合并为完成后的一次
+            self.format_pending = True
+            return
+        self.start_format_worker()
+
+    def start_format_worker(self):
         text = self.original_edit.toPlainText()
-
-        # 自动检测语言
-        detected_lang = self.detect_language(text)
-        self.detected_label.setText(f"检测结果: {detected_lang}")
-
-        # 更新语言选择框
+        self.format_pending = False
+        self.format_start_time = int(time.time() * 1000)
+        self.format_input_size = len(text)
+        worker = FormatWorker(self.format_revision, text, self.detect_language, self.format_text)
+        worker.signals.finished.connect(self.on_format_finished)
+        worker.signals.failed.connect(self.on_format_failed)
+        self.format_worker = worker
+        self.update_status(f"正在格式化，输入 {len(text):,} 字符...")
+        self.thread_pool.start(worker)
+
+    def finish_format_worker(self, revision):
+        """工作线程结束后的处理，返回结果是否仍是最新的"""
+        self.format_worker = None
+        if self.format_pending:
+            self.start_format_worker()
+            return False
+        return revision == self.format_revision
+
+    def on_format_failed(self, revision, message):
+        if self.finish_format_worker(revision):
+            self.update_status(f"格式化失败: {message}")
+
+    def on_format_finished(self, revision, result):
+        if not self.finish_format_worker(revision):
+            return
+        detected_lang, formatted, error = result
+        self.detected_label.setText(f"检测结果: {detected_lang}" + ("（格式错误）" if error else ""))
+
+        # 更新语言选择框，不再触发一次格式化
         if detected_lang != self.language_combo.currentText():
+            self.language_combo.blockSignals(True)
             self.language_combo.setCurrentText(detected_lang)
+            self.language_combo.blockSignals(False)
 
-        # 格式化文本
-        formatted = self.format_text(text, detected_lang)
-
-        # 应用语法高亮
-        highlighted = self.highlight_code(formatted, detected_lang)
+        # 显示在右侧编辑框并应用语法高亮
+        self.highlight_code(formatted, detected_lang)
 
-        # 显示在右侧编辑框
-        # self.formatted_display.textCursor().insertText(highlighted)
-        self.formatted_display.setHtml(highlighted)
+        if error:
+            self.update_status(f"{detected_lang} 格式错误: {error}")
+            return
+        end_time = int(time.time() * 1000)
+        self.update_status(f"格式化完成（{detected_lang}），输入 {self.format_input_size:,} 字符，"
+                           f"耗时: {end_time - self.format_start_time} 毫秒")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,227 @@
+import re
+
+# 从文件读取时每次读取的字符数
+READ_SIZE = 1024 * 1024
+# 累积多少个输出片段后产出一块
+OUTPUT_PARTS = 8192
+
+# 展开写法：普通字符整段匹配，只在转义处进入分支
+_STRING = r'"[^"\\\x00-\x1f]*(?:\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})[^"\\\x00-\x1f]*)*"'
+_NUMBER = r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?'
+_SCALAR = rf'{_STRING}|{_NUMBER}|true|false|null'
+_WS = r'[ \t\n\r]*'
+
+# 跳过空白后匹配一个 token，lastgroup 即 token 类型。
+# 为减少逐个 token 的解释器开销：前面的逗号作为 sep 并入下一个 token，
+# "键": 标量 和 "键": 各合并为一个 token；
+# 任何其他非空白字符都匹配为 error，因此 finditer 的各个匹配首尾相接，不会跳过非法内容
+TOKEN_PATTERN = re.compile(rf'''
+    {_WS}
+    (?P<sep>,{_WS})?
+    (?:
+        (?P<member>(?P<member_key>{_STRING}){_WS}:{_WS}(?P<member_value>{_SCALAR}))
+      | (?P<key>(?P<key_text>{_STRING}){_WS}:)
+      | (?P<string>{_STRING})
+      | (?P<number>{_NUMBER})
+      | (?P<literal>true|false|null)
+      | (?P<open>[{{\[])
+      | (?P<close>[}}\]])
+      | (?P<comma>,)
+      | (?P<colon>:)
+      | (?P<error>[^ \t\n\r])
+    )''', re.VERBOSE)
+# 可能是某个 token 开头的字符
+TOKEN_START = set('"-0123456789tfn{}[],:')
+
+# 解析状态：下一个 token 期望是什么
+VALUE, VALUE_OR_CLOSE, KEY, KEY_OR_CLOSE, COLON, COMMA_OR_CLOSE, END = range(7)
+EXPECTED = {
+    VALUE: "值",
+    VALUE_OR_CLOSE: "值或 ']'",
+    KEY: "带双引号的键",
+    KEY_OR_CLOSE: "带双引号的键或 '}'",
+    COLON: "':'",
+    COMMA_OR_CLOSE: "',' 或结束括号",
+    END: "输入结束",
+}
+CLOSING = {"{": "}", "[": "]"}
+
+
+class JSONFormatError(ValueError):
+    """格式错误，带有出错位置（与 json.JSONDecodeError 相同，行列号从 1 开始）"""
+
+    def __init__(self, msg, pos, lineno, colno):
+        super().__init__(f"{msg}: 第 {lineno} 行第 {colno} 列（字符 {pos}）")
+        self.msg = msg
+        self.pos = pos
+        self.lineno = lineno
+        self.colno = colno
+
+
+def read_chunks(file, size=READ_SIZE):
+    """按块读取文本文件"""
+    return iter(lambda: file.read(size), "")
+
+
+class JSONTokenizer:
+    """把字符串或字符串块序列切分成 JSON token
+
+    跨块的 token 拼接后再匹配，内存占用只与块大小和最长的 token 有关。
+    迭代产出 (类型, 匹配对象)，匹配对象在当前缓冲区中的位置加上 base 即全局偏移
+    """
+
+    def __init__(self, source):
+        self.chunks = iter((source,)) if isinstance(source, str) else iter(source)
+        self.buf = ""
+        # buf 之前已经丢弃的字符数、换行数，以及 buf 开头所在行的行首偏移
+        self.base = 0
+        self.lines = 0
+        self.line_start = 0
+
+    def locate(self, pos):
+        """全局偏移 pos（必须仍在当前缓冲区内）对应的 (行号, 列号)"""
+        offset = pos - self.base
+        newline = self.buf.rfind("\n", 0, offset)
+        line_start = self.base + newline + 1 if newline >= 0 else self.line_start
+        return self.lines + self.buf.count("\n", 0, offset) + 1, pos - line_start + 1
+
+    def error(self, msg, pos):
+        return JSONFormatError(msg, pos, *self.locate(pos))
+
+    def __iter__(self):
+        finditer = TOKEN_PATTERN.finditer
+        final = False
+        while not final:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                final = True
+            else:
+                self.buf = self.buf + chunk if self.buf else chunk
+            buf = self.buf
+            end = len(buf)
+            pos = 0
+            for m in finditer(buf):
+                kind = m.lastgroup
+                if kind == "error":
+                    # 非最后一块时可能只是 token 被截断（例如字符串还没有结束）
+                    if final or m.group(kind) not in TOKEN_START:
+                        start = m.start(kind)
+                        raise self.error(f"无法识别的内容 {buf[start:start + 10]!r}", self.base + start)
+                    break
+                # 非最后一块时，靠近块尾的 token 可能还没结束，留到下一块：
+                # 数字最多还差两个字符（"1." 或 "1e-"）才能继续匹配
+                if not final and m.end() + 2 >= end:
+                    break
+                pos = m.end()
+                yield kind, m
+            if final:
+                return
+            newline = buf.rfind("\n", 0, pos)
+            if newline >= 0:
+                self.lines += buf.count("\n", 0, pos)
+                self.line_start = self.base + newline + 1
+            self.base += pos
+            self.buf = buf[pos:]
+
+
+def iter_pretty_json(source, indent=4):
+    """流式重排缩进，按块产出与 json.dumps(indent=indent) 相同布局的文本
+
+    不构造对象，字符串和数字保持原样（不转义非 ASCII 字符、不改写数字写法）；
+    遇到语法错误时抛出 JSONFormatError
+    """
+    tokenizer = JSONTokenizer(source)
+    # 下标为嵌套深度的换行加缩进
+    newlines = ["\n"]
+    stack = []
+    expect = VALUE
+    # 刚写入开括号，还不知道容器是否为空
+    just_opened = False
+    parts = []
+    append = parts.append
+
+    def fail(kind, m):
+        start = m.start(kind)
+        return tokenizer.error(f"期望 {EXPECTED[expect]}，实际为 {m.group(kind)[:10]!r}", tokenizer.base + start)
+
+    for kind, m in tokenizer:
+        if m.group("sep") is not None:
+            if expect != COMMA_OR_CLOSE:
+                raise fail("sep", m)
+            expect = KEY if stack[-1] == "{" else VALUE
+            append(",")
+            append(newlines[len(stack)])
+        elif just_opened and kind != "close":
+            depth = len(stack)
+            if depth == len(newlines):
+                newlines.append("\n" + " " * (indent * depth))
+            append(newlines[depth])
+            just_opened = False
+
+        if kind == "member":
+            if expect != KEY and expect != KEY_OR_CLOSE:
+                raise fail(kind, m)
+            expect = COMMA_OR_CLOSE
+            append(m.group("member_key"))
+            append(": ")
+            append(m.group("member_value"))
+        elif kind == "comma":
+            if expect != COMMA_OR_CLOSE:
+                raise fail(kind, m)
+            expect = KEY if stack[-1] == "{" else VALUE
+            append(",")
+            append(newlines[len(stack)])
+        elif kind == "key":
+            if expect != KEY and expect != KEY_OR_CLOSE:
+                raise fail(kind, m)
+            expect = VALUE
+            append(m.group("key_text"))
+            append(": ")
+        elif kind == "string" or kind == "number" or kind == "literal":
+            if expect == VALUE or expect == VALUE_OR_CLOSE:
+                expect = COMMA_OR_CLOSE if stack else END
+            elif kind == "string" and (expect == KEY or expect == KEY_OR_CLOSE):
+                # 键后面没有冒号（否则会匹配为 member 或 key）
+                expect = COLON
+                raise tokenizer.error(f"期望 {EXPECTED[expect]}", tokenizer.base + m.end(kind))
+            else:
+                raise fail(kind, m)
+            append(m.group(kind))
+        elif kind == "open":
+            if expect != VALUE and expect != VALUE_OR_CLOSE:
+                raise fail(kind, m)
+            text = m.group(kind)
+            stack.append(text)
+            expect = KEY_OR_CLOSE if text == "{" else VALUE_OR_CLOSE
+            just_opened = True
+            append(text)
+        elif kind == "close":
+            text = m.group(kind)
+            if not stack or CLOSING[stack[-1]] != text or (expect != COMMA_OR_CLOSE and not just_opened):
+                raise fail(kind, m)
+            stack.pop()
+            if just_opened:
+                just_opened = False
+            else:
+                append(newlines[len(stack)])
+            expect = COMMA_OR_CLOSE if stack else END
+            append(text)
+        else:
+            # 单独出现的冒号一定不合法，合法的冒号已经包含在 member 或 key 中
+            raise fail(kind, m)
+
+        if len(parts) >= OUTPUT_PARTS:
+            yield "".join(parts)
+            parts.clear()
+
+    if expect != END:
+        pos = tokenizer.base + len(tokenizer.buf)
+        raise tokenizer.error(f"期望 {EXPECTED[expect]}，但输入已结束", pos)
+    if parts:
+        yield "".join(parts)
+
+
+def pretty_json(text, indent=4):
+    """格式化整段 JSON 文本"""
+    return "".join(iter_pretty_json(text, indent))
+
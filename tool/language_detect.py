@@ -0,0 +1,119 @@
+import re
+
+from tool import perf
+
+# 只检查开头和结尾的这么多字符，检测开销与文本长度无关
+HEAD_SIZE = 4096
+TAIL_SIZE = 1024
+# 得分低于该值时视为纯文本
+MIN_SCORE = 3
+
+PLAIN_TEXT = "Plain Text"
+
+# 语言 -> [(预编译的模式, 分值)]，所有命中模式的分值之和即该语言的得分
+RULES = {
+    "XML": [
+        (re.compile(r'^\s*<\?xml\b'), 6),
+        (re.compile(r'^\s*<(!DOCTYPE|html|root|soap|rss)\b', re.I), 4),
+        (re.compile(r'^\s*<[\w:.-]+[\s/>]'), 2),
+        (re.compile(r'</[\w:.-]+>\s*$'), 2),
+        (re.compile(r'</[\w:.-]+>'), 1),
+    ],
+    "JSON": [
+        (re.compile(r'^\s*[{\[]'), 2),
+        (re.compile(r'[}\]]\s*$'), 2),
+        (re.compile(r'^\s*[{\[]\s*("|[{\[\]}]|-?\d|true\b|false\b|null\b|$)'), 1),
+        (re.compile(r'"[^"\n]*"\s*:\s*("|\d|-|\[|\{|true\b|false\b|null\b)'), 1),
+    ],
+    "Python": [
+        (re.compile(r'^\s*def\s+\w+\s*\(.*\)\s*(->\s*[^:]+)?:\s*$', re.M), 4),
+        (re.compile(r'^\s*class\s+\w+(\(.*\))?:\s*$', re.M), 4),
+        (re.compile(r'^\s*(import\s+[\w.]+(\s+as\s+\w+)?|from\s+[\w.]+\s+import\s+.+)\s*$', re.M), 3),
+        (re.compile(r'^\s*(if|elif|for|while|with|try|except\b.*|else|finally)\b.*:\s*$', re.M), 1),
+        (re.compile(r'\bself\.\w+'), 1),
+        (re.compile(r'^\s*@\w+', re.M), 1),
+    ],
+    "C": [
+        (re.compile(r'^\s*#\s*include\s*[<"]', re.M), 3),
+        (re.compile(r'^\s*(int|void|char|float|double|long|unsigned|static|struct\s+\w+)\s*\**\s*\w+\s*\([^;]*\)\s*\{?\s*$', re.M), 2),
+        (re.compile(r'\b(printf|malloc|free|sizeof|NULL)\b'), 1),
+        (re.compile(r'^\s*#\s*define\s', re.M), 1),
+        (re.compile(r';\s*$', re.M), 1),
+    ],
+    "C++": [
+        (re.compile(r'^\s*#\s*include\s*<(iostream|vector|string|map|memory|algorithm)>', re.M), 4),
+        (re.compile(r'\bstd::'), 3),
+        (re.compile(r'^\s*(template\s*<|namespace\s+\w+|using\s+namespace\b)', re.M), 3),
+        (re.compile(r'^\s*#\s*include\s*[<"]', re.M), 1),
+        (re.compile(r'\b(cout|cin|endl)\b|::'), 1),
+        (re.compile(r';\s*$', re.M), 1),
+    ],
+    "Java": [
+        (re.compile(r'^\s*package\s+[\w.]+\s*;', re.M), 4),
+        (re.compile(r'^\s*import\s+(static\s+)?[\w.]+(\.\*)?\s*;', re.M), 3),
+        (re.compile(r'\b(public|private|protected)\s+(static\s+)?(final\s+)?(class|interface|enum|void)\b'), 3),
+        (re.compile(r'\bSystem\.(out|err)\.'), 2),
+        (re.compile(r'^\s*@(Override|Test|Autowired)\b', re.M), 1),
+        (re.compile(r';\s*$', re.M), 1),
+    ],
+    "Go": [
+        (re.compile(r'^\s*package\s+\w+\s*$', re.M), 4),
+        (re.compile(r'^\s*func\s+(\(\w+\s+\*?\w+\)\s*)?\w+\s*\(', re.M), 4),
+        (re.compile(r'^\s*import\s+(\(|"[\w./-]+")', re.M), 3),
+        (re.compile(r':='), 1),
+        (re.compile(r'\bfmt\.\w+'), 1),
+    ],
+    "SQL": [
+        (re.compile(r'\bSELECT\b[\s\S]+?\bFROM\b', re.I), 3),
+        (re.compile(r'\b(INSERT\s+INTO|UPDATE\s+\w+\s+SET|DELETE\s+FROM|CREATE\s+(TABLE|INDEX|VIEW)|ALTER\s+TABLE|DROP\s+TABLE)\b', re.I), 3),
+        (re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|CREATE|ALTER|WITH)\b', re.I), 1),
+        (re.compile(r'\b(WHERE|JOIN|GROUP\s+BY|ORDER\s+BY)\b', re.I), 1),
+    ],
+    "YAML": [
+        (re.compile(r'^---\s*$', re.M), 2),
+        (re.compile(r'^\s*[\w-]+\s*:(\s|$)'), 3),
+        (re.compile(r'^\s*[\w-]+\s*:\s+\S.*$(\n^\s*[\w-]+\s*:(\s|$))', re.M), 1),
+        (re.compile(r'^\s*-\s+\S', re.M), 1),
+    ],
+}
+
+
+def sample_text(text):
+    """检测使用的样本：短文本整体使用，长文本只取开头和结尾"""
+    if len(text) <= HEAD_SIZE + TAIL_SIZE:
+        return text
+    return text[:HEAD_SIZE] + "\n" + text[-TAIL_SIZE:]
+
+
+def score_languages(sample):
+    """返回每种语言的得分"""
+    return {language: sum(weight for pattern, weight in rules if pattern.search(sample))
+            for language, rules in RULES.items()}
+
+
+class LanguageDetector:
+    """对开头和结尾的样本打分，选择得分最高的语言
+
+    结果按开头 HEAD_SIZE 个字符缓存，开头不变时直接返回上次的结果
+    """
+
+    def __init__(self):
+        self.cache_key = None
+        self.cache_result = PLAIN_TEXT
+
+    def detect(self, text):
+        head = text[:HEAD_SIZE]
+        if head == self.cache_key:
+            return self.cache_result
+        result = PLAIN_TEXT
+        if head.strip():
+            with perf.span("detect", len(text)):
+                scores = score_languages(sample_text(text))
+            # 同分时按 RULES 中的顺序
+            best = max(scores, key=scores.get)
+            if scores[best] >= MIN_SCORE:
+                result = best
+        self.cache_key = head
+        self.cache_result = result
+        return result
+
@@ -0,0 +1,69 @@
+# pygments 在函数内导入：它的导入较慢，只在真正需要高亮时才加载
+
+ROOT_STACK = ("root",)
+
+
+def supports_state(lexer):
+    """只有普通的 RegexLexer 可以从任意状态栈继续分析；ExtendedRegexLexer 的回调依赖额外的上下文"""
+    from pygments.lexer import RegexLexer, ExtendedRegexLexer
+    return isinstance(lexer, RegexLexer) and not isinstance(lexer, ExtendedRegexLexer)
+
+
+def lex_with_state(lexer, text, stack=ROOT_STACK, pos=0, stop=None):
+    """与 RegexLexer.get_tokens_unprocessed 相同的分析循环，但可以从任意位置和状态栈开始，
+    并在到达 stop 之后的第一个 token 边界处停下
+
+    正则始终在完整的 text 上匹配，跨行的 token（块注释、多行字符串）与整体分析的结果一致。
+    返回 ([(位置, 类型, 文本), ...], 停止时的状态栈元组, 停止位置)，
+    停止位置和状态栈可以作为下一次分析的起点
+    """
+    from pygments.token import Error, Whitespace, _TokenType
+
+    if stop is None:
+        stop = len(text)
+    tokens = []
+    tokendefs = lexer._tokens
+    statestack = list(stack)
+    statetokens = tokendefs[statestack[-1]]
+    while pos < stop:
+        for rexmatch, action, new_state in statetokens:
+            m = rexmatch(text, pos)
+            if m:
+                if action is not None:
+                    if type(action) is _TokenType:
+                        tokens.append((pos, action, m.group()))
+                    else:
+                        tokens.extend(action(lexer, m))
+                pos = m.end()
+                if new_state is not None:
+                    if isinstance(new_state, tuple):
+                        for state in new_state:
+                            if state == '#pop':
+                                if len(statestack) > 1:
+                                    statestack.pop()
+                            elif state == '#push':
+                                statestack.append(statestack[-1])
+                            else:
+                                statestack.append(state)
+                    elif isinstance(new_state, int):
+                        if abs(new_state) >= len(statestack):
+                            del statestack[1:]
+                        else:
+                            del statestack[new_state:]
+                    elif new_state == '#push':
+                        statestack.append(statestack[-1])
+                    statetokens = tokendefs[statestack[-1]]
+                break
+        else:
+            if pos >= len(text):
+                break
+            if text[pos] == '\n':
+                # 行尾没有规则匹配时回到 root，与 Pygments 的行为一致
+                statestack = ['root']
+                statetokens = tokendefs['root']
+                tokens.append((pos, Whitespace, '\n'))
+            else:
+                tokens.append((pos, Error, text[pos]))
+            pos += 1
+    return tokens, tuple(statestack), pos
+
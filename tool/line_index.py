@@ -0,0 +1,76 @@
+import hashlib
+import mmap
+import os
+from array import array
+
+
+def build_line_index(buf):
+    """扫描换行符，返回每行起始偏移组成的 array('q')，最后一项为数据总长度
+
+    只按 \n 分行（\r\n 中的 \r 由读取方去掉），单独的 \r 和 str.splitlines 认可的其他分隔符不分行；
+    文件末尾的换行不会产生额外的空行
+    """
+    offsets = array('q', [0])
+    size = len(buf)
+    find = buf.find
+    pos = find(b"\n")
+    while pos != -1:
+        offsets.append(pos + 1)
+        pos = find(b"\n", pos + 1)
+    if offsets[-1] != size:
+        offsets.append(size)
+    return offsets
+
+
+class MappedLines:
+    """以内存映射方式打开文本文件，只保存行首偏移，按下标读取时才解码该行
+
+    可以像只读列表一样使用，文件内容始终留在磁盘映射中；按 \n 或 \r\n 分行（见 build_line_index）
+    """
+
+    def __init__(self, path, encoding="utf-8"):
+        self.path = path
+        self.encoding = encoding
+        self.file = open(path, "rb")
+        if os.fstat(self.file.fileno()).st_size:
+            self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            # 长度为 0 的文件无法映射
+            self.buffer = b""
+        self.offsets = build_line_index(self.buffer)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def raw(self, i):
+        """第 i 行的原始字节，不含行尾的 \\n 或 \\r\\n"""
+        start, end = self.offsets[i], self.offsets[i + 1]
+        buf = self.buffer
+        if end > start and buf[end - 1] == 10:
+            end -= 1
+            if end > start and buf[end - 1] == 13:
+                end -= 1
+        return buf[start:end]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        return self.raw(i).decode(self.encoding, errors="replace")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def iter_keys(self):
+        """逐行产出 16 字节摘要，作为差异比较时的行标识
+
+        与直接用行内容相比，每个不同的行只占用固定大小的内存，适合超大文件
+        """
+        blake2b = hashlib.blake2b
+        for i in range(len(self)):
+            yield blake2b(self.raw(i), digest_size=16).digest()
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self.file.close()
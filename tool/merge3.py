@@ -0,0 +1,119 @@
+import re
+
+from tool.diff_engine import diff_ops, pack_ops, OP_DELETE, OP_INSERT
+
+# 合并结果中的区域类型
+REGION_UNCHANGED = "unchanged"
+REGION_OURS = "ours"
+REGION_THEIRS = "theirs"
+REGION_SAME = "same"
+REGION_CONFLICT = "conflict"
+
+EQUAL_RUN_PATTERN = re.compile(r" +")
+
+
+def matching_blocks(codes):
+    """由操作符序列得到相同行组成的块 [(a 起点, b 起点, 长度)]"""
+    blocks = []
+    a_pos = b_pos = 0
+    prev = 0
+    for m in EQUAL_RUN_PATTERN.finditer(codes):
+        start, end = m.span()
+        a_pos += codes.count(OP_DELETE, prev, start)
+        b_pos += codes.count(OP_INSERT, prev, start)
+        blocks.append((a_pos, b_pos, end - start))
+        a_pos += end - start
+        b_pos += end - start
+        prev = end
+    return blocks
+
+
+def sync_regions(base_count, ours_count, theirs_count, ours_blocks, theirs_blocks):
+    """三方都相同的区域 [(base 起止, ours 起止, theirs 起止)]，末尾附加长度为 0 的结束标记
+
+    与 diff3 相同：取 base 与两侧各自相同块的交集
+    """
+    regions = []
+    i = j = 0
+    while i < len(ours_blocks) and j < len(theirs_blocks):
+        a_base, a_match, a_length = ours_blocks[i]
+        b_base, b_match, b_length = theirs_blocks[j]
+        start = max(a_base, b_base)
+        end = min(a_base + a_length, b_base + b_length)
+        if start < end:
+            ours_start = a_match + start - a_base
+            theirs_start = b_match + start - b_base
+            regions.append((start, end, ours_start, ours_start + end - start, theirs_start, theirs_start + end - start))
+        if a_base + a_length < b_base + b_length:
+            i += 1
+        else:
+            j += 1
+    regions.append((base_count, base_count, ours_count, ours_count, theirs_count, theirs_count))
+    return regions
+
+
+def iter_merge_regions(base, ours, theirs, algorithm="myers"):
+    """逐个产出合并区域 (类型, base 起止, ours 起止, theirs 起止)
+
+    只有一侧改动的区域取该侧，两侧改动相同的取任一侧，两侧改动不同的为冲突
+    """
+    ours_blocks = matching_blocks(pack_ops(diff_ops(base, ours, algorithm=algorithm))[0])
+    theirs_blocks = matching_blocks(pack_ops(diff_ops(base, theirs, algorithm=algorithm))[0])
+    z = a = b = 0
+    for z_match, z_end, a_match, a_end, b_match, b_end in sync_regions(len(base), len(ours), len(theirs),
+                                                                       ours_blocks, theirs_blocks):
+        if a_match > a or b_match > b:
+            base_part = base[z:z_match]
+            ours_part = ours[a:a_match]
+            theirs_part = theirs[b:b_match]
+            if ours_part == theirs_part:
+                kind = REGION_SAME
+            elif ours_part == base_part:
+                kind = REGION_THEIRS
+            elif theirs_part == base_part:
+                kind = REGION_OURS
+            else:
+                kind = REGION_CONFLICT
+            yield kind, (z, z_match), (a, a_match), (b, b_match)
+        if z_end > z_match:
+            yield REGION_UNCHANGED, (z_match, z_end), (a_match, a_end), (b_match, b_end)
+        z, a, b = z_end, a_end, b_end
+
+
+def merge_lines(base, ours, theirs, algorithm="myers", labels=("ours", "base", "theirs"), show_base=True):
+    """三方合并，返回 (合并后的行, 冲突数)
+
+    冲突处按 diff3 的格式输出冲突标记；show_base 为 False 时不输出 base 部分（与 git 默认的 merge 格式相同）
+    """
+    merged = []
+    conflicts = 0
+    for kind, (z, z_end), (a, a_end), (b, b_end) in iter_merge_regions(base, ours, theirs, algorithm):
+        if kind in (REGION_UNCHANGED, REGION_OURS, REGION_SAME):
+            merged.extend(ours[a:a_end])
+        elif kind == REGION_THEIRS:
+            merged.extend(theirs[b:b_end])
+        else:
+            conflicts += 1
+            merged.append(f"<<<<<<< {labels[0]}")
+            merged.extend(ours[a:a_end])
+            if show_base:
+                merged.append(f"||||||| {labels[1]}")
+                merged.extend(base[z:z_end])
+            merged.append("=======")
+            merged.extend(theirs[b:b_end])
+            merged.append(f">>>>>>> {labels[2]}")
+    return merged, conflicts
+
+
+def merge_files(base_path, ours_path, theirs_path, algorithm="myers", show_base=True):
+    """三方合并三个文本文件，返回 (合并后的文本, 冲突数)；冲突标记使用文件路径"""
+    texts = []
+    for path in (base_path, ours_path, theirs_path):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            texts.append(f.read())
+    base, ours, theirs = (text.splitlines() for text in texts)
+    merged, conflicts = merge_lines(base, ours, theirs, algorithm, (ours_path, base_path, theirs_path), show_base)
+    # 保留 ours 末尾的换行
+    trailing = "\n" if merged and texts[1].endswith("\n") else ""
+    return "\n".join(merged) + trailing, conflicts
+
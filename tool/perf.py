@@ -0,0 +1,199 @@
+"""各工具共用的性能记录：按阶段记录耗时区间、输入大小和峰值内存的增长
+
+    from tool import perf
+    with perf.span("format", len(text)):
+        ...
+
+记录在内存中，可以导出为 Chrome 追踪格式的 JSON（chrome://tracing 或 Perfetto 打开）；
+开启性能分析后，每个线程最外层的区间内用 cProfile 采样，结果合并后可导出为 .prof 文件
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:
+    # Windows 没有 resource 模块，不记录内存
+    resource = None
+
+# 保留最近的区间条数，更早的只计入各阶段的汇总
+MAX_SPANS = 2000
+
+
+def peak_rss_kb():
+    """进程的峰值常驻内存（KB），无法获取时返回 0"""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 上的单位是字节
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class StageStats:
+    """一个阶段的汇总"""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+        self.last_size = None
+        # 该阶段使进程峰值内存增长的总量（KB）
+        self.peak_growth_kb = 0
+
+    def add(self, duration, size, peak_growth_kb):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.last = duration
+        self.last_size = size
+        self.peak_growth_kb += peak_growth_kb
+
+    def as_dict(self):
+        return {
+            "stage": self.name,
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total * 1000 / self.count, 3) if self.count else 0,
+            "max_ms": round(self.max * 1000, 3),
+            "last_ms": round(self.last * 1000, 3),
+            "last_size": self.last_size,
+            "peak_growth_kb": self.peak_growth_kb,
+        }
+
+
+class SpanInfo:
+    __slots__ = ("size",)
+
+    def __init__(self, size):
+        self.size = size
+
+
+class Recorder:
+    """记录各阶段的耗时区间，可以在多个线程中同时使用"""
+
+    def __init__(self, max_spans=MAX_SPANS):
+        self.lock = threading.Lock()
+        # (阶段, 开始时间, 耗时, 输入大小, 峰值内存增长 KB, 线程 ID)
+        self.spans = deque(maxlen=max_spans)
+        self.stages = {}
+        # 每记录一次递增，界面据此判断是否需要刷新
+        self.version = 0
+        # 开启后每个线程最外层的区间内运行 cProfile
+        self.profiling = False
+        self.profile_stats = None
+        self.local = threading.local()
+
+    def record(self, name, start, duration, size=None, peak_growth_kb=0):
+        """记录一个区间；跨越多次事件循环的操作可以直接调用"""
+        with self.lock:
+            self.spans.append((name, start, duration, size, peak_growth_kb, threading.get_ident()))
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = StageStats(name)
+            stats.add(duration, size, peak_growth_kb)
+            self.version += 1
+
+    @contextmanager
+    def span(self, name, size=None):
+        """记录 with 块的耗时；size 为输入大小（字符数、字节数或个数）
+
+        事先不知道大小时（如输入是生成器），可以在块内设置 as 得到的对象的 size
+        """
+        current = SpanInfo(size)
+        local = self.local
+        depth = getattr(local, "depth", 0)
+        profiler = None
+        if self.profiling and depth == 0:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        local.depth = depth + 1
+        peak_before = peak_rss_kb()
+        start = time.perf_counter()
+        try:
+            yield current
+        finally:
+            duration = time.perf_counter() - start
+            local.depth = depth
+            if profiler is not None:
+                profiler.disable()
+                self.add_profile(profiler)
+            self.record(name, start, duration, current.size, peak_rss_kb() - peak_before)
+
+    def add_profile(self, profiler):
+        import pstats
+        with self.lock:
+            if self.profile_stats is None:
+                self.profile_stats = pstats.Stats(profiler)
+            else:
+                self.profile_stats.add(profiler)
+
+    def summary(self):
+        """各阶段的汇总，按总耗时从大到小排列"""
+        with self.lock:
+            stages = [stats.as_dict() for stats in self.stages.values()]
+        return sorted(stages, key=lambda stage: -stage["total_ms"])
+
+    def recent(self, count=None):
+        """最近的区间，从旧到新"""
+        with self.lock:
+            spans = list(self.spans)
+        return spans if count is None else spans[-count:]
+
+    def reset(self):
+        with self.lock:
+            self.spans.clear()
+            self.stages = {}
+            self.profile_stats = None
+            self.version += 1
+
+    def dump_trace(self, path):
+        """把最近的区间和各阶段汇总写成 Chrome 追踪格式的 JSON"""
+        pid = os.getpid()
+        events = []
+        for name, start, duration, size, peak_growth_kb, thread in self.recent():
+            events.append({
+                "name": name,
+                "cat": "dukit",
+                "ph": "X",
+                "ts": round(start * 1e6, 3),
+                "dur": round(duration * 1e6, 3),
+                "pid": pid,
+                "tid": thread,
+                "args": {"size": size, "peak_growth_kb": peak_growth_kb},
+            })
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms", "summary": self.summary(),
+                       "peak_rss_kb": peak_rss_kb()}, f, indent=1, ensure_ascii=False)
+
+    def dump_profile(self, path):
+        """把 cProfile 的结果写成 .prof 文件（可用 pstats 或 snakeviz 查看），还没有结果时抛出 ValueError"""
+        with self.lock:
+            if self.profile_stats is None:
+                raise ValueError("没有性能分析结果，请先开启性能分析并执行操作")
+            self.profile_stats.dump_stats(path)
+
+
+# 进程内共用的记录器
+recorder = Recorder()
+
+
+def span(name, size=None):
+    return recorder.span(name, size)
+
+
+def record(name, start, duration, size=None):
+    recorder.record(name, start, duration, size)
+
+
+def null_span(name, size=None):
+    """与 span 用法相同但不记录，用于调用很频繁、不应挤掉其他记录的内部计算"""
+    return nullcontext(SpanInfo(size))
+
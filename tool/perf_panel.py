@@ -0,0 +1,172 @@
+import time
+
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget,
+                               QTableWidgetItem, QHeaderView, QAbstractItemView, QFileDialog, QApplication)
+
+from tool import perf
+
+# 刷新间隔（毫秒），只在面板可见且有新记录时刷新
+REFRESH_INTERVAL = 500
+# 最近区间列表显示的条数
+RECENT_ROWS = 200
+
+STAGE_HEADERS = ["阶段", "次数", "最近耗时", "平均", "最大", "最近输入大小", "峰值内存增长"]
+RECENT_HEADERS = ["阶段", "耗时", "输入大小", "峰值内存增长"]
+
+
+def format_ms(value):
+    return f"{value:,.1f} 毫秒"
+
+
+def format_size(size):
+    return "" if size is None else f"{size:,}"
+
+
+def format_kb(kb):
+    return f"{kb / 1024:,.1f} MB" if kb >= 1024 else f"{kb:,} KB"
+
+
+class PerfPanel(QWidget):
+    """显示各工具上报的阶段耗时、输入大小和峰值内存，可以开启性能分析并导出追踪文件"""
+
+    def __init__(self, main_window=None):
+        super().__init__()
+        self.main_window = main_window
+        self.stage_table = None
+        self.recent_table = None
+        self.memory_label = None
+        self.clear_button = None
+        self.profile_button = None
+        self.trace_button = None
+        self.export_profile_button = None
+        self.refresh_timer = None
+        self.shown_version = -1
+
+        self.init_ui()
+        self.setup_logic()
+
+    def init_ui(self):
+        main_layout = QVBoxLayout()
+
+        self.memory_label = QLabel()
+        main_layout.addWidget(self.memory_label)
+
+        self.stage_table = self.create_table(STAGE_HEADERS)
+        main_layout.addWidget(self.stage_table, stretch=1)
+
+        main_layout.addWidget(QLabel("最近的记录:"))
+        self.recent_table = self.create_table(RECENT_HEADERS)
+        main_layout.addWidget(self.recent_table, stretch=1)
+
+        button_layout = QHBoxLayout()
+        self.clear_button = QPushButton("清空")
+        self.profile_button = QPushButton("开始性能分析")
+        self.profile_button.setCheckable(True)
+        self.trace_button = QPushButton("导出追踪 JSON")
+        self.export_profile_button = QPushButton("导出 cProfile")
+        for button in (self.clear_button, self.profile_button, self.trace_button, self.export_profile_button):
+            button_layout.addWidget(button)
+        main_layout.addLayout(button_layout)
+
+        self.setLayout(main_layout)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(REFRESH_INTERVAL)
+
+    def create_table(self, headers):
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.verticalHeader().setVisible(False)
+        table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        table.horizontalHeader().setStretchLastSection(True)
+        return table
+
+    def setup_logic(self):
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.clear_button.clicked.connect(self.clear)
+        self.profile_button.toggled.connect(self.set_profiling)
+        self.trace_button.clicked.connect(self.export_trace)
+        self.export_profile_button.clicked.connect(self.export_profile)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.refresh_timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.refresh_timer.stop()
+
+    def update_status(self, message):
+        if self.main_window:
+            self.main_window.update_status(message)
+
+    def refresh(self):
+        """有新记录时重新填充两个表格"""
+        self.memory_label.setText(f"进程峰值内存: {format_kb(perf.peak_rss_kb())}")
+        version = perf.recorder.version
+        if version == self.shown_version:
+            return
+        self.shown_version = version
+
+        stages = perf.recorder.summary()
+        self.fill_table(self.stage_table, [
+            (stage["stage"], f"{stage['count']:,}", format_ms(stage["last_ms"]), format_ms(stage["mean_ms"]),
+             format_ms(stage["max_ms"]), format_size(stage["last_size"]), format_kb(stage["peak_growth_kb"]))
+            for stage in stages
+        ])
+        # 最新的在最上面
+        spans = reversed(perf.recorder.recent(RECENT_ROWS))
+        self.fill_table(self.recent_table, [
+            (name, format_ms(duration * 1000), format_size(size), format_kb(peak_growth_kb))
+            for name, _, duration, size, peak_growth_kb, _ in spans
+        ])
+
+    def fill_table(self, table, rows):
+        table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                table.setItem(row, column, QTableWidgetItem(value))
+
+    def clear(self):
+        perf.recorder.reset()
+        self.refresh()
+
+    def set_profiling(self, enabled):
+        perf.recorder.profiling = enabled
+        self.profile_button.setText("停止性能分析" if enabled else "开始性能分析")
+        self.update_status("性能分析已开启，执行操作后导出 cProfile 结果" if enabled else "性能分析已停止")
+
+    def export_trace(self):
+        path, _ = QFileDialog.getSaveFileName(self, "导出追踪", f"dukit-trace-{time.strftime('%Y%m%d-%H%M%S')}.json",
+                                              "JSON 文件 (*.json);;所有文件 (*)")
+        if not path:
+            return
+        try:
+            perf.recorder.dump_trace(path)
+        except OSError as e:
+            self.update_status(f"导出失败: {e}")
+            return
+        self.update_status(f"已导出追踪到 {path}，可在 chrome://tracing 或 Perfetto 中打开")
+
+    def export_profile(self):
+        path, _ = QFileDialog.getSaveFileName(self, "导出 cProfile", f"dukit-{time.strftime('%Y%m%d-%H%M%S')}.prof",
+                                              "cProfile 文件 (*.prof);;所有文件 (*)")
+        if not path:
+            return
+        try:
+            perf.recorder.dump_profile(path)
+        except (OSError, ValueError) as e:
+            self.update_status(f"导出失败: {e}")
+            return
+        self.update_status(f"已导出 cProfile 结果到 {path}")
+
+
+if __name__ == "__main__":
+    app = QApplication()
+    widget = PerfPanel()
+    widget.show()
+    app.exec()
@@ -0,0 +1,17 @@
+def common_affix_lengths(a, b, block=4096):
+    """返回 a、b 公共前缀和公共后缀的长度（两者不重叠），按块比较以减少逐字符循环"""
+    limit = min(len(a), len(b))
+    prefix = 0
+    while prefix + block <= limit and a[prefix:prefix + block] == b[prefix:prefix + block]:
+        prefix += block
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+
+    limit -= prefix
+    a_end, b_end = len(a), len(b)
+    suffix = 0
+    while suffix + block <= limit and a[a_end - suffix - block:a_end - suffix] == b[b_end - suffix - block:b_end - suffix]:
+        suffix += block
+    while suffix < limit and a[a_end - suffix - 1] == b[b_end - suffix - 1]:
+        suffix += 1
+    return prefix, suffix
@@ -0,0 +1,383 @@
+import re
+import warnings
+from datetime import datetime, timezone, timedelta
+from functools import lru_cache
+
+from tool import perf
+
+# 每种精度对应的纳秒数
+UNIT_NANOS = {"s": 10 ** 9, "ms": 10 ** 6, "us": 10 ** 3, "ns": 1}
+# 每种精度在 ISO 文本中的小数位数
+UNIT_DIGITS = {"s": 0, "ms": 3, "us": 6, "ns": 9}
+
+# 按绝对值判断精度：小于 1e11 为秒（到 5138 年），小于 1e14 为毫秒，小于 1e17 为微秒，其余为纳秒
+UNIT_LIMITS = ((10 ** 11, "s"), (10 ** 14, "ms"), (10 ** 17, "us"))
+
+# datetime 能表示的范围（1-01-01 到 9999-12-31），以秒计
+MIN_SECONDS = -62135596800
+MAX_SECONDS = 253402300799
+
+# 数字时间戳，可以带小数
+EPOCH_PATTERN = re.compile(r'([+-]?\d+)(?:\.(\d+))?')
+# ISO 8601 日期时间：日期部分、时间部分（可选）、小数秒、时区
+ISO_PATTERN = re.compile(
+    r'(\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2})?)?)(?:[.,](\d+))?\s*([Zz]|[+-]\d{2}(?::?\d{2})?)?')
+
+# 三位小数的文本，用于拼接毫秒、微秒、纳秒部分
+THREE_DIGITS = [f"{i:03d}" for i in range(1000)]
+
+# 短于这么多字符的文本直接逐行转换：导入 NumPy 本身比逐行转换更慢
+NUMPY_MIN_CHARS = 64 * 1024
+
+# 秒级缓存的最大条目数，超过后清空重建（日志中的时间戳通常集中在较短的时间段内）
+CACHE_SIZE = 100000
+
+
+def detect_unit(value):
+    """按数值大小判断时间戳的精度"""
+    magnitude = abs(value)
+    for limit, unit in UNIT_LIMITS:
+        if magnitude < limit:
+            return unit
+    return "ns"
+
+
+@lru_cache(maxsize=None)
+def load_numpy():
+    """NumPy 可用时返回模块，否则返回 None；只在第一次需要时导入"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class TimestampConverter:
+    """批量转换时间戳：每行一个值，数字转换为 ISO 8601 文本，ISO 文本转换为指定精度的时间戳
+
+    数字的精度（秒、毫秒、微秒、纳秒）按每个值的大小单独判断，小数部分按同样的精度解释；
+    输出的小数位数与输入精度一致。整秒部分的格式化和解析结果按秒缓存
+    """
+
+    def __init__(self, local=False, unit="s"):
+        # local 为 True 时输出本地时间，没有时区的 ISO 文本也按本地时间解释，否则按 UTC
+        self.local = local
+        # ISO 文本转换为时间戳时使用的精度
+        self.unit = unit
+        self.format_cache = {}
+        self.parse_cache = {}
+
+    def split_seconds(self, seconds):
+        """整秒时间戳 -> (日期时间部分, 时区部分)"""
+        parts = self.format_cache.get(seconds)
+        if parts is None:
+            if not MIN_SECONDS <= seconds <= MAX_SECONDS:
+                raise ValueError("超出可表示的时间范围")
+            if self.local:
+                moment = datetime.fromtimestamp(seconds).astimezone()
+            else:
+                moment = datetime.fromtimestamp(seconds, timezone.utc)
+            text = moment.isoformat()
+            parts = (text[:-6], "Z" if text.endswith("+00:00") and not self.local else text[-6:])
+            if len(self.format_cache) >= CACHE_SIZE:
+                self.format_cache.clear()
+            self.format_cache[seconds] = parts
+        return parts
+
+    def epoch_to_iso(self, integer, fraction=None):
+        """整数部分和小数部分（数字文本）组成的时间戳 -> ISO 8601 文本"""
+        value = int(integer)
+        unit = detect_unit(value)
+        nanos = UNIT_NANOS[unit]
+        digits = UNIT_DIGITS[unit]
+        total = value * nanos
+        if fraction:
+            # 小数部分按检测到的精度解释，输出位数随之增加
+            total += (-1 if integer.startswith("-") else 1) * int(fraction) * nanos // 10 ** len(fraction)
+            digits = min(9, max(digits, digits + len(fraction) + 2) // 3 * 3)
+        seconds, remainder = divmod(total, 10 ** 9)
+        head, zone = self.split_seconds(seconds)
+        if digits:
+            return f"{head}.{remainder // 10 ** (9 - digits):0{digits}d}{zone}"
+        return head + zone
+
+    def base_seconds(self, base, zone):
+        """ISO 文本的整秒部分和时区 -> 整秒时间戳"""
+        if zone in ("z", "Z"):
+            zone = "Z"
+        key = (base, zone)
+        seconds = self.parse_cache.get(key)
+        if seconds is None:
+            moment = datetime.fromisoformat(base)
+            if zone:
+                if zone == "Z":
+                    offset = timedelta(0)
+                else:
+                    sign = -1 if zone[0] == "-" else 1
+                    digits = zone[1:].replace(":", "")
+                    offset = sign * timedelta(hours=int(digits[:2]), minutes=int(digits[2:4] or 0))
+                moment = moment.replace(tzinfo=timezone(offset))
+            elif not self.local:
+                moment = moment.replace(tzinfo=timezone.utc)
+            seconds = int(moment.timestamp())
+            if len(self.parse_cache) >= CACHE_SIZE:
+                self.parse_cache.clear()
+            self.parse_cache[key] = seconds
+        return seconds
+
+    def iso_to_epoch(self, base, fraction, zone):
+        nanos = UNIT_NANOS[self.unit]
+        value = self.base_seconds(base, zone) * (10 ** 9 // nanos)
+        if fraction:
+            value += int(fraction[:9].ljust(9, "0")) // nanos
+        return str(value)
+
+    def convert_line(self, line):
+        """转换一行，无法识别时抛出 ValueError"""
+        m = EPOCH_PATTERN.fullmatch(line)
+        if m:
+            return self.epoch_to_iso(m.group(1), m.group(2))
+        m = ISO_PATTERN.fullmatch(line)
+        if m:
+            return self.iso_to_epoch(*m.groups())
+        raise ValueError(f"无法识别的时间: {line}")
+
+    def convert_text(self, text):
+        """转换整段文本，返回 (结果文本, 无法识别的行号列表)
+
+        NumPy 可用时，整列精度相同的整数时间戳和整列格式相同的 ISO 文本整体向量化转换，其余情况逐行转换
+        """
+        with perf.span("convert", len(text)):
+            numpy = load_numpy() if len(text) >= NUMPY_MIN_CHARS else None
+            if numpy is not None:
+                result = self.convert_epochs_numpy(numpy, text)
+                if result is None:
+                    result = self.convert_isos_numpy(numpy, text)
+                if result is not None:
+                    return result, []
+            output, errors = self.convert_lines(text.splitlines())
+            return "\n".join(output), errors
+
+    def convert_lines(self, lines):
+        """逐行转换，返回 (结果行, 无法识别的行号列表)；空行保持为空行，无法识别的行输出为空行
+
+        整数时间戳和 YYYY-MM-DDTHH:MM:SS[.小数][时区] 形式的文本走快速路径，其他形式逐行用正则解析
+        """
+        output = []
+        errors = []
+        append = output.append
+        format_cache = self.format_cache
+        parse_cache = self.parse_cache
+        split_seconds = self.split_seconds
+        digits = THREE_DIGITS
+        nanos = UNIT_NANOS[self.unit]
+        multiplier = 10 ** 9 // nanos
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                append("")
+                continue
+            try:
+                if line.isdigit() or line[0] == "-" and line[1:].isdigit():
+                    value = int(line)
+                    magnitude = -value if value < 0 else value
+                    if magnitude < 100000000000:
+                        parts = format_cache.get(value) or split_seconds(value)
+                        append(parts[0] + parts[1])
+                    elif magnitude < 100000000000000:
+                        seconds, rest = divmod(value, 1000)
+                        parts = format_cache.get(seconds) or split_seconds(seconds)
+                        append(f"{parts[0]}.{digits[rest]}{parts[1]}")
+                    elif magnitude < 100000000000000000:
+                        seconds, rest = divmod(value, 1000000)
+                        parts = format_cache.get(seconds) or split_seconds(seconds)
+                        millis, micros = divmod(rest, 1000)
+                        append(f"{parts[0]}.{digits[millis]}{digits[micros]}{parts[1]}")
+                    else:
+                        append(self.epoch_to_iso(line))
+                    continue
+                if len(line) >= 19 and line[10] in "T " and line[4] == "-":
+                    # 整秒部分按 (前 19 个字符, 时区) 缓存，命中时不再做正则匹配
+                    rest = line[19:]
+                    zone = None
+                    if rest[-1:] in ("Z", "z"):
+                        zone = "Z"
+                        rest = rest[:-1]
+                    elif len(rest) >= 6 and rest[-6] in "+-" and rest[-3] == ":":
+                        zone = rest[-6:]
+                        rest = rest[:-6]
+                    elif len(rest) >= 5 and rest[-5] in "+-" and rest[-4:].isdigit():
+                        zone = rest[-5:]
+                        rest = rest[:-5]
+                    if not rest or rest[0] in ".," and rest[1:].isdigit():
+                        seconds = parse_cache.get((line[:19], zone))
+                        if seconds is not None:
+                            value = seconds * multiplier
+                            if rest:
+                                value += int(rest[1:10].ljust(9, "0")) // nanos
+                            append(str(value))
+                            continue
+                append(self.convert_line(line))
+            except (ValueError, OverflowError):
+                append("")
+                errors.append(number)
+        return output, errors
+
+    def convert_epochs_numpy(self, numpy, text):
+        """每行都是同一精度的整数时间戳时整体转换，否则返回 None
+
+        UTC 时日期和时间直接向量化计算，本地时间时不同的整秒只格式化一次，结果按行拼成定长的字节矩阵
+        """
+        text = text.rstrip("\n")
+        with warnings.catch_warnings():
+            # 遇到无法解析的内容时 NumPy 只给出警告并停止，转换为异常后交给逐行转换
+            warnings.simplefilter("error")
+            try:
+                values = numpy.fromstring(text, dtype=numpy.int64, sep="\n")
+            except (ValueError, DeprecationWarning):
+                return None
+        # 空行会被跳过，溢出的值会被截断为最大值，这两种情况都交给逐行转换
+        if len(values) != text.count("\n") + 1 or not len(values):
+            return None
+        if values.max() == numpy.iinfo(numpy.int64).max or values.min() == numpy.iinfo(numpy.int64).min:
+            return None
+        magnitude = numpy.abs(values)
+        unit = detect_unit(int(magnitude.max()))
+        if detect_unit(int(magnitude.min())) != unit:
+            return None
+        nanos = UNIT_NANOS[unit]
+        digits = UNIT_DIGITS[unit]
+        seconds, rest = numpy.divmod(values, 10 ** 9 // nanos)
+        if self.local:
+            heads = self.local_heads_numpy(numpy, seconds)
+        else:
+            heads = self.utc_heads_numpy(numpy, seconds)
+        if heads is None:
+            return None
+        rows, head_width, zone_width = heads
+        width = head_width + (digits + 1 if digits else 0) + zone_width + 1
+        out = numpy.empty((len(values), width), dtype=numpy.uint8)
+        out[:, :head_width] = rows[:, :head_width]
+        if digits:
+            out[:, head_width] = ord(".")
+            for i in range(digits):
+                out[:, head_width + 1 + i] = rest // 10 ** (digits - 1 - i) % 10 + ord("0")
+        out[:, width - 1 - zone_width:width - 1] = rows[:, head_width:]
+        out[:, width - 1] = ord("\n")
+        return out.tobytes()[:-1].decode("ascii")
+
+    def local_heads_numpy(self, numpy, seconds):
+        """本地时间：不同的整秒只用 datetime 格式化一次，返回 (每行的日期时间和时区字节, 日期时间宽度, 时区宽度)"""
+        unique, inverse = numpy.unique(seconds, return_inverse=True)
+        try:
+            heads = [self.split_seconds(int(second)) for second in unique.tolist()]
+        except ValueError:
+            return None
+        head_width = len(heads[0][0])
+        zone_width = len(heads[0][1])
+        if any(len(head) != head_width or len(zone) != zone_width for head, zone in heads):
+            return None
+        table = numpy.frombuffer("".join(head + zone for head, zone in heads).encode("ascii"),
+                                 dtype=numpy.uint8).reshape(len(heads), head_width + zone_width)
+        return table[inverse.reshape(-1)], head_width, zone_width
+
+    def utc_heads_numpy(self, numpy, seconds):
+        """UTC：直接由整秒计算公历日期和时间的各位数字，返回值同 local_heads_numpy"""
+        if seconds.min() < MIN_SECONDS or seconds.max() > MAX_SECONDS:
+            return None
+        days, second_of_day = numpy.divmod(seconds, 86400)
+        # 1970-01-01 起的天数 -> 公历日期
+        shifted = days + 719468
+        era = shifted // 146097
+        day_of_era = shifted - era * 146097
+        year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+        day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+        month_index = (5 * day_of_year + 2) // 153
+        day = day_of_year - (153 * month_index + 2) // 5 + 1
+        month = month_index + numpy.where(month_index < 10, 3, -9)
+        year = year_of_era + era * 400 + (month <= 2)
+        hour, rest = numpy.divmod(second_of_day, 3600)
+        minute, second = numpy.divmod(rest, 60)
+
+        rows = numpy.empty((len(seconds), 20), dtype=numpy.uint8)
+        for column, char in ((4, "-"), (7, "-"), (10, "T"), (13, ":"), (16, ":"), (19, "Z")):
+            rows[:, column] = ord(char)
+        for value, start, size in ((year, 0, 4), (month, 5, 2), (day, 8, 2),
+                                   (hour, 11, 2), (minute, 14, 2), (second, 17, 2)):
+            for i in range(size):
+                rows[:, start + i] = value // 10 ** (size - 1 - i) % 10 + ord("0")
+        return rows, 19, 1
+
+    def convert_isos_numpy(self, numpy, text):
+        """每行都是相同布局的 YYYY-MM-DDTHH:MM:SS[.小数][Z|±HH:MM] 时整体解析，否则返回 None
+
+        没有时区且按本地时间解释时需要逐个查询时区规则，也返回 None
+        """
+        first = text.split("\n", 1)[0]
+        m = ISO_PATTERN.fullmatch(first)
+        if not m or len(m.group(1)) != 19:
+            return None
+        fraction, zone = m.group(2), m.group(3)
+        if zone is None and self.local or zone is not None and len(zone) not in (1, 6):
+            return None
+        data = numpy.frombuffer(text.rstrip("\n").encode("ascii", "replace") + b"\n", dtype=numpy.uint8)
+        width = len(first) + 1
+        if len(data) % width:
+            return None
+        rows = data.reshape(-1, width)
+        # 每一列都必须与第一行同类：数字列全是数字，其余列字符相同（时区符号可以是 + 或 -）
+        digit_columns = [i for i, c in enumerate(first) if c.isdigit()]
+        other_columns = [i for i, c in enumerate(first + "\n") if not c.isdigit()]
+        sign_column = len(first) - 6 if zone is not None and len(zone) == 6 else None
+        digits_block = rows[:, digit_columns]
+        if ((digits_block < ord("0")) | (digits_block > ord("9"))).any():
+            return None
+        for column in other_columns:
+            values = rows[:, column]
+            if column == sign_column:
+                if ((values != ord("+")) & (values != ord("-"))).any():
+                    return None
+            elif (values != ord((first + "\n")[column])).any():
+                return None
+
+        def number(start, size):
+            result = numpy.zeros(len(rows), dtype=numpy.int64)
+            for i in range(start, start + size):
+                result = result * 10 + (rows[:, i] - ord("0"))
+            return result
+
+        year, month, day = number(0, 4), number(5, 2), number(8, 2)
+        hour, minute, second = number(11, 2), number(14, 2), number(17, 2)
+        leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+        month_days = numpy.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])[numpy.clip(month, 0, 12)]
+        month_days = month_days + (leap & (month == 2))
+        if ((year < 1) | (month < 1) | (month > 12) | (day < 1) | (day > month_days)
+                | (hour > 23) | (minute > 59) | (second > 59)).any():
+            return None
+        # 公历日期 -> 1970-01-01 起的天数
+        shifted = year - (month <= 2)
+        era = shifted // 400
+        year_of_era = shifted - era * 400
+        day_of_year = (153 * (month + numpy.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+        day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+        days = era * 146097 + day_of_era - 719468
+        seconds = days * 86400 + hour * 3600 + minute * 60 + second
+        if sign_column is not None:
+            offset = number(sign_column + 1, 2) * 3600 + number(sign_column + 4, 2) * 60
+            seconds = seconds - numpy.where(rows[:, sign_column] == ord("-"), -offset, offset)
+        nanos = UNIT_NANOS[self.unit]
+        multiplier = 10 ** 9 // nanos
+        # 纳秒等精度下 int64 只能表示约 1678-2262 年，超出时交给逐行转换（Python 整数没有上限）
+        if (numpy.abs(seconds) >= numpy.iinfo(numpy.int64).max // multiplier - 1).any():
+            return None
+        values = seconds * multiplier
+        if fraction:
+            size = min(len(fraction), 9)
+            values = values + number(20, size) * 10 ** (9 - size) // nanos
+        return "\n".join(map(str, values.tolist()))
+
+
+def convert_text(text, local=False, unit="s"):
+    """转换整段文本，返回 (结果文本, 无法识别的行号列表)"""
+    return TimestampConverter(local, unit).convert_text(text)
+
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from tool import perf
+from tool.diff_engine import DiffBudget, diff_files, OP_DELETE, OP_INSERT
+
+# 目录比较中每个文件的状态
+STATUS_ADDED = "added"
+STATUS_REMOVED = "removed"
+STATUS_MODIFIED = "modified"
+STATUS_UNCHANGED = "unchanged"
+
+# 计算摘要时每次读取的字节数
+HASH_READ_SIZE = 1024 * 1024
+# 同时计算摘要的线程数（主要在等待磁盘，hashlib 计算时会释放 GIL）
+HASH_THREADS = 8
+# 判断是否为二进制文件时检查的开头字节数
+BINARY_SNIFF_SIZE = 8192
+# 进程池每次分给子进程的文件对数，减少进程间通信次数
+DIFF_CHUNK_SIZE = 8
+
+
+def walk_tree(root):
+    """递归列出目录下的所有文件，返回 {相对路径: (大小, 修改时间纳秒)}，相对路径统一用 / 分隔
+
+    不跟随指向目录的符号链接，无法访问的子目录直接跳过
+    """
+    files = {}
+    stack = [("", root)]
+    while stack:
+        prefix, directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    rel = prefix + entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append((rel + "/", entry.path))
+                        elif entry.is_file():
+                            stat = entry.stat()
+                            files[rel] = (stat.st_size, stat.st_mtime_ns)
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return files
+
+
+def file_digest(path):
+    with open(path, "rb") as f:
+        digest = hashlib.blake2b(digest_size=16)
+        for chunk in iter(lambda: f.read(HASH_READ_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class HashCache:
+    """按 (路径, 大小, 修改时间) 缓存文件内容摘要，文件没有变化时不再读取
+
+    指定 path 时从该 JSON 文件加载，save() 写回，供下一次比较使用
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        # 绝对路径 -> [大小, 修改时间纳秒, 摘要]
+        self.entries = {}
+        self.dirty = False
+        if path:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def digest(self, path, size, mtime_ns):
+        key = os.path.abspath(path)
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == size and entry[1] == mtime_ns:
+            return entry[2]
+        digest = file_digest(path)
+        self.entries[key] = [size, mtime_ns, digest]
+        self.dirty = True
+        return digest
+
+    def save(self):
+        if not self.path or not self.dirty:
+            return
+        temp = self.path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(temp, self.path)
+        self.dirty = False
+
+
+def compare_trees(left_root, right_root, cache=None, progress=None, quick=True):
+    """比较两个目录，返回 {相对路径: 状态}
+
+    只在一侧存在的文件为新增或删除；大小不同的直接视为修改；大小和修改时间都相同的视为未修改（与 rsync 的快速检查相同，
+    quick 为 False 时这些文件也比较摘要）；其余的比较内容摘要，摘要按文件的大小和修改时间缓存在 cache 中。
+    progress(已检查, 总数) 在计算摘要时调用
+    """
+    if cache is None:
+        cache = HashCache()
+    with perf.span("walk") as current:
+        left = walk_tree(left_root)
+        right = walk_tree(right_root)
+        current.size = len(left) + len(right)
+    statuses = {}
+    suspects = []
+    for rel, left_stat in left.items():
+        right_stat = right.get(rel)
+        if right_stat is None:
+            statuses[rel] = STATUS_REMOVED
+        elif left_stat[0] != right_stat[0]:
+            statuses[rel] = STATUS_MODIFIED
+        elif quick and left_stat[1] == right_stat[1]:
+            statuses[rel] = STATUS_UNCHANGED
+        else:
+            suspects.append(rel)
+    for rel in right.keys() - left.keys():
+        statuses[rel] = STATUS_ADDED
+
+    def same_content(rel):
+        left_path = os.path.join(left_root, rel)
+        right_path = os.path.join(right_root, rel)
+        try:
+            return cache.digest(left_path, *left[rel]) == cache.digest(right_path, *right[rel])
+        except OSError:
+            return False
+
+    if suspects:
+        with perf.span("hash", len(suspects)), ThreadPoolExecutor(max_workers=HASH_THREADS) as executor:
+            for done, (rel, same) in enumerate(zip(suspects, executor.map(same_content, suspects)), 1):
+                statuses[rel] = STATUS_UNCHANGED if same else STATUS_MODIFIED
+                if progress is not None:
+                    progress(done, len(suspects))
+    return statuses
+
+
+def is_binary(path):
+    with open(path, "rb") as f:
+        return b"\0" in f.read(BINARY_SNIFF_SIZE)
+
+
+def diff_stat(job):
+    """比较一对文件，返回 (删除行数, 插入行数, 说明)；二进制文件或出错时行数为 -1，说明中给出原因
+
+    缺少的一侧用空设备代替，新增和删除的文件也能统计行数；
+    限制计算开销，提前分割过时行数可能多于最短差异，说明为"近似"，因估计的相似度低而收紧上限时为"差异很多，近似"
+    """
+    left_path, right_path, algorithm = job
+    budget = DiffBudget()
+    try:
+        if is_binary(left_path) or is_binary(right_path):
+            return -1, -1, "二进制文件"
+        diff = diff_files(left_path, right_path, algorithm=algorithm, budget=budget)
+    except (OSError, ValueError) as e:
+        return -1, -1, str(e)
+    if diff is None:
+        return 0, 0, None
+    a_lines, b_lines, codes, _ = diff
+    a_lines.close()
+    b_lines.close()
+    note = None
+    if budget.approximate:
+        note = "差异很多，近似" if budget.low_similarity else "近似"
+    return codes.count(OP_DELETE), codes.count(OP_INSERT), note
+
+
+def pair_paths(left_root, right_root, rel):
+    """相对路径在两侧对应的文件，不存在的一侧为空设备"""
+    left_path = os.path.join(left_root, rel)
+    right_path = os.path.join(right_root, rel)
+    if not os.path.isfile(left_path):
+        left_path = os.devnull
+    if not os.path.isfile(right_path):
+        right_path = os.devnull
+    return left_path, right_path
+
+
+def iter_diff_stats(left_root, right_root, paths, algorithm="myers", jobs=0, mp_context=None):
+    """在进程池中逐对比较文件，按 paths 的顺序产出 (相对路径, diff_stat 的结果)
+
+    jobs 为 0 时使用全部 CPU 核，为 1 或只有一个文件时在当前进程中计算；
+    提前关闭生成器时取消尚未开始的比较
+    """
+    work = [(*pair_paths(left_root, right_root, rel), algorithm) for rel in paths]
+    jobs = min(jobs or os.cpu_count() or 1, len(work))
+    if jobs <= 1:
+        for rel, job in zip(paths, work):
+            yield rel, diff_stat(job)
+        return
+    executor = ProcessPoolExecutor(max_workers=jobs, mp_context=mp_context)
+    try:
+        yield from zip(paths, executor.map(diff_stat, work, chunksize=DIFF_CHUNK_SIZE))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def tree_index(statuses):
+    """由 {相对路径: 状态} 建立目录结构，返回 ({目录: [(名称, 是否目录)]}, {目录: 状态})
+
+    根目录为 ""；子项按目录在前、名称升序排列；目录中有任何文件不是未修改时，目录状态为修改
+    """
+    children = {"": set()}
+    dir_statuses = {"": STATUS_UNCHANGED}
+    for rel, status in statuses.items():
+        parent, _, name = rel.rpartition("/")
+        children.setdefault(parent, set()).add((name, False))
+        # 逐级补齐上层目录
+        while parent and parent not in dir_statuses:
+            dir_statuses[parent] = STATUS_UNCHANGED
+            grandparent, _, dir_name = parent.rpartition("/")
+            children.setdefault(grandparent, set()).add((dir_name, True))
+            parent = grandparent
+        if status != STATUS_UNCHANGED:
+            parent = rel.rpartition("/")[0]
+            while dir_statuses.get(parent) != STATUS_MODIFIED:
+                dir_statuses[parent] = STATUS_MODIFIED
+                if not parent:
+                    break
+                parent = parent.rpartition("/")[0]
+    ordered = {directory: sorted(names, key=lambda item: (not item[1], item[0]))
+               for directory, names in children.items()}
+    return ordered, dir_statuses
+
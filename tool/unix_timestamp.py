@@ -1,14 +1,204 @@
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QLabel
+import time
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox,
+                               QPlainTextEdit, QSplitter, QApplication)
+from PySide6.QtCore import Qt, QTimer, QObject, QRunnable, QThreadPool, Signal
+from PySide6.QtGui import QTextCursor
+
+from tool import perf
+from tool.timestamp_convert import TimestampConverter
+from tool.worker_errors import error_message
+
+# 结果分块写入右侧文本框，每块的字符数；一次 setPlainText 上百万行会让界面卡住数秒
+FILL_CHUNK_CHARS = 256 * 1024
+
+# 时区选项 -> 是否按本地时间输出
+TIMEZONES = {
+    "UTC": False,
+    "本地时间": True,
+}
+
+# ISO 转时间戳时输出的精度
+OUTPUT_UNITS = {
+    "秒": "s",
+    "毫秒": "ms",
+    "微秒": "us",
+    "纳秒": "ns",
+}
+
+
+class TimestampWorkerSignals(QObject):
+    finished = Signal(int, object)  # 请求序号, (结果文本, 无法识别的行号列表)
+    failed = Signal(int, str)  # 请求序号, 错误信息
+
+
+class TimestampWorker(QRunnable):
+    """在线程池中整段转换时间戳，避免大量数据阻塞界面"""
+
+    def __init__(self, revision, text, local, unit):
+        super().__init__()
+        self.revision = revision
+        self.text = text
+        self.local = local
+        self.unit = unit
+        self.signals = TimestampWorkerSignals()
+
+    def run(self):
+        try:
+            result = TimestampConverter(self.local, self.unit).convert_text(self.text)
+        except Exception as e:
+            self.signals.failed.emit(self.revision, error_message(e))
+            return
+        self.signals.finished.emit(self.revision, result)
 
 
 class UnixTimestampWidget(QWidget):
-    def __init__(self):
+    def __init__(self, main_window=None):
         super().__init__()
+        self.main_window = main_window
+        self.input_edit = None
+        self.output_edit = None
+        self.timezone_combo = None
+        self.unit_combo = None
+        # 每次请求转换时递增，过期的结果直接丢弃
+        self.convert_revision = 0
+        self.convert_worker = None
+        # 工作线程忙时只记录有新请求，完成后按最新文本再转换一次
+        self.convert_pending = False
+        self.convert_start_time = 0
+        self.convert_time = 0
+        # 正在分块写入右侧的结果：(文本, 已写入的字符数, 无法识别的行号列表)
+        self.fill_state = None
+        self.fill_cursor = None
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(1)
+
+        self.init_ui()
+        self.setup_logic()
+
+    def init_ui(self):
         layout = QVBoxLayout()
-        label = QLabel("Unix 时间戳转换功能待开发。")
-        layout.addWidget(label)
+
+        control_layout = QHBoxLayout()
+        control_layout.addWidget(QLabel("时区:"))
+        self.timezone_combo = QComboBox()
+        self.timezone_combo.addItems(TIMEZONES.keys())
+        control_layout.addWidget(self.timezone_combo)
+        control_layout.addWidget(QLabel("输出精度:"))
+        self.unit_combo = QComboBox()
+        self.unit_combo.addItems(OUTPUT_UNITS.keys())
+        self.unit_combo.setToolTip("ISO 时间转为时间戳时使用；时间戳按位数自动识别秒、毫秒、微秒、纳秒")
+        control_layout.addWidget(self.unit_combo)
+        control_layout.addStretch()
+        layout.addLayout(control_layout)
+
+        splitter = QSplitter(Qt.Orientation.Horizontal)
+        self.input_edit = QPlainTextEdit()
+        self.input_edit.setPlaceholderText("每行一个时间戳或 ISO 8601 时间，例如：\n1700000000\n2023-11-14T22:13:20Z")
+        splitter.addWidget(self.input_edit)
+
+        # 结果可能有上百万行：不换行、不记录撤销
+        self.output_edit = QPlainTextEdit()
+        self.output_edit.setReadOnly(True)
+        self.output_edit.setUndoRedoEnabled(False)
+        self.output_edit.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        splitter.addWidget(self.output_edit)
+        splitter.setSizes([400, 400])
+        layout.addWidget(splitter, 1)
+
         self.setLayout(layout)
-        self.setup_logic()
 
     def setup_logic(self):
-        pass  # TODO: Unix 时间戳转换逻辑
\ No newline at end of file
+        # 防抖定时器：粘贴或连续输入时只转换一次
+        self.update_timer = QTimer()
+        self.update_timer.setInterval(500)
+        self.update_timer.setSingleShot(True)
+        self.update_timer.timeout.connect(self.update_converted_text)
+        # 每次事件循环空闲时写入一块结果
+        self.fill_timer = QTimer()
+        self.fill_timer.setInterval(0)
+        self.fill_timer.timeout.connect(self.fill_output)
+
+        self.input_edit.textChanged.connect(self.update_timer.start)
+        self.timezone_combo.currentTextChanged.connect(self.update_converted_text)
+        self.unit_combo.currentTextChanged.connect(self.update_converted_text)
+
+    def update_status(self, message):
+        if self.main_window:
+            self.main_window.update_status(message)
+
+    def update_converted_text(self):
+        """请求重新转换，转换在工作线程中进行"""
+        self.convert_revision += 1
+        self.fill_state = None
+        if self.convert_worker is not None:
+            # 同一时间只处理一个请求，期间的多次请求合并为完成后的一次
+            self.convert_pending = True
+            return
+        self.start_convert_worker()
+
+    def start_convert_worker(self):
+        text = self.input_edit.toPlainText()
+        self.convert_pending = False
+        self.convert_start_time = int(time.time() * 1000)
+        worker = TimestampWorker(self.convert_revision, text,
+                                 TIMEZONES[self.timezone_combo.currentText()],
+                                 OUTPUT_UNITS[self.unit_combo.currentText()])
+        worker.signals.finished.connect(self.on_convert_finished)
+        worker.signals.failed.connect(self.on_convert_failed)
+        self.convert_worker = worker
+        self.thread_pool.start(worker)
+
+    def finish_convert_worker(self, revision):
+        """工作线程结束后的处理，返回结果是否仍是最新的"""
+        self.convert_worker = None
+        if self.convert_pending:
+            self.start_convert_worker()
+            return False
+        return revision == self.convert_revision
+
+    def on_convert_failed(self, revision, message):
+        if self.finish_convert_worker(revision):
+            self.update_status(f"转换失败: {message}")
+
+    def on_convert_finished(self, revision, result):
+        if not self.finish_convert_worker(revision):
+            return
+        converted, errors = result
+        self.convert_time = int(time.time() * 1000) - self.convert_start_time
+        self.output_edit.clear()
+        self.fill_cursor = QTextCursor(self.output_edit.document())
+        self.fill_state = (converted, 0, errors)
+        self.fill_output()
+
+    def fill_output(self):
+        """向右侧写入下一块结果，全部写完后报告转换结果"""
+        if self.fill_state is None:
+            self.fill_timer.stop()
+            return
+        converted, offset, errors = self.fill_state
+        chunk = converted[offset:offset + FILL_CHUNK_CHARS]
+        with perf.span("set_text", len(chunk)):
+            self.fill_cursor.movePosition(QTextCursor.MoveOperation.End)
+            self.fill_cursor.insertText(chunk)
+        offset += FILL_CHUNK_CHARS
+        if offset < len(converted):
+            self.fill_state = (converted, offset, errors)
+            self.update_status(f"正在显示结果 {offset * 100 // len(converted)}%...")
+            self.fill_timer.start()
+            return
+        self.fill_state = None
+        self.fill_cursor = None
+        self.fill_timer.stop()
+        end_time = int(time.time() * 1000)
+        message = (f"转换 {self.output_edit.blockCount():,} 行，耗时: {self.convert_time} 毫秒"
+                   f"（含显示 {end_time - self.convert_start_time} 毫秒）")
+        if errors:
+            message += f"，{len(errors):,} 行无法识别（第一处在第 {errors[0]} 行）"
+        self.update_status(message)
+
+
+if __name__ == "__main__":
+    app = QApplication()
+    widget = UnixTimestampWidget()
+    widget.show()
+    app.exec()
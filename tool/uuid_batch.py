@@ -0,0 +1,359 @@
+import os
+import random
+import secrets
+import sys
+import time
+import uuid
+from array import array
+from functools import lru_cache
+
+from tool import perf
+
+# 每批生成的 UUID 个数（v4 每批读取 1 MB 随机字节）
+BATCH_SIZE = 65536
+
+# 一个 UUID 的文本（含换行）："xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx\n"
+RECORD_SIZE = 37
+# 少于这么多个 UUID 时不使用 NumPy：导入 NumPy 本身比直接格式化更慢
+NUMPY_MIN_COUNT = 4096
+RECORD_TEMPLATE = b"00000000-0000-0000-0000-000000000000\n"
+# 32 个十六进制字符在一行文本中的位置
+HEX_POSITIONS = [i for i, c in enumerate(RECORD_TEMPLATE) if c == ord("0")]
+# 五组十六进制字符：(在 32 个字符中的起始位置, 在一行文本中的起始位置, 长度)
+HEX_GROUPS = [(0, 0, 8), (8, 9, 4), (12, 14, 4), (16, 19, 4), (20, 24, 12)]
+
+# 按字节改写版本号（第 6 字节高 4 位）和变体（第 8 字节高 2 位）的转换表
+VERSION_4_TABLE = bytes((b & 0x0F) | 0x40 for b in range(256))
+VARIANT_TABLE = bytes((b & 0x3F) | 0x80 for b in range(256))
+
+# 1582-10-15 到 1970-01-01 之间的 100 纳秒间隔数
+GREGORIAN_OFFSET = 0x01B21DD213814000
+
+# ULID 使用的 Crockford Base32 字母表
+CROCKFORD_ALPHABET = b"0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+# Snowflake 默认的起始时间（毫秒），与 Twitter 的实现相同
+SNOWFLAKE_EPOCH = 1288834974657
+
+# 上一次 v1 批次用到的最后一个时间戳，保证多次批量生成之间单调递增
+last_timestamp = None
+
+
+class GenerationCancelled(Exception):
+    """在进度回调中抛出，用于中断正在进行的批量生成"""
+
+
+@lru_cache(maxsize=None)
+def load_numpy():
+    """NumPy 可用时返回模块，否则返回 None；只在第一次需要时导入"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def consecutive_bytes(start, count, width):
+    """从 start 开始的 count 个连续整数，每个取 width（不超过 8）字节大端表示，首尾相接"""
+    values = array("Q", range(start, start + count))
+    if sys.byteorder == "little":
+        values.byteswap()
+    data = values.tobytes()
+    if width == 8:
+        return data
+    out = bytearray(width * count)
+    for i in range(width):
+        out[i::width] = data[8 - width + i::8]
+    return out
+
+
+@lru_cache(maxsize=None)
+def digit_pattern(alphabet, run):
+    """连续整数某一位的一个周期：每个字符重复 run 次"""
+    return b"".join(bytes([c]) * run for c in alphabet)
+
+
+def consecutive_digit_columns(start, count, alphabet, width):
+    """从 start 开始的 count 个连续整数的定长 len(alphabet) 进制表示，按位（从高到低）返回每一位的字符序列
+
+    低位按周期平铺，高位在 count 个整数内只变化几次，按段拼接
+    """
+    base = len(alphabet)
+    columns = []
+    for j in range(width - 1, -1, -1):
+        run = base ** j
+        if run * base <= 32768:
+            pattern = digit_pattern(alphabet, run)
+            phase = start % len(pattern)
+            repeat = (phase + count) // len(pattern) + 1
+            columns.append((pattern * repeat)[phase:phase + count])
+            continue
+        parts = []
+        position = start
+        while position < start + count:
+            end = min((position // run + 1) * run, start + count)
+            parts.append(bytes([alphabet[(position // run) % base]]) * (end - position))
+            position = end
+        columns.append(b"".join(parts))
+    return columns
+
+
+def place_columns(records, size, offset, data, width):
+    """把 data 中每 width 个字节依次放到每条长 size 的记录的 offset 处"""
+    for i in range(width):
+        records[offset + i::size] = data[i::width]
+
+
+def uuid4_bytes(count):
+    """count 个 v4 UUID 的 16 字节形式首尾相接，随机字节一次读取"""
+    raw = bytearray(os.urandom(16 * count))
+    raw[6::16] = raw[6::16].translate(VERSION_4_TABLE)
+    raw[8::16] = raw[8::16].translate(VARIANT_TABLE)
+    return bytes(raw)
+
+
+def uuid1_bytes(count, node=None, clock_seq=None):
+    """count 个 v1 UUID：与 uuid.uuid1 相同的字段布局，一批占用 count 个连续的时间戳"""
+    global last_timestamp
+    if node is None:
+        node = uuid.getnode()
+    if clock_seq is None:
+        clock_seq = random.getrandbits(14)
+    timestamp = time.time_ns() // 100 + GREGORIAN_OFFSET
+    if last_timestamp is not None and timestamp <= last_timestamp:
+        timestamp = last_timestamp + 1
+    last_timestamp = timestamp + count - 1
+
+    raw = bytearray(16 * count)
+    tail = bytes([(clock_seq >> 8) | 0x80, clock_seq & 0xFF]) + node.to_bytes(6, "big")
+    done = 0
+    while done < count:
+        # 低 32 位在一段内不回绕，其余字段在段内不变
+        low = timestamp & 0xFFFFFFFF
+        size = min(count - done, 0x100000000 - low)
+        head = (((timestamp >> 32) & 0xFFFF).to_bytes(2, "big")
+                + (((timestamp >> 48) & 0x0FFF) | 0x1000).to_bytes(2, "big") + tail)
+        segment = memoryview(raw)[16 * done:16 * (done + size)]
+        place_columns(segment, 16, 0, consecutive_bytes(low, size, 4), 4)
+        for i, value in enumerate(head, 4):
+            segment[i::16] = bytes([value]) * size
+        done += size
+        timestamp += size
+    return bytes(raw)
+
+
+class UUID7Generator:
+    """UUIDv7（RFC 9562）：48 位毫秒时间戳，随后 42 位计数器（rand_a 12 位 + rand_b 高 30 位），最后 32 位随机数
+
+    每个新的毫秒从随机值（取自 secrets，不可预测）开始计数（最高位为 0，留出余量），同一毫秒内逐个加一；
+    计数器用完时借用下一毫秒，因此批量生成的结果严格递增，可能略微超前于系统时钟
+    """
+
+    COUNTER_BITS = 42
+
+    def __init__(self):
+        self.last_ms = -1
+        self.counter = 0
+
+    def next_range(self, count):
+        """为最多 count 个 ID 分配 (毫秒, 起始计数, 个数)"""
+        now = time.time_ns() // 1_000_000
+        if now > self.last_ms:
+            self.last_ms = now
+            self.counter = secrets.randbits(self.COUNTER_BITS - 1)
+        elif self.counter >= 1 << self.COUNTER_BITS:
+            self.last_ms += 1
+            self.counter = secrets.randbits(self.COUNTER_BITS - 1)
+        start = self.counter
+        # 段内低 30 位不回绕时，字节 6-11 整体是连续的整数
+        size = min(count, (1 << self.COUNTER_BITS) - start, (1 << 30) - (start & 0x3FFFFFFF))
+        self.counter += size
+        return self.last_ms, start, size
+
+    def generate(self, count):
+        """count 个 UUIDv7 的 16 字节形式首尾相接"""
+        raw = bytearray(os.urandom(16 * count))
+        done = 0
+        while done < count:
+            ms, start, size = self.next_range(count - done)
+            segment = memoryview(raw)[16 * done:16 * (done + size)]
+            for i, value in enumerate(ms.to_bytes(6, "big")):
+                segment[i::16] = bytes([value]) * size
+            # 版本 7、计数器高 12 位、变体 10、计数器低 30 位
+            first = 0x7000_8000_0000 | (start >> 30) << 32 | (start & 0x3FFFFFFF)
+            place_columns(segment, 16, 6, consecutive_bytes(first, size, 6), 6)
+            done += size
+        return bytes(raw)
+
+
+class ULIDGenerator:
+    """ULID：48 位毫秒时间戳 + 80 位随机数，Crockford Base32 编码为 26 个字符
+
+    每个新的毫秒的随机部分取自 secrets，同一毫秒内逐个加一（规范中的单调模式）；随机部分用完时借用下一毫秒
+    """
+
+    RANDOM_BITS = 80
+
+    def __init__(self):
+        self.last_ms = -1
+        self.randomness = 0
+
+    def next_range(self, count):
+        now = time.time_ns() // 1_000_000
+        if now > self.last_ms:
+            self.last_ms = now
+            self.randomness = secrets.randbits(self.RANDOM_BITS - 1)
+        elif self.randomness >= 1 << self.RANDOM_BITS:
+            self.last_ms += 1
+            self.randomness = secrets.randbits(self.RANDOM_BITS - 1)
+        start = self.randomness
+        # 段内低 40 位（最后 8 个字符）不回绕，前 18 个字符不变
+        size = min(count, (1 << self.RANDOM_BITS) - start, (1 << 40) - (start & 0xFFFFFFFFFF))
+        self.randomness += size
+        return self.last_ms, start, size
+
+    def generate(self, count):
+        """count 个 ULID 的文本（bytes，每行一个）"""
+        parts = []
+        done = 0
+        while done < count:
+            ms, start, size = self.next_range(count - done)
+            high = ms << 40 | start >> 40
+            head = bytes(CROCKFORD_ALPHABET[(high >> 5 * i) & 31] for i in range(17, -1, -1))
+            records = bytearray((head + b"00000000\n") * size)
+            columns = consecutive_digit_columns(start & 0xFFFFFFFFFF, size, CROCKFORD_ALPHABET, 8)
+            for i, column in enumerate(columns, 18):
+                records[i::27] = column
+            parts.append(records)
+            done += size
+        return b"".join(parts)
+
+
+class SnowflakeGenerator:
+    """Snowflake：41 位毫秒时间（相对 epoch）+ 10 位机器号 + 12 位序号，输出十进制整数
+
+    每毫秒最多 4096 个，用完后借用下一毫秒而不等待时钟，批量生成时可能超前于系统时钟，
+    之后的调用从 max(当前时间, 上次使用的毫秒) 继续，结果始终严格递增
+    """
+
+    SEQUENCE_BITS = 12
+
+    def __init__(self, worker_id=0, epoch=SNOWFLAKE_EPOCH):
+        if not 0 <= worker_id < 1024:
+            raise ValueError(f"机器号超出范围: {worker_id}")
+        self.worker_id = worker_id
+        self.epoch = epoch
+        self.last_ms = -1
+        self.sequence = 0
+
+    def generate(self, count):
+        """count 个 Snowflake ID 的文本（bytes，每行一个）"""
+        parts = []
+        done = 0
+        while done < count:
+            now = time.time_ns() // 1_000_000
+            if now > self.last_ms:
+                self.last_ms = now
+                self.sequence = 0
+            elif self.sequence >= 1 << self.SEQUENCE_BITS:
+                self.last_ms += 1
+                self.sequence = 0
+            size = min(count - done, (1 << self.SEQUENCE_BITS) - self.sequence)
+            first = (self.last_ms - self.epoch) << 22 | self.worker_id << 12 | self.sequence
+            parts.append("\n".join(map(str, range(first, first + size))))
+            parts.append("\n")
+            self.sequence += size
+            done += size
+        return "".join(parts).encode("ascii")
+
+
+# 带有单调状态的生成器，在第一次使用时创建
+generators = {}
+
+
+def get_generator(kind):
+    generator = generators.get(kind)
+    if generator is None:
+        generator = generators[kind] = {"uuid7": UUID7Generator, "ulid": ULIDGenerator,
+                                        "snowflake": SnowflakeGenerator}[kind]()
+    return generator
+
+
+def format_uuids(raw, use_numpy=True):
+    """把首尾相接的 16 字节 UUID 格式化为每行一个的 ASCII 文本（bytes）；NumPy 可用时默认使用它"""
+    count = len(raw) // 16
+    numpy = load_numpy() if use_numpy and count >= NUMPY_MIN_COUNT else None
+    if numpy is not None:
+        return format_uuids_numpy(numpy, raw, count)
+    hexed = raw.hex().encode("ascii")
+    out = bytearray(RECORD_TEMPLATE * count)
+    # 每次复制所有 UUID 的同一个十六进制位，共 32 次切片赋值
+    for i, position in enumerate(HEX_POSITIONS):
+        out[position::RECORD_SIZE] = hexed[i::32]
+    return bytes(out)
+
+
+@lru_cache(maxsize=None)
+def numpy_tables(numpy):
+    """(每个字节对应的两个十六进制字符，按 uint16 存放, 一行文本的模板)"""
+    table = numpy.frombuffer(b"".join(b"%02x" % b for b in range(256)), dtype=numpy.uint16)
+    template = numpy.frombuffer(RECORD_TEMPLATE, dtype=numpy.uint8)
+    return table, template
+
+
+def format_uuids_numpy(numpy, raw, count):
+    """查表得到所有字节的十六进制字符，再按五组整列复制到模板中"""
+    table, template = numpy_tables(numpy)
+    hexed = table[numpy.frombuffer(raw, dtype=numpy.uint8)].view(numpy.uint8).reshape(count, 32)
+    out = numpy.empty((count, RECORD_SIZE), dtype=numpy.uint8)
+    out[:] = template
+    for source, target, size in HEX_GROUPS:
+        out[:, target:target + size] = hexed[:, source:source + size]
+    return out.tobytes()
+
+
+# 支持的 ID 类型；uuid 开头的按 UUID 文本格式输出
+ID_KINDS = ("uuid1", "uuid4", "uuid7", "ulid", "snowflake")
+
+
+def iter_uuid_batches(kind, count, batch_size=BATCH_SIZE, use_numpy=True):
+    """按批产出 ID 文本（bytes，每行一个），内存只与批大小有关
+
+    uuid7、ulid 和 snowflake 在同一进程内的多次调用之间也保持严格递增
+    """
+    if kind not in ID_KINDS:
+        raise ValueError(f"不支持的 ID 类型: {kind}")
+    if kind == "uuid1":
+        make = uuid1_bytes
+    elif kind == "uuid4":
+        make = uuid4_bytes
+    else:
+        make = get_generator(kind).generate
+    done = 0
+    while done < count:
+        size = min(batch_size, count - done)
+        chunk = make(size)
+        yield format_uuids(chunk, use_numpy) if kind.startswith("uuid") else chunk
+        done += size
+
+
+def generate_uuids(kind, count):
+    """生成 count 个 ID 字符串"""
+    with perf.span("generate", count):
+        return b"".join(iter_uuid_batches(kind, count)).decode("ascii").splitlines()
+
+
+def write_uuids(file, kind, count, progress=None):
+    """把 count 个 ID 逐批写入二进制文件对象，每写完一批调用 progress(已写入个数)
+
+    progress 中可以抛出 GenerationCancelled 中断生成
+    """
+    done = 0
+    with perf.span("generate", count):
+        for chunk in iter_uuid_batches(kind, count):
+            file.write(chunk)
+            done += chunk.count(b"\n")
+            if progress is not None:
+                progress(done)
+    return done
+
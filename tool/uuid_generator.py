@@ -1,17 +1,97 @@
-import uuid
+import io
+import time
 from PySide6.QtWidgets import (QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
                                QPlainTextEdit, QComboBox, QWidget, QSpinBox,
-                               QFrame, QSizePolicy)
-from PySide6.QtCore import Qt
+                               QFrame, QSizePolicy, QProgressBar, QFileDialog, QApplication)
+from PySide6.QtCore import Qt, QObject, QRunnable, QThreadPool, Signal
+
+from tool import perf
+from tool.uuid_batch import generate_uuids, write_uuids, GenerationCancelled
+from tool.worker_errors import error_message
+
+# 版本选项 -> ID 类型；v7、ULID、Snowflake 按时间递增，作为数据库主键时索引局部性更好
+ID_KINDS = {
+    "UUID v1": "uuid1",
+    "UUID v4": "uuid4",
+    "UUID v7": "uuid7",
+    "ULID": "ulid",
+    "Snowflake": "snowflake",
+}
+
+# 输出位置 -> 可生成的最大数量；文本框只适合少量结果，剪贴板需要整体放在内存中
+OUTPUT_TARGETS = {
+    "文本框": 100,
+    "剪贴板": 1_000_000,
+    "文件": 2_000_000_000,
+}
+
+
+class UUIDBatchWorkerSignals(QObject):
+    progress = Signal(int)  # 已生成个数
+    finished = Signal(object)  # 文件路径，或输出到剪贴板时的文本
+    cancelled = Signal()
+    failed = Signal(str)  # 错误信息
+
+
+class UUIDBatchWorker(QRunnable):
+    """在线程池中批量生成 UUID，写入文件或拼成文本"""
+
+    # 两次进度通知之间的最小间隔（秒）
+    PROGRESS_INTERVAL = 0.1
+
+    def __init__(self, kind, count, path=None):
+        super().__init__()
+        self.kind = kind
+        self.count = count
+        self.path = path
+        self.signals = UUIDBatchWorkerSignals()
+        self.cancel_requested = False
+        self.last_report = 0.0
+
+    def cancel(self):
+        self.cancel_requested = True
+
+    def report_progress(self, done):
+        if self.cancel_requested:
+            raise GenerationCancelled()
+        now = time.monotonic()
+        if now - self.last_report >= self.PROGRESS_INTERVAL:
+            self.last_report = now
+            self.signals.progress.emit(done)
+
+    def run(self):
+        try:
+            if self.path:
+                with open(self.path, "wb") as f:
+                    write_uuids(f, self.kind, self.count, self.report_progress)
+                result = self.path
+            else:
+                buffer = io.BytesIO()
+                write_uuids(buffer, self.kind, self.count, self.report_progress)
+                result = buffer.getvalue().decode("ascii")
+        except GenerationCancelled:
+            self.signals.cancelled.emit()
+            return
+        except Exception as e:
+            self.signals.failed.emit(error_message(e))
+            return
+        self.signals.finished.emit(result)
 
 
 class UUIDGeneratorWidget(QWidget):
-    def __init__(self):
+    def __init__(self, main_window=None):
         super().__init__()
+        self.main_window = main_window
         self.uuid_display = None
         self.generate_button = None
         self.count_spin = None
         self.version_combo = None
+        self.output_combo = None
+        self.progress_bar = None
+        self.worker = None
+        self.start_time = 0
+        self.thread_pool = QThreadPool()
+        self.thread_pool.setMaxThreadCount(1)
         self.init_ui()
         self.setup_logic()
 
@@ -33,7 +113,7 @@ class UUIDGeneratorWidget(QWidget):
         version_layout = QHBoxLayout()
         version_layout.addWidget(QLabel("UUID 版本:"))
         self.version_combo = QComboBox()
-        self.version_combo.addItems(["UUID v1", "UUID v4"])
+        self.version_combo.addItems(ID_KINDS.keys())
         version_layout.addWidget(self.version_combo)
         settings_layout.addLayout(version_layout)
 
@@ -41,16 +121,30 @@ class UUIDGeneratorWidget(QWidget):
         count_layout = QHBoxLayout()
         count_layout.addWidget(QLabel("生成数量:"))
         self.count_spin = QSpinBox()
-        self.count_spin.setRange(1, 100)  # 限制1-100个
+        self.count_spin.setRange(1, OUTPUT_TARGETS["文本框"])  # 输出到文本框时限制1-100个
         self.count_spin.setValue(5)  # 默认生成5个
+        self.count_spin.setGroupSeparatorShown(True)
         count_layout.addWidget(self.count_spin)
         settings_layout.addLayout(count_layout)
 
+        # 输出位置
+        output_layout = QHBoxLayout()
+        output_layout.addWidget(QLabel("输出到:"))
+        self.output_combo = QComboBox()
+        self.output_combo.addItems(OUTPUT_TARGETS.keys())
+        output_layout.addWidget(self.output_combo)
+        settings_layout.addLayout(output_layout)
+
         # 生成按钮
         self.generate_button = QPushButton("生成 UUID")
         self.generate_button.setSizePolicy(QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed)
         settings_layout.addWidget(self.generate_button, alignment=Qt.AlignmentFlag.AlignCenter)
 
+        # 批量生成的进度
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        settings_layout.addWidget(self.progress_bar)
+
         main_layout.addWidget(settings_frame)
 
         # 结果显示区域
@@ -75,21 +169,84 @@ class UUIDGeneratorWidget(QWidget):
 
     def setup_logic(self):
         self.generate_button.clicked.connect(self.generate_uuid)
+        self.output_combo.currentTextChanged.connect(self.update_count_range)
 
-    def generate_uuid(self):
-        version_index = self.version_combo.currentIndex()
-        count = self.count_spin.value()
-
-        try:
-            uuids = []
-            for _ in range(count):
-                if version_index == 0:
-                    uuids.append(str(uuid.uuid1()))
-                else:
-                    uuids.append(str(uuid.uuid4()))
+    def update_status(self, message):
+        if self.main_window:
+            self.main_window.update_status(message)
 
-            # 将生成的UUID显示在多行文本框中[6](@ref)
-            self.uuid_display.setPlainText("\n".join(uuids))
+    def update_count_range(self, target):
+        """不同输出位置允许的最大数量不同"""
+        self.count_spin.setMaximum(OUTPUT_TARGETS[target])
 
-        except Exception as e:
-            self.uuid_display.setPlainText(f"错误: {str(e)}")
\ No newline at end of file
+    def generate_uuid(self):
+        if self.worker is not None:
+            # 生成过程中按钮用于取消
+            self.worker.cancel()
+            return
+        kind = ID_KINDS[self.version_combo.currentText()]
+        count = self.count_spin.value()
+        target = self.output_combo.currentText()
+
+        if target == "文本框":
+            try:
+                # 将生成的UUID显示在多行文本框中[6](@ref)
+                text = "\n".join(generate_uuids(kind, count))
+                with perf.span("set_text", len(text)):
+                    self.uuid_display.setPlainText(text)
+            except Exception as e:
+                self.uuid_display.setPlainText(f"错误: {str(e)}")
+            return
+
+        path = None
+        if target == "文件":
+            path, _ = QFileDialog.getSaveFileName(self, "保存 UUID", "uuids.txt", "文本文件 (*.txt);;所有文件 (*)")
+            if not path:
+                return
+        self.start_worker(kind, count, path)
+
+    def start_worker(self, kind, count, path):
+        worker = UUIDBatchWorker(kind, count, path)
+        worker.signals.progress.connect(self.on_progress)
+        worker.signals.finished.connect(self.on_finished)
+        worker.signals.cancelled.connect(self.on_cancelled)
+        worker.signals.failed.connect(self.on_failed)
+        self.worker = worker
+        self.start_time = time.perf_counter()
+        # 进度条范围是 int，按千分比显示
+        self.progress_bar.setRange(0, 1000)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self.generate_button.setText("取消")
+        self.update_status(f"正在生成 {count:,} 个 UUID...")
+        self.thread_pool.start(worker)
+
+    def finish_worker(self):
+        self.worker = None
+        self.progress_bar.setVisible(False)
+        self.generate_button.setText("生成 UUID")
+
+    def on_progress(self, done):
+        if self.worker is not None:
+            self.progress_bar.setValue(done * 1000 // self.worker.count)
+            self.update_status(f"已生成 {done:,} / {self.worker.count:,} 个 UUID")
+
+    def on_finished(self, result):
+        count = self.worker.count
+        path = self.worker.path
+        self.finish_worker()
+        if path is None:
+            QApplication.clipboard().setText(result)
+            destination = "剪贴板"
+        else:
+            destination = path
+        elapsed = int((time.perf_counter() - self.start_time) * 1000)
+        self.update_status(f"已生成 {count:,} 个 UUID 到 {destination}，耗时: {elapsed} 毫秒")
+
+    def on_cancelled(self):
+        self.finish_worker()
+        self.update_status("已取消生成 UUID")
+
+    def on_failed(self, message):
+        self.finish_worker()
+        self.update_status(f"生成 UUID 失败: {message}")
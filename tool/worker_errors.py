@@ -0,0 +1,10 @@
+import traceback
+
+
+def error_message(e):
+    """工作线程中捕获的异常转换为显示给用户的信息；文件和格式错误以外的是程序错误，同时打印调用栈"""
+    if isinstance(e, (OSError, ValueError)):
+        return str(e)
+    traceback.print_exc()
+    message = str(e)
+    return f"{type(e).__name__}: {message}" if message else type(e).__name__
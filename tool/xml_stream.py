@@ -0,0 +1,247 @@
+import itertools
+import re
+import xml.etree.ElementTree as ET
+
+# 每次送入解析器的字符数，每送入一块产出一次输出
+FEED_SIZE = 1024 * 1024
+
+XML_NAMESPACE = "http://www.w3.org/XML/1998/namespace"
+DECLARATION_PATTERN = re.compile(r'\s*(<\?xml\s[^>]*\?>)')
+
+
+class XMLFormatError(ValueError):
+    """格式错误，带有出错位置（行列号从 1 开始）"""
+
+    def __init__(self, msg, lineno, colno):
+        super().__init__(f"{msg}: 第 {lineno} 行第 {colno} 列")
+        self.msg = msg
+        self.lineno = lineno
+        self.colno = colno
+
+
+def escape_text(text):
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+def escape_attrib(text):
+    text = escape_text(text)
+    if '"' in text:
+        text = text.replace('"', "&quot;")
+    if "\r" in text:
+        text = text.replace("\r", "&#13;")
+    if "\n" in text:
+        text = text.replace("\n", "&#10;")
+    if "\t" in text:
+        text = text.replace("\t", "&#09;")
+    return text
+
+
+class Frame:
+    """一个尚未结束的元素"""
+    __slots__ = ("name", "open_tag", "has_children", "whitespace", "mixed", "saved_prefixes")
+
+    def __init__(self, name, saved_prefixes):
+        self.name = name
+        # 开始标签还没有写出 ">"（元素可能为空，需要写成 <a />）
+        self.open_tag = True
+        self.has_children = False
+        # 当前文本段（元素文本或上一个子节点的 tail）：只含空白时先缓存，含有其他字符时直接写出
+        self.whitespace = []
+        self.mixed = False
+        self.saved_prefixes = saved_prefixes
+
+
+class StreamingXMLFormatter:
+    """作为 XMLParser 的 target 接收解析事件，边解析边写出缩进后的文本，不构造元素树
+
+    布局与 ET.indent 后再 ET.tostring 相同：有子节点的元素中，只含空白的文本替换为换行和缩进，
+    含有其他字符的文本原样保留；没有子节点的元素文本原样保留。
+    注释和处理指令按原位置保留，命名空间保留原来的前缀
+    """
+
+    def __init__(self, write, indent="  "):
+        self.write = write
+        self.indent = indent
+        self.indentations = ["\n"]
+        self.stack = []
+        # 命名空间 uri -> 前缀；属性不能使用默认命名空间，单独记录非空前缀
+        self.prefixes = {XML_NAMESPACE: "xml"}
+        self.attrib_prefixes = {XML_NAMESPACE: "xml"}
+        self.pending_namespaces = []
+        self.names = {}
+        self.attrib_names = {}
+        # 已经写出过顶层节点（声明、DOCTYPE、根元素之外的注释等）
+        self.top_level_written = False
+
+    def indentation(self, depth):
+        indentations = self.indentations
+        while len(indentations) <= depth:
+            indentations.append("\n" + self.indent * len(indentations))
+        return indentations[depth]
+
+    def qualified_name(self, tag, attrib=False):
+        names = self.attrib_names if attrib else self.names
+        name = names.get(tag)
+        if name is None:
+            name = tag
+            if tag[:1] == "{":
+                uri, local = tag[1:].split("}", 1)
+                prefix = (self.attrib_prefixes if attrib else self.prefixes).get(uri)
+                if prefix:
+                    name = f"{prefix}:{local}"
+                elif prefix is not None:
+                    name = local
+            names[tag] = name
+        return name
+
+    def begin_child(self):
+        """在当前元素中开始一个子节点（元素、注释或处理指令），写出它前面的缩进"""
+        if not self.stack:
+            if self.top_level_written:
+                self.write("\n")
+            self.top_level_written = True
+            return
+        parent = self.stack[-1]
+        if parent.open_tag:
+            self.write(">")
+            parent.open_tag = False
+        if not parent.mixed:
+            self.write(self.indentation(len(self.stack)))
+        parent.has_children = True
+        # 子节点之后是一个新的文本段（子节点的 tail）
+        parent.whitespace.clear()
+        parent.mixed = False
+
+    def start_ns(self, prefix, uri):
+        self.pending_namespaces.append((prefix, uri))
+
+    def start(self, tag, attrib):
+        self.begin_child()
+        saved = None
+        if self.pending_namespaces:
+            saved = (self.prefixes, self.attrib_prefixes)
+            self.prefixes = dict(self.prefixes)
+            self.attrib_prefixes = dict(self.attrib_prefixes)
+            for prefix, uri in self.pending_namespaces:
+                self.prefixes[uri] = prefix
+                if prefix:
+                    self.attrib_prefixes[uri] = prefix
+            self.names = {}
+            self.attrib_names = {}
+        name = self.qualified_name(tag)
+        parts = ["<", name]
+        for prefix, uri in self.pending_namespaces:
+            parts.append(f' xmlns:{prefix}="{escape_attrib(uri)}"' if prefix else f' xmlns="{escape_attrib(uri)}"')
+        self.pending_namespaces.clear()
+        for key, value in attrib.items():
+            parts.append(f' {self.qualified_name(key, True)}="{escape_attrib(value)}"')
+        self.write("".join(parts))
+        self.stack.append(Frame(name, saved))
+
+    def data(self, data):
+        if not self.stack:
+            return
+        frame = self.stack[-1]
+        if frame.mixed:
+            self.write(escape_text(data))
+        elif data.strip():
+            if frame.open_tag:
+                self.write(">")
+                frame.open_tag = False
+            frame.whitespace.append(data)
+            self.write(escape_text("".join(frame.whitespace)))
+            frame.whitespace.clear()
+            frame.mixed = True
+        else:
+            frame.whitespace.append(data)
+
+    def end(self, tag):
+        frame = self.stack.pop()
+        if frame.has_children:
+            if not frame.mixed:
+                self.write(self.indentation(len(self.stack)))
+            self.write(f"</{frame.name}>")
+        elif frame.open_tag and not frame.whitespace:
+            self.write(" />")
+        else:
+            if frame.open_tag:
+                self.write(">")
+            self.write(escape_text("".join(frame.whitespace)))
+            self.write(f"</{frame.name}>")
+        if frame.saved_prefixes is not None:
+            self.prefixes, self.attrib_prefixes = frame.saved_prefixes
+            self.names = {}
+            self.attrib_names = {}
+
+    def comment(self, text):
+        self.begin_child()
+        self.write(f"<!--{text}-->")
+
+    def pi(self, target, text=None):
+        self.begin_child()
+        self.write(f"<?{target} {text}?>" if text else f"<?{target}?>")
+
+    def doctype(self, name, pubid, system):
+        self.begin_child()
+        if pubid:
+            self.write(f'<!DOCTYPE {name} PUBLIC "{pubid}" "{system}">')
+        elif system:
+            self.write(f'<!DOCTYPE {name} SYSTEM "{system}">')
+        else:
+            self.write(f"<!DOCTYPE {name}>")
+
+    def declaration(self, text):
+        self.begin_child()
+        self.write(text)
+
+    def close(self):
+        return None
+
+
+def iter_pretty_xml(source, indent="  "):
+    """流式格式化 XML，边解析边按块产出文本，内存只与嵌套深度和单个文本节点有关
+
+    source 可以是字符串，也可以是字符串块的可迭代对象；XML 声明原样保留在第一行。
+    遇到语法错误时抛出 XMLFormatError
+    """
+    if isinstance(source, str):
+        text = source
+        source = (text[i:i + FEED_SIZE] for i in range(0, len(text), FEED_SIZE))
+    parts = []
+    formatter = StreamingXMLFormatter(parts.append, indent)
+    parser = ET.XMLParser(target=formatter)
+    chunks = iter(source)
+    # 解析器不报告 XML 声明，先凑够开头的一段文本，单独保留声明
+    head = ""
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= 256:
+            break
+    m = DECLARATION_PATTERN.match(head)
+    if m:
+        formatter.declaration(m.group(1))
+    try:
+        for chunk in itertools.chain((head,), chunks):
+            parser.feed(chunk)
+            if parts:
+                yield "".join(parts)
+                parts.clear()
+        parser.close()
+    except ET.ParseError as e:
+        lineno, column = e.position
+        msg = str(e).rsplit(":", 1)[0]
+        raise XMLFormatError(msg, lineno, column + 1) from None
+    if parts:
+        yield "".join(parts)
+
+
+def pretty_xml(text, indent="  "):
+    """格式化整段 XML 文本"""
+    return "".join(iter_pretty_xml(text, indent))
+